@@ -0,0 +1,135 @@
+"""
+On-disk archive of the raw CampusDish payloads behind each import.
+
+Every decoded page (the model: object of the base page and of each period page)
+and the hours blob are stored compressed under the sha256 of their text, so a
+payload that does not change from one scrape, day or hall to the next is kept
+once. A small index per date and hall records which payloads made up the last
+scrape:
+
+    <MENU_ARCHIVE_DIR>/
+        objects/3f/3f9a...e1.json.gz
+        index/2025-09-17/ohill.json   {"fetched_at", "base_url", "location_id", "base",
+                                       "hours", "periods": {period id: {"name", "payload"}}}
+
+Objects are zstd compressed when the optional zstandard package is installed and
+gzip compressed otherwise; both are readable either way.
+
+    archive = PayloadArchive()
+    snapshot = archive.load_snapshot("ohill", date(2025, 9, 17))
+    load_menu_data("ohill", snapshot["menu"], snapshot["hours"])
+"""
+import gzip
+import hashlib
+import json
+import os
+import tempfile
+from datetime import date
+from pathlib import Path
+
+from django.conf import settings
+
+from .payloads import Interner, project_menu
+from .scrapers import hours_from_blob
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+GZIP_LEVEL = 6
+ZSTD_LEVEL = 10
+
+
+def _write_atomic(path: Path, data: bytes):
+    """Write via a temporary file in the same directory, so readers never see a partial file."""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=path.parent, prefix=".tmp-")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        os.replace(tmp, path)
+    except BaseException:
+        os.unlink(tmp)
+        raise
+
+
+class PayloadArchive:
+    def __init__(self, root=None):
+        self.root = Path(root or settings.MENU_ARCHIVE_DIR)
+
+    # objects
+
+    def _object_path(self, digest: str, suffix: str) -> Path:
+        return self.root / "objects" / digest[:2] / f"{digest}.json{suffix}"
+
+    def put(self, text: str) -> str:
+        """Store `text` unless an identical payload is already archived; returns its key."""
+        data = text.encode("utf-8")
+        digest = hashlib.sha256(data).hexdigest()
+        if any(self._object_path(digest, s).exists() for s in (".zst", ".gz")):
+            return digest
+        if zstandard is not None:
+            path = self._object_path(digest, ".zst")
+            data = zstandard.ZstdCompressor(level=ZSTD_LEVEL).compress(data)
+        else:
+            path = self._object_path(digest, ".gz")
+            data = gzip.compress(data, compresslevel=GZIP_LEVEL, mtime=0)
+        _write_atomic(path, data)
+        return digest
+
+    def get(self, digest: str) -> str:
+        """The archived text for a key returned by put."""
+        path = self._object_path(digest, ".gz")
+        if path.exists():
+            return gzip.decompress(path.read_bytes()).decode("utf-8")
+        path = self._object_path(digest, ".zst")
+        if not path.exists():
+            raise KeyError(f"No archived payload {digest}")
+        if zstandard is None:
+            raise RuntimeError(f"{path} is zstd compressed; install zstandard to read it")
+        return zstandard.ZstdDecompressor().decompress(path.read_bytes()).decode("utf-8")
+
+    # index
+
+    def _index_path(self, hall_name: str, on_date: date) -> Path:
+        return self.root / "index" / on_date.isoformat() / f"{hall_name}.json"
+
+    def record(self, hall_name: str, on_date: date, entry: dict):
+        """Point the hall/date index at the payloads of its latest scrape."""
+        _write_atomic(self._index_path(hall_name, on_date), json.dumps(entry, indent=2).encode("utf-8"))
+
+    def entry(self, hall_name: str, on_date: date) -> dict | None:
+        path = self._index_path(hall_name, on_date)
+        if not path.exists():
+            return None
+        return json.loads(path.read_text())
+
+    def halls_for(self, on_date: date) -> list[str]:
+        day_dir = self.root / "index" / on_date.isoformat()
+        return sorted(p.stem for p in day_dir.glob("*.json"))
+
+    # replay
+
+    def load_snapshot(self, hall_name: str, on_date: date) -> dict:
+        """
+        Rebuild {"menu", "hours"} for load_menu_data from the archive, as the
+        scraper produced them when the payloads were downloaded.
+        """
+        entry = self.entry(hall_name, on_date)
+        if entry is None:
+            raise KeyError(f"No archived scrape of {hall_name} for {on_date}")
+        shared = Interner()
+        periods = {
+            pid: {"name": block["name"], "menu": project_menu(json.loads(self.get(block["payload"])), shared)}
+            for pid, block in entry["periods"].items()
+        }
+        menu = {
+            "fetched_at": entry["fetched_at"],
+            "base_url": entry["base_url"],
+            "date": on_date.strftime("%m/%d/%Y"),
+            "location_id": entry["location_id"],
+            "periods": periods,
+        }
+        hours = hours_from_blob(json.loads(self.get(entry["hours"])), on_date)
+        return {"hall": hall_name, "date": on_date, "menu": menu, "hours": hours}
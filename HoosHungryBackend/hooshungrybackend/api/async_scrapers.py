@@ -0,0 +1,137 @@
+"""
+Asyncio scrape engine: an alternative backend to the thread-per-hall flow in
+api.scrapers.
+
+Every hall's pages are fetched concurrently under one concurrency bound, each
+request with its own timeout, and finished snapshots are handed to an importer
+through a queue, so importing one hall overlaps with fetching the others.
+
+HTTP still goes through the pooled requests session (there is no async HTTP
+client among our dependencies); blocking calls run on a dedicated thread pool
+sized to the concurrency bound, and asyncio does the scheduling. Decoding and
+projecting the pages runs on a thread of its own, so the event loop keeps
+dispatching requests while a large page is parsed.
+
+    results = scrape_all([("ohill", None), ("runk", date(2025, 9, 18))], import_snapshot)
+
+A target is a (hall name, date) pair; date None means whatever CampusDish shows
+today. Several dates per hall make a multi-day scrape one batched pipeline.
+"""
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.db import connections
+
+from .scrapers import REQUEST_TIMEOUT, SCRAPE_DEADLINE, fetch_page, snapshot_steps
+
+MAX_CONCURRENCY = 12   # requests in flight across all halls
+
+
+class AsyncScrapeEngine:
+    def __init__(self, max_concurrency: int = MAX_CONCURRENCY,
+                 request_timeout: float = REQUEST_TIMEOUT, deadline: float = SCRAPE_DEADLINE,
+                 archive=None):
+        self.max_concurrency = max_concurrency
+        self.request_timeout = request_timeout
+        self.deadline = deadline
+        self.archive = archive
+
+    async def _fetch(self, url: str, validators, ends_at: float):
+        """One page, or the exception that stopped it."""
+        async with self._slots:
+            timeout = min(self.request_timeout, ends_at - time.monotonic())
+            if timeout <= 0:
+                return TimeoutError(f"Scrape deadline exceeded before fetching {url}")
+            loop = asyncio.get_running_loop()
+            try:
+                return await asyncio.wait_for(
+                    loop.run_in_executor(self._http_pool, fetch_page, url, validators, timeout),
+                    timeout,
+                )
+            except asyncio.TimeoutError:
+                return TimeoutError(f"Timed out after {timeout:.1f}s fetching {url}")
+            except Exception as e:
+                return e
+
+    async def scrape_hall(self, hall_name: str, validators: dict | None = None, on_date=None) -> dict:
+        """The get_hall_snapshot dict for one hall, each round's pages fetched concurrently."""
+        ends_at = time.monotonic() + self.deadline
+        steps = snapshot_steps(hall_name, validators, on_date=on_date, archive=self.archive)
+        loop = asyncio.get_running_loop()
+        # the generator decodes and projects pages of several MB between rounds; off the event loop
+        request, snapshot = await loop.run_in_executor(self._parse_pool, _advance, steps, None)
+        while request is not None:
+            urls = list(request)
+            pages = await asyncio.gather(*(self._fetch(u, request[u], ends_at) for u in urls))
+            request, snapshot = await loop.run_in_executor(self._parse_pool, _advance, steps,
+                                                           dict(zip(urls, pages)))
+        return snapshot
+
+    async def _produce(self, target: tuple, validators: dict | None, queue: asyncio.Queue):
+        hall_name, on_date = target
+        started = time.monotonic()
+        try:
+            snapshot = await self.scrape_hall(hall_name, validators, on_date)
+        except Exception as e:
+            snapshot = e
+        await queue.put((target, snapshot, time.monotonic() - started))
+
+    async def run(self, targets: list[tuple], import_snapshot, validators_by_target: dict | None = None) -> dict:
+        """
+        Scrape (hall, date) `targets` concurrently and call import_snapshot(hall_name,
+        snapshot) for each one as soon as it is fetched. Imports run one at a time on
+        their own thread, so the callback may use the Django ORM.
+
+        Returns {target: {"result": return value or exception, "fetch_seconds": ...}}.
+        """
+        validators_by_target = validators_by_target or {}
+        self._slots = asyncio.Semaphore(self.max_concurrency)
+        self._http_pool = ThreadPoolExecutor(max_workers=self.max_concurrency,
+                                             thread_name_prefix="scrape-http")
+        # parsing is CPU bound, so one thread does it as fast as several would under the GIL
+        self._parse_pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix="scrape-parse")
+        import_pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix="scrape-import")
+        queue = asyncio.Queue()
+        loop = asyncio.get_running_loop()
+        results = {}
+        try:
+            producers = [
+                asyncio.create_task(self._produce(target, validators_by_target.get(target), queue))
+                for target in targets
+            ]
+            for _ in producers:
+                target, snapshot, fetch_seconds = await queue.get()
+                if isinstance(snapshot, Exception):
+                    result = snapshot
+                else:
+                    try:
+                        result = await loop.run_in_executor(import_pool, import_snapshot, target[0], snapshot)
+                    except Exception as e:
+                        result = e
+                results[target] = {"result": result, "fetch_seconds": fetch_seconds}
+            await asyncio.gather(*producers)
+        finally:
+            self._http_pool.shutdown(wait=False, cancel_futures=True)
+            self._parse_pool.shutdown(wait=False, cancel_futures=True)
+            import_pool.submit(connections.close_all)
+            import_pool.shutdown(wait=True)
+        return results
+
+
+def _advance(steps, pages: dict | None):
+    """
+    Run a snapshot_steps generator to its next round: (request, None), or (None,
+    snapshot) once it returns. StopIteration can't cross an executor future.
+    """
+    try:
+        return (next(steps) if pages is None else steps.send(pages)), None
+    except StopIteration as done:
+        return None, done.value
+
+
+def scrape_all(targets: list[tuple], import_snapshot, validators_by_target: dict | None = None,
+               **engine_options) -> dict:
+    """Synchronous entry point for AsyncScrapeEngine.run."""
+    engine = AsyncScrapeEngine(**engine_options)
+    return asyncio.run(engine.run(targets, import_snapshot, validators_by_target))
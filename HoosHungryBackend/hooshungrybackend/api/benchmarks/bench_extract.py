@@ -0,0 +1,70 @@
+"""
+Micro-benchmarks for pulling the embedded model: object out of a CampusDish page.
+
+    python manage.py test api.benchmarks.bench_extract
+
+Every file in ohill_dumps/ is wrapped in a page shaped like the real site (script
+block up front, ~200 KB of trailing markup) and extracted with both the old
+regex + brace-counting extractor and scrapers.extract_model.
+"""
+import json
+import re
+import statistics
+import time
+
+from django.test import SimpleTestCase
+
+from api.scrapers import extract_model
+from api.standin import DUMPS_DIR, PAGE_TEMPLATE
+
+ROUNDS = 15
+TRAILING_MARKUP = "<div class=\"footer\"><a href=\"#\">{link}</a></div>\n" * 4000
+
+
+def legacy_extract_model(html: str) -> dict:
+    """The extractor scrapers.get_model_from_html used before the single-pass decoder."""
+    m = re.search(r'model\s*:\s*({.*})', html, re.DOTALL)
+    if not m:
+        raise RuntimeError("Could not find 'model:' in page")
+    obj_text = m.group(1)
+    depth = 0
+    for i, c in enumerate(obj_text):
+        if c == '{':
+            depth += 1
+        elif c == '}':
+            depth -= 1
+            if depth == 0:
+                obj_text = obj_text[:i+1]
+                break
+    return json.loads(obj_text)
+
+
+def dump_pages() -> dict:
+    pages = {}
+    for path in sorted(DUMPS_DIR.glob("*.json")):
+        model_text = path.read_text()
+        page = PAGE_TEMPLATE.format(model=model_text, hours="[]") + TRAILING_MARKUP
+        pages[path.name] = page
+    return pages
+
+
+def _median_ms(fn, page, rounds=ROUNDS) -> float:
+    samples = []
+    for _ in range(rounds):
+        start = time.perf_counter()
+        fn(page)
+        samples.append(time.perf_counter() - start)
+    return statistics.median(samples) * 1000
+
+
+class ModelExtractionBenchmark(SimpleTestCase):
+
+    def test_extract_dump_pages(self):
+        print()
+        print(f"{'page':<28} {'size':>9} {'legacy':>9} {'single-pass':>12} {'speedup':>8}")
+        for name, page in dump_pages().items():
+            self.assertEqual(extract_model(page), legacy_extract_model(page))
+            legacy_ms = _median_ms(legacy_extract_model, page)
+            new_ms = _median_ms(extract_model, page)
+            print(f"{name:<28} {len(page) / 1024:>7.0f}KB {legacy_ms:>7.1f}ms "
+                  f"{new_ms:>10.1f}ms {legacy_ms / new_ms:>7.2f}x")
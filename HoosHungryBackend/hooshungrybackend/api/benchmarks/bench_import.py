@@ -0,0 +1,245 @@
+"""
+Import benchmark: the saved ohill dump written row by row (the importer before
+bulk writes) and with api.importers' one-bulk_create-per-table path, same-day
+refreshes, what a week of menus costs with the product catalog, and how long
+the hall row stays locked.
+
+    python manage.py test api.benchmarks.bench_import
+
+Both run against the test database, so absolute times are SQLite's; the query
+counts carry over to Postgres, where every query is also a network round trip.
+"""
+import json
+from collections import Counter
+import statistics
+import time
+from datetime import datetime, timedelta
+from unittest import mock
+from decimal import Decimal, InvalidOperation
+
+from django.db import connection, transaction
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.utils.dateparse import parse_time
+
+from api import importers
+from api.importers import DayRows, add_period_to_day, load_menu_data
+from api.models import Allergen, Day, DiningHall, MenuItem, NutritionInfo, Period, Product, Station
+from api.payloads import project_menu
+from api.standin import DUMPS_DIR
+
+ROUNDS = 3
+
+
+def legacy_update_dining_hall(hall: DiningHall, data: dict, hours: dict):
+    """The importer before bulk writes (one or more queries per row), on today's schema."""
+    date_obj = datetime.strptime(data["date"], "%m/%d/%Y").date()
+    with transaction.atomic():
+        DiningHall.objects.select_for_update().get(pk=hall.pk)
+        Day.objects.filter(dining_hall=hall, date=date_obj).delete()
+        day = Day.objects.create(date=date_obj, day_name="", open_time=hours["open_time"],
+                                 close_time=hours["close_time"], dining_hall=hall)
+        for period_id, block in data["periods"].items():
+            period = Period.objects.create(
+                name=block["name"], vendor_id=period_id, day=day,
+                start_time=parse_time(hours["periods"][period_id]["start_time"]),
+                end_time=parse_time(hours["periods"][period_id]["end_time"]),
+            )
+            menu = block["menu"]
+            stations = {
+                s.station_id: Station.objects.create(name=s.name, number=s.station_id, period=period)
+                for s in menu.stations if s.period_id == period_id
+            }
+            for record in menu.products:
+                station = stations.get(record.station_id)
+                if not station:
+                    continue
+                product, _ = Product.objects.update_or_create(
+                    vendor_id=record.product_id,
+                    defaults={
+                        "item_name": record.name or "Unnamed Item",
+                        "item_description": record.description or "",
+                        "ingredients": record.ingredients,
+                        "is_vegan": bool(record.filters.get("IsVegan", False)),
+                        "is_vegetarian": bool(record.filters.get("IsVegetarian", False)),
+                        "is_gluten": not bool(record.filters.get("IsGlutenFree", True)),
+                    },
+                )
+                MenuItem.objects.create(station=station, product=product)
+                for key, value in record.filters.items():
+                    if value is True and key.startswith("Contains") and key.replace("Contains", ""):
+                        allergen, _ = Allergen.objects.get_or_create(name=key.replace("Contains", ""))
+                        product.allergens.add(allergen)
+                if record.allergen_statement and "information is not available" in record.allergen_statement.lower():
+                    allergen, _ = Allergen.objects.get_or_create(name="Information Not Available")
+                    product.allergens.add(allergen)
+                info, _ = NutritionInfo.objects.get_or_create(product=product)
+                if record.serving_size and record.serving_unit:
+                    info.serving_size = f"{record.serving_size} {record.serving_unit}"
+                for name, value in record.nutrition:
+                    if name and hasattr(info, name.lower().replace(" ", "_")):
+                        try:
+                            setattr(info, name.lower().replace(" ", "_"), Decimal(value))
+                        except (InvalidOperation, ValueError, TypeError):
+                            pass
+                info.save()
+
+
+def load_dump() -> tuple[dict, dict]:
+    with open(DUMPS_DIR / "ohill_raw_09-17-2025.json") as f:
+        data = json.load(f)
+    data["periods"] = {
+        pid: {"name": block["name"], "menu": project_menu(block["raw"])}
+        for pid, block in data["periods"].items()
+    }
+    hours = {
+        "open_time": "07:00",
+        "close_time": "23:59",
+        "periods": {pid: {"start_time": "07:00", "end_time": "10:30"} for pid in data["periods"]},
+    }
+    return data, hours
+
+
+class ImportBenchmark(TestCase):
+
+    def measure(self, fn) -> tuple[int, float]:
+        """Queries of one import into an empty day, and the median time of a re-import."""
+        with CaptureQueriesContext(connection) as queries:
+            fn()
+        samples = []
+        for _ in range(ROUNDS):
+            start = time.perf_counter()
+            fn()
+            samples.append(time.perf_counter() - start)
+        return len(queries), statistics.median(samples)
+
+    def test_bulk_vs_row_by_row(self):
+        data, hours = load_dump()
+        hall = DiningHall.objects.create(name="ohill", scrape_url="https://example.com/")
+        legacy_queries, legacy_s = self.measure(lambda: legacy_update_dining_hall(hall, data, hours))
+
+        def rebuild():
+            # same work as the legacy importer: replace the whole day
+            Day.objects.filter(dining_hall=hall).delete()
+            load_menu_data("ohill", data, hours)
+
+        bulk_queries, bulk_s = self.measure(rebuild)
+        self.assertEqual(MenuItem.objects.count(), 397)
+
+        print()
+        print(f"{'importer':>12} {'queries':>8} {'seconds':>8}")
+        print(f"{'row by row':>12} {legacy_queries:>8} {legacy_s:>8.3f}")
+        print(f"{'bulk':>12} {bulk_queries:>8} {bulk_s:>8.3f}")
+        print(f"{'speedup':>12} {legacy_queries / bulk_queries:>7.1f}x {legacy_s / bulk_s:>7.1f}x")
+
+    def test_same_day_refresh(self):
+        data, hours = load_dump()
+        with CaptureQueriesContext(connection) as queries:
+            start = time.perf_counter()
+            load_menu_data("ohill", data, hours)
+            first_s = time.perf_counter() - start
+        first_queries = len(queries)
+
+        unchanged_queries, unchanged_s = self.measure(lambda: load_menu_data("ohill", data, hours))
+
+        products = data["periods"]["1421"]["menu"].products
+        names = [p.name for p in products[:5]]
+
+        def refresh_five():
+            for product, name in zip(products, names):
+                product.name = name if product.name != name else f"{name} (updated)"
+            load_menu_data("ohill", data, hours)
+
+        changed_queries, changed_s = self.measure(refresh_five)
+
+        print()
+        print(f"{'import':>16} {'queries':>8} {'seconds':>8}")
+        print(f"{'new day':>16} {first_queries:>8} {first_s:>8.3f}")
+        print(f"{'unchanged':>16} {unchanged_queries:>8} {unchanged_s:>8.3f}")
+        print(f"{'5 items changed':>16} {changed_queries:>8} {changed_s:>8.3f}")
+
+    def test_week_of_menus(self):
+        """Rows stored and written for 7 days x 3 halls of the same dishes."""
+        data, hours = load_dump()
+        written = []
+        for hall in ("ohill", "newcomb", "runk"):
+            for i in range(7):
+                day = datetime(2025, 9, 17) + timedelta(days=i)
+                with CaptureQueriesContext(connection) as queries:
+                    changes = load_menu_data(hall, {**data, "date": day.strftime("%m/%d/%Y")}, hours)
+                written.append((len(changes.created["Product"]), len(changes.created["MenuItem"]), len(queries)))
+
+        def value_bytes(queryset) -> int:
+            """Size of the stored values, as text."""
+            return sum(len(str(v)) for row in queryset.values_list() for v in row if v is not None)
+
+        Links = Product.allergens.through
+        occurrences = MenuItem.objects.count()
+        per_product = {
+            pid: value_bytes(Product.objects.filter(pk=pid)) for pid in Product.objects.values_list("pk", flat=True)
+        }
+        nutrition = dict(NutritionInfo.objects.values_list("product_id", "pk"))
+        nutrition_bytes = {pid: value_bytes(NutritionInfo.objects.filter(pk=nid)) for pid, nid in nutrition.items()}
+        links = Counter(Links.objects.values_list("product_id", flat=True))
+        item_bytes = value_bytes(MenuItem.objects.all())
+
+        # before the catalog: a wide MenuItem, a NutritionInfo and allergen links per occurrence
+        occurrence_products = list(MenuItem.objects.values_list("product_id", flat=True))
+        occurrence_links = sum(links[pid] for pid in occurrence_products)
+        legacy_rows = occurrences * 2 + occurrence_links
+        legacy_bytes = item_bytes + sum(per_product[pid] + nutrition_bytes[pid] for pid in occurrence_products) \
+            + value_bytes(Links.objects.all()) * occurrence_links // max(Links.objects.count(), 1)
+        catalog_rows = occurrences + len(per_product) + len(nutrition) + Links.objects.count()
+        catalog_bytes = item_bytes + sum(per_product.values()) + sum(nutrition_bytes.values()) \
+            + value_bytes(Links.objects.all())
+
+        steady_products, steady_items, steady_queries = written[-1]
+        legacy_day = occurrences // len(written)
+        legacy_day_rows = legacy_day * 2 + occurrence_links // len(written)
+        catalog_day_rows = steady_items + steady_products * 2  # menu items, new products and their nutrition
+        print()
+        print(f"{'21 hall-days':>22} {'per occurrence':>15} {'catalog':>9} {'ratio':>7}")
+        print(f"{'menu rows stored':>22} {legacy_rows:>15} {catalog_rows:>9} {legacy_rows / catalog_rows:>6.1f}x")
+        print(f"{'menu bytes stored':>22} {legacy_bytes:>15} {catalog_bytes:>9} {legacy_bytes / catalog_bytes:>6.1f}x")
+        print(f"{'rows written, new day':>22} {legacy_day_rows:>15} {catalog_day_rows:>9} "
+              f"{legacy_day_rows / catalog_day_rows:>6.1f}x")
+        print(f"first import created {written[0][0]} products; a steady-state day creates "
+              f"{steady_products} products and {steady_items} menu items in {steady_queries} queries")
+
+    def test_lock_window(self):
+        """How long the hall row is locked for a new day: writing it under the lock vs swapping it in."""
+        data, hours = load_dump()
+        hall = DiningHall.objects.create(name="ohill", scrape_url="https://example.com/")
+
+        def under_lock(on_date):
+            # the importer before shadow builds: every row written while the hall is locked
+            rows = DayRows()
+            for period_id, block in data["periods"].items():
+                add_period_to_day(period_id, block, hours, None, rows)
+            rows.sync_products(importers.ChangeSet())
+            with transaction.atomic():
+                start = time.perf_counter()
+                DiningHall.objects.select_for_update().get(pk=hall.pk)
+                day = Day.objects.create(date=on_date, open_time="07:00", close_time="23:59", dining_hall=hall)
+                rows.insert(day, importers.ChangeSet())
+                return time.perf_counter() - start
+
+        held = []
+        publish_day = importers.publish_day
+
+        def timed_publish(day):
+            start = time.perf_counter()
+            published = publish_day(day)
+            held.append(time.perf_counter() - start)
+            return published
+
+        before = statistics.median(under_lock(datetime(2025, 10, i + 1).date()) for i in range(ROUNDS))
+        with mock.patch.object(importers, "publish_day", timed_publish):
+            for i in range(ROUNDS):
+                load_menu_data("ohill", {**data, "date": f"11/{i + 1:02d}/2025"}, hours)
+        after = statistics.median(held)
+
+        print()
+        print(f"{'new day':>14} {'lock held ms':>13}")
+        print(f"{'under lock':>14} {before * 1000:>13.2f}")
+        print(f"{'shadow + swap':>14} {after * 1000:>13.2f}")
@@ -0,0 +1,102 @@
+"""
+Peak RSS of a full three-hall scrape, with and without payload projection.
+
+    python manage.py test api.benchmarks.bench_memory
+
+Each variant runs in a fresh spawned process against the local stand-in and keeps
+all three halls' results alive at the end, the way scrape_menus holds them until
+import. "raw" reproduces the old combined dict (base_model_raw plus every decoded
+period payload); "projected" is scrapers.get_hall_snapshot. A second test reports
+the Python heap the results retain, measured with tracemalloc.
+"""
+import multiprocessing
+import tracemalloc
+
+from unittest import mock
+
+from django.test import SimpleTestCase
+
+from api.standin import CampusDishStandin
+
+HALLS = ("ohill", "newcomb", "runk")
+
+
+def raw_menu_data(url: str) -> dict:
+    from api import scrapers
+
+    base_model = scrapers.extract_model(scrapers.fetch_html(url))
+    period_ids = [str(p["PeriodId"]) for p in base_model["Menu"]["MenuPeriods"]]
+    pages = scrapers.fetch_pages([f"{url}?periodId={pid}" for pid in period_ids])
+    return {
+        "base_model_raw": base_model,
+        "periods": {pid: {"raw": scrapers.extract_model(pages[f"{url}?periodId={pid}"].text)}
+                    for pid in period_ids},
+    }
+
+
+def _vm_hwm_kb() -> int:
+    """Peak RSS of this process. ru_maxrss is inherited across fork/exec on Linux, VmHWM is not."""
+    with open("/proc/self/status") as f:
+        for line in f:
+            if line.startswith("VmHWM:"):
+                return int(line.split()[1])
+    raise RuntimeError("VmHWM not available")
+
+
+def _scrape_child(mode: str, url_map: dict, results):
+    from api import scrapers
+
+    scrapers.URL_MAP.update(url_map)
+    if mode == "raw":
+        held = [raw_menu_data(url_map[h]) for h in HALLS]
+    elif mode == "projected":
+        held = [scrapers.get_hall_snapshot(h) for h in HALLS]
+    else:
+        held = []
+    results.put(_vm_hwm_kb())
+    del held
+
+
+def peak_rss_kb(mode: str, url_map: dict) -> int:
+    ctx = multiprocessing.get_context("spawn")
+    results = ctx.Queue()
+    child = ctx.Process(target=_scrape_child, args=(mode, url_map, results))
+    child.start()
+    peak = results.get(timeout=120)
+    child.join()
+    return peak
+
+
+class ScrapeMemoryBenchmark(SimpleTestCase):
+
+    def test_peak_rss_three_halls(self):
+        with CampusDishStandin(halls=HALLS) as standin:
+            url_map = standin.url_map()
+            idle = peak_rss_kb("idle", url_map)
+            raw = peak_rss_kb("raw", url_map)
+            projected = peak_rss_kb("projected", url_map)
+
+        print()
+        print(f"{'variant':<10} {'peak RSS':>10} {'over idle':>10}")
+        for name, kb in (("idle", idle), ("raw", raw), ("projected", projected)):
+            print(f"{name:<10} {kb / 1024:>8.1f}MB {(kb - idle) / 1024:>8.1f}MB")
+        self.assertLess(projected, raw)
+
+    def test_retained_heap_three_halls(self):
+        from api import scrapers
+
+        print()
+        print(f"{'variant':<10} {'retained':>10} {'peak':>10}")
+        with CampusDishStandin(halls=HALLS) as standin:
+            url_map = standin.url_map()
+            for name in ("raw", "projected"):
+                with mock.patch.dict(scrapers.URL_MAP, url_map):
+                    tracemalloc.start()
+                    if name == "raw":
+                        held = [raw_menu_data(url_map[h]) for h in HALLS]
+                    else:
+                        held = [scrapers.get_hall_snapshot(h) for h in HALLS]
+                    retained, peak = tracemalloc.get_traced_memory()
+                    tracemalloc.stop()
+                    del held
+                print(f"{name:<10} {retained / 2**20:>8.1f}MB {peak / 2**20:>8.1f}MB")
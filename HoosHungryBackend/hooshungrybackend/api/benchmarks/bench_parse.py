@@ -0,0 +1,132 @@
+"""
+Parse cost of the importer's in-memory pass: projected CampusDish records turned
+into the unsaved rows of a day, per 1,000 products, before and after indexing
+each period's payload once and mapping nutrient names to fields up front.
+
+    python manage.py test api.benchmarks.bench_parse
+
+Nothing is written to the database; only add_period_to_day and what it calls are
+timed, so the numbers are the CPU cost that sits in front of every import.
+"""
+import cProfile
+import io
+import pstats
+import statistics
+import time
+from decimal import Decimal, InvalidOperation
+
+from django.test import SimpleTestCase
+
+from api import importers
+from api.benchmarks.bench_import import load_dump
+from api.importers import DayRows, add_period_to_day
+from api.models import Day, MenuItem, NutritionInfo, Period, Product, Station
+
+ROUNDS = 20
+
+
+def legacy_add_stations(menu, period_id, period_obj, rows):
+    """The period pass before index_menu: every product checked against the station map."""
+    station_objs = {}
+    for station in menu.stations:
+        if station.period_id == period_id:
+            station_objs[station.station_id] = Station(name=station.name, number=station.station_id, period=period_obj)
+            rows.stations.append(station_objs[station.station_id])
+    for product in menu.products:
+        station_obj = station_objs.get(product.station_id)
+        if not station_obj:
+            continue
+        item_name = product.name or "Unnamed Item"
+        vendor_id = product.product_id or f"name:{item_name}"[:50]
+        if vendor_id not in rows.products:
+            legacy_add_product(vendor_id, item_name, product, rows)
+        rows.menu_items.append(MenuItem(station=station_obj, product=rows.products[vendor_id]))
+
+
+def legacy_add_product(vendor_id, item_name, product, rows):
+    """add_product before NUTRIENT_FIELDS: a hasattr and two string rewrites per nutrient."""
+    filters = product.filters
+    rows.products[vendor_id] = product_obj = Product(
+        vendor_id=vendor_id, item_name=item_name, item_description=product.description or "",
+        ingredients=product.ingredients, is_vegan=bool(filters.get("IsVegan", False)),
+        is_vegetarian=bool(filters.get("IsVegetarian", False)), is_gluten=not bool(filters.get("IsGlutenFree", True)),
+    )
+    allergens = rows.product_allergens[vendor_id] = set()
+    for key, value in filters.items():
+        if value is True and key.startswith("Contains") and key.replace("Contains", ""):
+            allergens.add(key.replace("Contains", ""))
+    if product.allergen_statement and "information is not available" in product.allergen_statement.lower():
+        allergens.add("Information Not Available")
+
+    nutrition_info = rows.nutrition[vendor_id] = NutritionInfo(product=product_obj)
+    if product.serving_size and product.serving_unit:
+        nutrition_info.serving_size = f"{product.serving_size} {product.serving_unit}"
+    for name, value in product.nutrition:
+        if name and hasattr(nutrition_info, name.lower().replace(" ", "_")):
+            try:
+                setattr(nutrition_info, name.lower().replace(" ", "_"), Decimal(value))
+            except (InvalidOperation, ValueError, TypeError):
+                pass
+
+
+class ParseBenchmark(SimpleTestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.data, cls.hours = load_dump()
+        cls.day = Day(date=None, day_name="", open_time=None, close_time=None)
+
+    def legacy(self) -> DayRows:
+        rows = DayRows()
+        for period_id, block in self.data["periods"].items():
+            period = Period(name=block["name"], vendor_id=period_id, day=self.day)
+            legacy_add_stations(block["menu"], period_id, period, rows)
+        return rows
+
+    def current(self) -> DayRows:
+        rows = DayRows()
+        for period_id, block in self.data["periods"].items():
+            add_period_to_day(period_id, block, self.hours, self.day, rows)
+        return rows
+
+    def per_thousand(self, fn) -> tuple[float, int]:
+        """Median milliseconds per 1,000 products read from the payload."""
+        products = sum(len(block["menu"].products) for block in self.data["periods"].values())
+        samples = []
+        for _ in range(ROUNDS):
+            start = time.perf_counter()
+            fn()
+            samples.append(time.perf_counter() - start)
+        return statistics.median(samples) * 1000 * 1000 / products, products
+
+    def test_parse_cost_per_thousand_products(self):
+        legacy, current = self.legacy(), self.current()
+        self.assertEqual(len(legacy.menu_items), len(current.menu_items))
+        self.assertEqual(
+            {vid: {f: getattr(n, f) for f in importers.NUTRITION_FIELDS} for vid, n in legacy.nutrition.items()},
+            {vid: {f: getattr(n, f) for f in importers.NUTRITION_FIELDS} for vid, n in current.nutrition.items()},
+        )
+
+        legacy_ms, products = self.per_thousand(self.legacy)
+        current_ms, _ = self.per_thousand(self.current)
+        print()
+        print(f"{products} products in the payload, {len(current.menu_items)} menu items, "
+              f"{len(current.products)} catalog products")
+        print(f"{'parse':>8} {'ms/1k products':>15}")
+        print(f"{'before':>8} {legacy_ms:>15.2f}")
+        print(f"{'after':>8} {current_ms:>15.2f}")
+        print(f"{'speedup':>8} {legacy_ms / current_ms:>14.1f}x")
+
+    def test_profile(self):
+        """Top functions by own time, for each path."""
+        for label, fn in (("before", self.legacy), ("after", self.current)):
+            profile = cProfile.Profile()
+            profile.enable()
+            for _ in range(ROUNDS):
+                fn()
+            profile.disable()
+            out = io.StringIO()
+            pstats.Stats(profile, stream=out).sort_stats("tottime").print_stats(8)
+            print(f"\n{label}:")
+            print("\n".join(line for line in out.getvalue().splitlines() if line.strip()[:1].isdigit()))
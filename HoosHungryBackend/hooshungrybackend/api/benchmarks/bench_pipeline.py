@@ -0,0 +1,55 @@
+"""
+End-to-end scrape throughput against the local CampusDish stand-in: every hall
+downloaded, decoded and imported by scrape_menus, as the scheduler runs it.
+
+    python manage.py test api.benchmarks.bench_pipeline
+
+The scraper is pointed at the stand-in through hall_urls, the same way
+CAMPUSDISH_BASE_URL does it, so nothing here touches the network.
+"""
+import time
+from io import StringIO
+from unittest import mock
+
+from django.core.management import call_command
+from django.test import TransactionTestCase
+
+from api import scrapers
+from api.models import Day
+from api.standin import CampusDishStandin
+
+LATENCIES = (0.0, 0.05, 0.2)
+JITTER = 0.25          # extra latency, as a share of the base latency
+ERROR_RATE = 0.05
+
+
+class ScrapePipelineBenchmark(TransactionTestCase):
+
+    def run_scrape(self, standin, engine: str) -> tuple[float, int]:
+        with mock.patch.dict(scrapers.URL_MAP, scrapers.hall_urls(standin.base_url)):
+            start = time.perf_counter()
+            call_command("scrape_menus", "--force", "--no-archive", "--engine", engine,
+                         stdout=StringIO(), stderr=StringIO())
+            return time.perf_counter() - start, Day.objects.count()
+
+    def test_scrape_and_import_throughput(self):
+        print()
+        print(f"{'latency':>8} {'engine':>8} {'seconds':>8} {'pages/s':>8} {'halls':>6}")
+        for latency in LATENCIES:
+            with CampusDishStandin(latency=latency, jitter=latency * JITTER, seed=1) as standin:
+                for engine in ("threads", "async"):
+                    standin.requests.clear()
+                    seconds, halls = self.run_scrape(standin, engine)
+                    self.assertEqual(halls, 3)
+                    print(f"{latency * 1000:>6.0f}ms {engine:>8} {seconds:>8.2f} "
+                          f"{len(standin.requests) / seconds:>8.1f} {halls:>6}")
+
+    def test_throughput_with_injected_failures(self):
+        print()
+        print(f"{'engine':>8} {'seconds':>8} {'requests':>9} {'faults':>7} {'halls':>6}")
+        for engine in ("threads", "async"):
+            Day.objects.all().delete()
+            with CampusDishStandin(latency=0.05, error_rate=ERROR_RATE, seed=3) as standin:
+                seconds, halls = self.run_scrape(standin, engine)
+            print(f"{engine:>8} {seconds:>8.2f} {len(standin.requests):>9} "
+                  f"{sum(standin.faults.values()):>7} {halls:>6}")
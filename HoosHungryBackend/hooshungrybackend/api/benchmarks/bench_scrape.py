@@ -0,0 +1,88 @@
+"""
+Scrape fetch benchmark against the local CampusDish stand-in.
+
+    python manage.py test api.benchmarks.bench_scrape
+
+Compares the old one-page-at-a-time fetch (fresh requests.get per page) with
+get_menu_data's pooled, concurrent period fetching, at a few simulated latencies.
+"""
+import statistics
+import time
+from unittest import mock
+
+import requests
+from django.test import SimpleTestCase
+
+from api import scrapers
+from api.payloads import menu_hash, project_menu
+from api.standin import CampusDishStandin
+
+ROUNDS = 3
+LATENCIES = (0.0, 0.05, 0.2)
+
+
+def serial_menu_data(url: str) -> dict:
+    """The pre-pooling fetch path: base page, then each period page in turn."""
+    def fetch(u):
+        r = requests.get(u, timeout=30)
+        r.raise_for_status()
+        return scrapers.extract_model(r.text)
+
+    base_model = fetch(url)
+    periods = {}
+    for p in base_model["Menu"]["MenuPeriods"]:
+        pid = str(p["PeriodId"])
+        periods[pid] = {"name": p.get("Name"), "raw": fetch(f"{url}?periodId={pid}")}
+    return {"date": base_model.get("Date", ""), "periods": periods}
+
+
+def _time(fn, rounds=ROUNDS) -> float:
+    samples = []
+    for _ in range(rounds):
+        start = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - start)
+    return statistics.median(samples)
+
+
+class ScrapeFetchBenchmark(SimpleTestCase):
+
+    def test_pooled_concurrent_vs_serial(self):
+        print()
+        print(f"{'latency':>8} {'serial':>10} {'pooled':>10} {'speedup':>8}")
+        for latency in LATENCIES:
+            with CampusDishStandin(latency=latency) as standin, \
+                    mock.patch.dict(scrapers.URL_MAP, standin.url_map()):
+                url = standin.url_for("ohill")
+                serial = serial_menu_data(url)
+                pooled = scrapers.get_menu_data("ohill")
+                self.assertEqual(set(serial["periods"]), set(pooled["periods"]))
+                for pid, block in pooled["periods"].items():
+                    self.assertEqual(menu_hash(block["menu"]),
+                                     menu_hash(project_menu(serial["periods"][pid]["raw"])))
+
+                serial_s = _time(lambda: serial_menu_data(url))
+                pooled_s = _time(lambda: scrapers.get_menu_data("ohill"))
+            print(f"{latency * 1000:>6.0f}ms {serial_s * 1000:>8.1f}ms "
+                  f"{pooled_s * 1000:>8.1f}ms {serial_s / pooled_s:>7.2f}x")
+
+
+class AllHallsEngineBenchmark(SimpleTestCase):
+    """Three halls: one after another (threads engine) vs the asyncio engine."""
+
+    HALLS = ("ohill", "newcomb", "runk")
+
+    def test_async_engine_vs_sequential_halls(self):
+        from api.async_scrapers import scrape_all
+
+        print()
+        print(f"{'latency':>8} {'one page':>10} {'sequential':>11} {'async':>10} {'speedup':>8}")
+        for latency in LATENCIES[1:]:
+            with CampusDishStandin(halls=self.HALLS, latency=latency) as standin, \
+                    mock.patch.dict(scrapers.URL_MAP, standin.url_map()):
+                one_page = _time(lambda: scrapers.fetch_html(standin.url_for("ohill")))
+                sequential = _time(lambda: [scrapers.get_hall_snapshot(h) for h in self.HALLS])
+                concurrent = _time(lambda: scrape_all([(h, None) for h in self.HALLS],
+                                                      lambda hall, snapshot: None))
+            print(f"{latency * 1000:>6.0f}ms {one_page * 1000:>8.1f}ms {sequential * 1000:>9.1f}ms "
+                  f"{concurrent * 1000:>8.1f}ms {sequential / concurrent:>7.2f}x")
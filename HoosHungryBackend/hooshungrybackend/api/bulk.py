@@ -0,0 +1,102 @@
+"""
+Bulk inserts for the menu importer, with a PostgreSQL fast path.
+
+bulk_insert(model, objs) is a drop-in for model.objects.bulk_create(objs). On
+PostgreSQL, batches of COPY_MIN_ROWS or more skip the per-row INSERT machinery:
+primary keys are reserved from the table's sequence in one query and assigned in
+Python, and the rows are streamed with COPY FROM STDIN,
+
+    straight into the table when nothing can conflict (a new day's periods,
+    stations and menu items), or
+
+    into a temporary staging table and merged with one
+    INSERT ... SELECT ... ON CONFLICT DO NOTHING when ignore_conflicts is set
+    (catalog products, their nutrition and allergen links, which another import
+    may have written meanwhile).
+
+Everywhere else, and for small batches, it is bulk_create.
+"""
+import io
+from datetime import date, datetime, time
+from decimal import Decimal
+
+from django.db import connection, transaction
+
+COPY_MIN_ROWS = 100
+
+
+def bulk_insert(model, objs: list, ignore_conflicts: bool = False) -> list:
+    """
+    Insert `objs` like bulk_create. Without ignore_conflicts every object gets its
+    primary key; with it, as with bulk_create on PostgreSQL, none do.
+    """
+    if connection.vendor != "postgresql" or len(objs) < COPY_MIN_ROWS:
+        return model.objects.bulk_create(objs, ignore_conflicts=ignore_conflicts)
+
+    meta = model._meta
+    fields = meta.concrete_fields
+    table = connection.ops.quote_name(meta.db_table)
+    columns = ", ".join(connection.ops.quote_name(f.column) for f in fields)
+
+    with transaction.atomic(), connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT nextval(pg_get_serial_sequence(%s, %s)) FROM generate_series(1, %s)",
+            [meta.db_table, meta.pk.column, len(objs)],
+        )
+        for obj, (pk,) in zip(objs, cursor.fetchall()):
+            obj.pk = pk
+
+        rows = []
+        for obj in objs:
+            obj._prepare_related_fields_for_save(operation_name="bulk_insert")
+            rows.append([f.get_db_prep_save(f.pre_save(obj, True), connection) for f in fields])
+        data = copy_text(rows)
+
+        if not ignore_conflicts:
+            _copy(cursor, f"COPY {table} ({columns}) FROM STDIN", data)
+        else:
+            # qualified, so a table of that name elsewhere on the search_path is never touched
+            stage = "pg_temp." + connection.ops.quote_name(f"stage_{meta.db_table}")
+            cursor.execute(f"DROP TABLE IF EXISTS {stage}")
+            cursor.execute(f"CREATE TEMPORARY TABLE {stage} (LIKE {table} INCLUDING DEFAULTS) ON COMMIT DROP")
+            _copy(cursor, f"COPY {stage} ({columns}) FROM STDIN", data)
+            cursor.execute(f"INSERT INTO {table} ({columns}) SELECT {columns} FROM {stage} ON CONFLICT DO NOTHING")
+
+    for obj in objs:
+        if ignore_conflicts:
+            obj.pk = None
+        else:
+            obj._state.adding = False
+            obj._state.db = connection.alias
+    return objs
+
+
+def _copy(cursor, sql: str, data: str):
+    """Stream `data` through COPY ... FROM STDIN with psycopg 3 or psycopg2."""
+    raw = cursor.cursor
+    if hasattr(raw, "copy"):
+        with raw.copy(sql) as copy:
+            copy.write(data)
+    else:
+        raw.copy_expert(sql, io.StringIO(data))
+
+
+_ESCAPES = str.maketrans({"\\": "\\\\", "\t": "\\t", "\n": "\\n", "\r": "\\r"})
+
+
+def copy_value(value) -> str:
+    """One value in COPY's text format."""
+    if value is None:
+        return "\\N"
+    if isinstance(value, bool):
+        return "t" if value else "f"
+    if isinstance(value, (date, datetime, time)):
+        return value.isoformat()
+    if isinstance(value, (int, float, Decimal)):
+        return str(value)
+    return str(value).translate(_ESCAPES)
+
+
+def copy_text(rows) -> str:
+    """Rows of values as the tab separated text COPY FROM STDIN reads."""
+    return "".join("\t".join(map(copy_value, row)) + "\n" for row in rows)
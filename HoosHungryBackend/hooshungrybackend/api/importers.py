@@ -1,11 +1,38 @@
-from django.db import transaction
+from django.db import connection, transaction
+from django.db.models import DecimalField, Exists, OuterRef
 from django.utils.dateparse import parse_date
 from django.utils.dateparse import parse_time
-from datetime import datetime
-from .models import DiningHall, Day, Period, Station, Allergen, MenuItem, NutritionInfo
+import hashlib
+from collections import defaultdict
+from functools import partial
+from datetime import date, datetime
+from .models import (
+    DiningHall, Day, Period, Station, Allergen, Product, MenuItem, NutritionInfo, ScrapeState, MenuSnapshot,
+)
+from .bulk import bulk_insert
+from .menu_cache import bump_menu_generation
+from .payloads import index_menu, project_menu
+from .snapshots import render_snapshots
 from decimal import Decimal, InvalidOperation
 
-def load_menu_data(hall_name: str, data: dict, hours: dict):
+def load_menu_data(hall_name: str, data: dict, hours: dict) -> "ChangeSet":
+    hall = get_dining_hall(hall_name)
+    changes = update_dining_hall(hall, data, hours)
+    on_date = datetime.strptime(data["date"], "%m/%d/%Y").date()
+    if changes or not MenuSnapshot.objects.filter(hall=hall_name, date=on_date).exists():
+        write_snapshots(hall, on_date)
+    stale_halls = set()
+    if changes.updated["Product"]:
+        # sync_products updates in place only what no other day served; one may have started meanwhile
+        stale_halls = refresh_snapshots_serving(changes.updated["Product"], exclude=(hall.pk, on_date))
+    if changes:
+        stale_halls.add(hall_name)
+    # cached menu responses of these halls are out of date now
+    for name in sorted(stale_halls):
+        bump_menu_generation(name)
+    return changes
+
+def get_dining_hall(hall_name: str) -> DiningHall:
     if hall_name not in ["ohill", "newcomb", "runk"]:
         raise ValueError("Invalid dining hall name")
 
@@ -24,138 +51,674 @@ def load_menu_data(hall_name: str, data: dict, hours: dict):
             name="runk",
             defaults={"scrape_url": "https://virginia.campusdish.com/en/locationsandmenus/runk/"}
         )
-    
-    update_dining_hall(hall, data, hours)
+    return hall
 
-def update_dining_hall(hall: DiningHall, data: dict, hours: dict):
+def update_dining_hall(hall: DiningHall, data: dict, hours: dict) -> "ChangeSet":
+    """
+    Import one day of a hall. A change to the published day is written in place,
+    so rows that didn't change keep their ids: a small one in one transaction
+    under the day's lock, a bigger one in batches of IN_PLACE_LIMIT rows, each
+    under the lock. A new day is built as a pending day that readers never see,
+    then published by swapping a flag under the lock. Either way the lock is held
+    for milliseconds at a time however large the menu is.
+    """
     # Parse the date
     date_str = data["date"]  # e.g., "09/16/2024"
     date_obj = datetime.strptime(date_str, "%m/%d/%Y").date()
     day_name = date_obj.strftime("%A")
 
+    # Build every row of the day in memory first
+    rows = DayRows(hall.name)
+    for period_id, period_data in data["periods"].items():
+        add_period_to_day(period_id, period_data, hours, None, rows)
+
+    changes = ChangeSet()
     with transaction.atomic():
-        # Lock the hall row so concurrent scrapers wait instead of colliding
-        DiningHall.objects.select_for_update().get(pk=hall.pk)
+        rows.sync_products(changes, hall, date_obj)
 
-        # Delete existing day data for this date and hall to avoid duplicates
-        Day.objects.filter(dining_hall=hall, date=date_obj).delete()
+    with transaction.atomic():
+        # Concurrent imports of this hall and date wait instead of colliding
+        lock_day(hall.pk, date_obj)
+        day_obj = Day.objects.published().filter(dining_hall=hall, date=date_obj).first()
+        diff = rows.diff(day_obj) if day_obj is not None else None
+        if diff is not None:
+            update_hours(day_obj, hours, changes)
+            if len(diff) <= IN_PLACE_LIMIT:
+                diff.apply(changes)
+                return changes
 
-        # Create a new day entry
-        day_obj = Day.objects.create(
+    if diff is not None:
+        # Too big for one short lock; readers may see the day half updated until the last batch
+        diff.apply(changes, batch_size=IN_PLACE_LIMIT)
+        return changes
+
+    # No lock while the pending day is written; readers see no day until it is published
+    with transaction.atomic():
+        pending = Day.objects.create(
             date=date_obj,
             day_name=day_name,
             open_time=hours["open_time"],
             close_time=hours["close_time"],
-            dining_hall=hall
+            dining_hall=hall,
+            is_published=False,
         )
+        rows.insert(pending, changes)
+    if not publish_day(pending):
+        # an import of this day that started later has a newer menu; it wins
+        with transaction.atomic():
+            pending.delete()
+        for model in ("Period", "Station", "MenuItem"):
+            changes.created.pop(model, None)
+        return changes
+    purge_superseded_days(hall, date_obj)
+    return changes
+
+
+def update_hours(day: Day, hours: dict, changes: "ChangeSet"):
+    """Write the hall's opening hours onto `day` if they changed."""
+    if (day.open_time, day.close_time) != (parse_time(hours["open_time"]), parse_time(hours["close_time"])):
+        day.open_time = hours["open_time"]
+        day.close_time = hours["close_time"]
+        day.save(update_fields=["open_time", "close_time"])
+        changes.updated["Day"].append(day.pk)
+
+
+# Rows an in-place update writes in one transaction; bigger ones are split in batches this size
+IN_PLACE_LIMIT = 50
+
+
+def publish_day(day: Day) -> bool:
+    """
+    Make `day` the published day of its hall and date, retiring the one it
+    replaces. Refused (False) when a day created after it, pending or published,
+    exists: that import started later, so an older menu must not replace it.
+    """
+    with transaction.atomic():
+        lock_day(day.dining_hall_id, day.date)
+        if Day.objects.filter(dining_hall_id=day.dining_hall_id, date=day.date, pk__gt=day.pk).exists():
+            return False
+        Day.objects.published().filter(dining_hall_id=day.dining_hall_id, date=day.date) \
+            .update(is_published=False)
+        Day.objects.filter(pk=day.pk).update(is_published=True)
+    day.is_published = True
+    return True
+
+
+def lock_day(hall_id: int, on_date):
+    """
+    Lock one hall's day until the transaction ends. PostgreSQL takes an advisory
+    lock on (hall, date), so imports of other halls and dates go ahead; other
+    databases lock the hall row.
+    """
+    if connection.vendor == "postgresql":
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT pg_advisory_xact_lock(%s::integer, %s::integer)", [hall_id, on_date.toordinal()])
+    else:
+        DiningHall.objects.select_for_update().get(pk=hall_id)
+
+
+def write_snapshots(hall: DiningHall, on_date) -> int:
+    """
+    Replace the menu snapshots of a hall/day with renderings of its published
+    day; returns how many were written. Rendering takes no lock. Under the day's
+    lock the snapshots are only swapped, and not at all if another import
+    published a different day meanwhile: that import writes its own.
+    """
+    day_pk, snapshots = render_snapshots(hall, on_date)
+    with transaction.atomic():
+        lock_day(hall.pk, on_date)
+        published = Day.objects.published().filter(dining_hall=hall, date=on_date).values_list("pk", flat=True)
+        if published.first() != day_pk:
+            return 0
+        MenuSnapshot.objects.filter(hall=hall.name, date=on_date).delete()
+        MenuSnapshot.objects.bulk_create(snapshots)
+    return len(snapshots)
+
+
+def refresh_snapshots_serving(product_ids: list, exclude: tuple = None) -> set:
+    """
+    Re-render the snapshots of the published days serving any of `product_ids`
+    from today on, and drop those of earlier days, which are rarely asked for
+    again; menu_info renders them on request until their next import.
+    `exclude` is a (hall id, date) whose snapshots are already current. Returns
+    the names of the halls serving the products.
+    """
+    served = set(
+        Day.objects.published().filter(periods__stations__menu_items__product_id__in=product_ids)
+        .values_list("dining_hall_id", "date")
+    )
+    halls = DiningHall.objects.in_bulk({hall_id for hall_id, _ in served})
+    serving = {hall.name for hall in halls.values()}
+    served.discard(exclude)
+    today = date.today()
+    past = defaultdict(list)
+    for hall_id, on_date in sorted(served):
+        if on_date >= today:
+            write_snapshots(halls[hall_id], on_date)
+        else:
+            past[halls[hall_id].name].append(on_date)
+    for hall_name, dates in past.items():
+        MenuSnapshot.objects.filter(hall=hall_name, date__in=dates).delete()
+    return serving
+
+
+def purge_superseded_days(hall: DiningHall = None, on_date=None) -> int:
+    """
+    Delete unpublished days older than the published day of their hall and date:
+    days a newer import replaced, pending days of imports that never finished, and
+    pending days publish_day refused. Pending days newer than the published one may
+    still be publishing and are kept; once one publishes, the ones before it go.
+    """
+    newer = Day.objects.published().filter(
+        dining_hall=OuterRef("dining_hall"), date=OuterRef("date"), pk__gt=OuterRef("pk")
+    )
+    stale = Day.objects.filter(is_published=False).filter(Exists(newer))
+    if hall is not None:
+        stale = stale.filter(dining_hall=hall)
+    if on_date is not None:
+        stale = stale.filter(date=on_date)
+    deleted = 0
+    for pk in stale.values_list("pk", flat=True):
+        # one day per transaction keeps each delete short
+        with transaction.atomic():
+            deleted += Day.objects.filter(pk=pk).delete()[1].get("api.Day", 0)
+    return deleted
+
+
+class ChangeSet:
+    """Primary keys an import created, updated and deleted, by model name."""
+
+    def __init__(self):
+        self.created = defaultdict(list)
+        self.updated = defaultdict(list)
+        self.deleted = defaultdict(list)
+
+    def __len__(self):
+        return sum(len(pks) for changes in (self.created, self.updated, self.deleted) for pks in changes.values())
+
+    def __str__(self):
+        parts = []
+        for model in ("Product", "Period", "Station", "MenuItem"):
+            counts = [f"{len(changes[model])} {verb}"
+                      for verb, changes in (("created", self.created), ("updated", self.updated),
+                                            ("deleted", self.deleted)) if changes[model]]
+            if counts:
+                parts.append(f"{model}: {', '.join(counts)}")
+        return "; ".join(parts) or "no changes"
+
+
+PERIOD_FIELDS = ("name", "start_time", "end_time")
+STATION_FIELDS = ("name",)
+PRODUCT_FIELDS = ("item_name", "item_description", "ingredients", "is_gluten", "is_vegan", "is_vegetarian")
+NUTRITION_FIELDS = tuple(
+    f.name for f in NutritionInfo._meta.concrete_fields if f.name not in ("id", "product")
+)
+
+
+def _stored_value(obj, name: str):
+    """A field value as the database will hand it back, e.g. decimals rounded to their places."""
+    value = getattr(obj, name)
+    field = obj._meta.get_field(name)
+    if isinstance(value, Decimal) and isinstance(field, DecimalField):
+        value = value.quantize(Decimal(1).scaleb(-field.decimal_places))
+    return value
+
+
+def _changed_fields(new, old, fields) -> list:
+    return [f for f in fields if _stored_value(new, f) != _stored_value(old, f)]
+
+
+class _Writes:
+    """Rows to insert and to update, per model, collected while matching."""
+
+    def __init__(self):
+        self.creates = defaultdict(list)
+        self.updates = defaultdict(list)  # model: [(obj, changed field names)]
+        self.matched = []                 # (new, old) pairs
+
+    def __len__(self):
+        return sum(map(len, self.creates.values())) + sum(map(len, self.updates.values()))
+
+    def match(self, new, old, fields) -> bool:
+        """Pair `new` with the stored `old`; True when a field differs."""
+        if old is None:
+            self.creates[type(new)].append(new)
+            return False
+        self.matched.append((new, old))
+        changed = _changed_fields(new, old, fields)
+        if changed:
+            self.updates[type(new)].append((new, changed))
+        return bool(changed)
+
+    def adopt(self):
+        """Give every matched row the primary key of its stored twin."""
+        for new, old in self.matched:
+            new.pk = old.pk
+            new._state.adding = False
+
+    def update(self, model):
+        _bulk_update(model, self.updates[model])
+
+
+def _bulk_update(model, changed: list):
+    """Write (obj, changed field names) pairs with one bulk_update."""
+    if changed:
+        model.objects.bulk_update([obj for obj, _ in changed], sorted({f for _, fields in changed for f in fields}))
+
+
+def _delete(model, pks: list):
+    model.objects.filter(pk__in=pks).delete()
+
+
+def _batches(items: list, size: int | None) -> list:
+    """`items` in lists of at most `size`; all in one without a size."""
+    if size is None:
+        return [items] if items else []
+    return [items[i:i + size] for i in range(0, len(items), size)]
+
+
+class DayRows:
+    """
+    One imported day: its periods, stations and menu items, plus the catalog
+    products they serve (by CampusDish ProductId) with nutrition and allergens.
+    """
+
+    def __init__(self, hall_name: str = ""):
+        self.hall_name = hall_name   # scopes the ids of products CampusDish sends without one
+        self.periods = []
+        self.stations = []
+        self.menu_items = []
+        self.products = {}           # vendor id: Product
+        self.nutrition = {}          # vendor id: NutritionInfo
+        self.product_allergens = {}  # vendor id: {allergen name}
+        self.nutrients = {}          # NutritionalTree (name, value): parse_nutrient's result
+
+    def diff(self, day: Day) -> "DayDiff":
+        """
+        Match these rows against the stored day without writing anything. Periods
+        are matched on their vendor id, stations on their number within a period and
+        menu items on their product within a station.
+        """
+        old_periods = {p.vendor_id: p for p in Period.objects.filter(day=day)}
+        old_stations = {
+            (s.period.vendor_id, s.number): s
+            for s in Station.objects.filter(period__day=day).select_related("period")
+        }
+        old_items = defaultdict(list)
+        for item in (MenuItem.objects.filter(station__period__day=day)
+                     .select_related("station__period", "product").order_by("id")):
+            # the product may have been retired as "<ProductId>@<id>" by this import's sync_products
+            product_id = item.product.vendor_id.partition("@")[0]
+            old_items[(item.station.period.vendor_id, item.station.number, product_id)].append(item)
+
+        writes = _Writes()
+        for period in self.periods:
+            writes.match(period, old_periods.pop(period.vendor_id, None), PERIOD_FIELDS)
+        for station in self.stations:
+            writes.match(station, old_stations.pop((station.period.vendor_id, station.number), None), STATION_FIELDS)
+        for item in self.menu_items:
+            candidates = old_items.get((item.station.period.vendor_id, item.station.number, item.product.vendor_id))
+            writes.match(item, candidates.pop(0) if candidates else None, ("product",))
+        return DayDiff(day, self, writes, old_periods, old_stations, old_items)
+
+    def insert(self, day: Day, changes: ChangeSet):
+        """Write every row of the day as new, under `day`, with one bulk insert per table."""
+        for period in self.periods:
+            period.day = day
+        for model, objs in ((Period, self.periods), (Station, self.stations), (MenuItem, self.menu_items)):
+            bulk_insert(model, objs)
+            changes.created[model.__name__] = [obj.pk for obj in objs]
 
-        # Loop through periods and add them to Day
-        for period_id, period_data in data["periods"].items():
-            add_period_to_day(period_id, period_data, hours, day_obj)
+    def sync_products(self, changes: ChangeSet, hall: DiningHall = None, on_date=None):
+        """
+        Insert products seen for the first time and bring the ones CampusDish
+        changed up to date. A changed product other days (than this hall's
+        `on_date`) serve is not touched: it is renamed "<ProductId>@<id>" and this
+        import inserts a new version under the ProductId, so every day keeps
+        showing what it served. One no other day serves is updated in place.
+        """
+        vendor_ids = list(self.products)
+        old_products = {
+            p.vendor_id: p
+            for p in Product.objects.filter(vendor_id__in=vendor_ids).select_related("nutrition_info")
+        }
+        old_allergens = defaultdict(set)
+        Through = Product.allergens.through
+        for product_id, name in Through.objects.filter(product__vendor_id__in=vendor_ids) \
+                .values_list("product_id", "allergen__name"):
+            old_allergens[product_id].add(name)
 
-def add_period_to_day(period_id, period_data: dict, hours: dict, day: Day):
+        changed = {}  # vendor id: stored product whose name, flags, nutrition or allergens differ
+        for vendor_id, product in self.products.items():
+            old = old_products.get(vendor_id)
+            if old is None:
+                continue
+            old_nutrition = getattr(old, "nutrition_info", None)
+            if (_changed_fields(product, old, PRODUCT_FIELDS)
+                    or (old_nutrition is not None
+                        and _changed_fields(self.nutrition[vendor_id], old_nutrition, NUTRITION_FIELDS))
+                    or self.product_allergens[vendor_id] != old_allergens[old.pk]):
+                changed[vendor_id] = old
+        served_elsewhere = MenuItem.objects.filter(product__in=list(changed.values()))
+        if hall is not None:
+            served_elsewhere = served_elsewhere.exclude(
+                station__period__day__dining_hall=hall, station__period__day__date=on_date
+            )
+        served_elsewhere = set(served_elsewhere.values_list("product_id", flat=True).distinct()) if changed else set()
+
+        writes = _Writes()
+        relink = []
+        retired = []
+        for vendor_id, product in self.products.items():
+            old = old_products.get(vendor_id)
+            if old is not None and old.pk in served_elsewhere:
+                # a new version; the old one stays with the days that served it
+                old.vendor_id = f"{vendor_id}@{old.pk}"
+                retired.append(old)
+                old = None
+            writes.match(product, old, PRODUCT_FIELDS)
+            if old is None:
+                continue
+            writes.match(self.nutrition[vendor_id], getattr(old, "nutrition_info", None), NUTRITION_FIELDS)
+            if self.product_allergens[vendor_id] != old_allergens[old.pk]:
+                relink.append(product)
+            if vendor_id in changed:
+                changes.updated["Product"].append(old.pk)
+        if retired:
+            Product.objects.bulk_update(retired, ["vendor_id"])
+
+        writes.adopt()
+        new_products = writes.creates[Product]
+        if new_products:
+            # another import may add the same product meanwhile; read ids back either way
+            bulk_insert(Product, new_products, ignore_conflicts=True)
+            ids = dict(Product.objects.filter(vendor_id__in=[p.vendor_id for p in new_products])
+                       .values_list("vendor_id", "id"))
+            for product in new_products:
+                product.pk = ids[product.vendor_id]
+            changes.created["Product"] = [p.pk for p in new_products]
+        writes.update(Product)
+
+        nutrition = [self.nutrition[p.vendor_id] for p in new_products] + writes.creates[NutritionInfo]
+        bulk_insert(NutritionInfo, nutrition, ignore_conflicts=True)
+        if nutrition:
+            # inserts ignoring conflicts leave primary keys unset; read back what is stored
+            changes.created["NutritionInfo"] = list(
+                NutritionInfo.objects.filter(product__in=[n.product for n in nutrition]).values_list("pk", flat=True)
+            )
+        writes.update(NutritionInfo)
+        if writes.updates[NutritionInfo]:
+            changes.updated["NutritionInfo"] = [n.pk for n, _ in writes.updates[NutritionInfo]]
+
+        # Allergen links of new products, and of products whose allergens changed
+        if relink:
+            stale = Through.objects.filter(product_id__in=[p.pk for p in relink])
+            changes.deleted[Through.__name__] = list(stale.values_list("pk", flat=True))
+            stale.delete()
+        pairs = [(p, name) for p in new_products + relink for name in self.product_allergens[p.vendor_id]]
+        allergen_ids = get_allergen_ids(dict.fromkeys(name for _, name in pairs))
+        links = {(p.pk, allergen_ids[name]) for p, name in pairs}
+        bulk_insert(
+            Through,
+            [Through(product_id=product_id, allergen_id=allergen_id) for product_id, allergen_id in sorted(links)],
+            ignore_conflicts=True,
+        )
+        if links:
+            changes.created[Through.__name__] = list(
+                Through.objects.filter(product_id__in={product_id for product_id, _ in links})
+                .values_list("pk", flat=True)
+            )
+
+
+class DayDiff:
+    """What making a stored day match a DayRows takes: rows to insert, update and delete."""
+
+    def __init__(self, day, rows, writes, old_periods, old_stations, old_items):
+        self.day = day
+        self.rows = rows
+        self.writes = writes
+        self.removed_periods = [p.pk for p in old_periods.values()]
+        self.removed_stations = [s.pk for s in old_stations.values()]
+        self.removed_items = [item.pk for items in old_items.values() for item in items]
+
+    def __len__(self):
+        return len(self.writes) + len(self.removed_periods) + len(self.removed_stations) + len(self.removed_items)
+
+    def apply(self, changes: ChangeSet, batch_size: int = None):
+        """
+        Write the difference: matched rows keep their primary key and are only
+        written when a field changed, new rows go in with bulk inserts, primary
+        keys flowing from each table into the next. Rows are removed children
+        first and inserted parents first, so with a `batch_size` every write can
+        be its own transaction of at most that many rows, under the day's lock.
+        Without one, everything runs in the caller's transaction.
+        """
+        writes = self.writes
+        writes.adopt()
+        for period in self.rows.periods:
+            period.day = self.day
+
+        steps = []
+        for model, pks in ((MenuItem, self.removed_items), (Station, self.removed_stations),
+                           (Period, self.removed_periods)):
+            steps += [partial(_delete, model, batch) for batch in _batches(pks, batch_size)]
+        for model in (Period, Station, MenuItem):
+            steps += [partial(bulk_insert, model, batch) for batch in _batches(writes.creates[model], batch_size)]
+            steps += [partial(_bulk_update, model, batch) for batch in _batches(writes.updates[model], batch_size)]
+        for step in steps:
+            if batch_size is None:
+                step()
+                continue
+            with transaction.atomic():
+                lock_day(self.day.dining_hall_id, self.day.date)
+                step()
+
+        for model in (Period, Station, MenuItem):
+            changes.created[model.__name__] = [obj.pk for obj in writes.creates[model]]
+            changes.updated[model.__name__] = [obj.pk for obj, _ in writes.updates[model]]
+        changes.deleted["Period"] = self.removed_periods
+        changes.deleted["Station"] = self.removed_stations
+        changes.deleted["MenuItem"] = self.removed_items
+
+
+def get_allergen_ids(names) -> dict:
+    """{name: Allergen id}, creating the allergens seen for the first time."""
+    names = list(names)
+    if not names:
+        return {}
+    ids = dict(Allergen.objects.filter(name__in=names).values_list("name", "id"))
+    missing = [Allergen(name=name) for name in names if name not in ids]
+    if missing:
+        # another import may add the same allergen meanwhile; read ids back either way
+        Allergen.objects.bulk_create(missing, ignore_conflicts=True)
+        ids.update(Allergen.objects.filter(name__in=[a.name for a in missing]).values_list("name", "id"))
+    return ids
+
+
+def add_period_to_day(period_id, period_data: dict, hours: dict, day: Day, rows: DayRows):
     period_name = period_data["name"]
     vendor_id = period_id
     start_time = hours["periods"][period_id]["start_time"]
     end_time = hours["periods"][period_id]["end_time"]
 
-    period_obj = Period.objects.create(
+    period_obj = Period(
         name=period_name,
         vendor_id=vendor_id,
         start_time=parse_time(start_time),
         end_time=parse_time(end_time),
         day=day
     )
+    rows.periods.append(period_obj)
 
-    station_data = period_data["raw"]["Menu"]["MenuStations"]
-    product_data = period_data["raw"]["Menu"]["MenuProducts"]
-    
-    add_stations_to_period(station_data, product_data, period_id, period_data, period_obj)
+    # Scrapers hand over projected records; raw CampusDish payloads are projected here
+    menu = period_data.get("menu")
+    if menu is None and period_data.get("raw") is not None:
+        menu = project_menu(period_data["raw"])
+    if menu is None:
+        raise ValueError(f"No menu payload for period {period_id}")
+
+    add_stations_to_period(index_menu(menu, period_id), period_obj, rows)
     
-def add_stations_to_period(station_data: list, product_data: list, period_id: str, data: dict, period_obj: Period):
-    # Create all stations for this period
-    station_objs = {}
-    for station in station_data:
-        if station["PeriodId"] == period_id:
-            station_obj = Station.objects.create(
-                name=station["Name"],
-                number=station["StationId"],
-                period=period_obj
-            )
-            station_objs[station["StationId"]] = station_obj
-            
-    add_menu_items_to_station(station_objs, product_data)
+def add_stations_to_period(stations: list, period_obj: Period, rows: DayRows):
+    # Create all stations for this period, each with the products it serves
+    for station, products in stations:
+        station_obj = Station(
+            name=station.name,
+            number=station.station_id,
+            period=period_obj
+        )
+        rows.stations.append(station_obj)
+        add_menu_items_to_station(station_obj, products, rows)
 
-def add_menu_items_to_station(station_objs: dict, product_data: list):
+def add_menu_items_to_station(station_obj: Station, product_data: list, rows: DayRows):
     for product in product_data:
-        station_id = product["StationId"]
-        station_obj = station_objs.get(station_id)
-        if not station_obj:
-            continue  # Station not found, skip this product
-        prod_info = product.get("Product")
-        if not prod_info:
-            continue  # No product info available, skip
-        item_name = prod_info.get("MarketingName") or "Unnamed Item"
-        item_description = prod_info.get("ShortDescription") or ""
-
-        # Create MenuItem and link to Station
-        menu_item = MenuItem.objects.create(
-            item_name=item_name,
-            item_description=item_description,
-            station=station_obj
-        )
+        item_name = product.name or "Unnamed Item"
+        vendor_id = product.product_id or unlisted_vendor_id(rows.hall_name, station_obj.number, item_name)
 
-        # Allergens from AvailableFilters (e.g., ContainsEggs)
-        available_filters = prod_info.get("AvailableFilters", {})
-        for filter_key, value in available_filters.items():
-            if value is True and filter_key.startswith("Contains"):
-                allergen_name = filter_key.replace("Contains", "")
-                if allergen_name:
-                    allergen_obj, _ = Allergen.objects.get_or_create(name=allergen_name)
-                    menu_item.allergens.add(allergen_obj)
-        
-        allergen_statement = prod_info.get("AllergenStatement", "")
-        if allergen_statement and "information is not available" in allergen_statement.lower():
-            allergen_obj, _ = Allergen.objects.get_or_create(name="Information Not Available")
-            menu_item.allergens.add(allergen_obj)
+        # The product goes to the catalog once per day, however many stations serve it
+        if vendor_id not in rows.products:
+            add_product(vendor_id, item_name, product, rows)
+        rows.menu_items.append(MenuItem(station=station_obj, product=rows.products[vendor_id]))
 
-        # Ingredients from IngredientStatement
-        menu_item.ingredients = prod_info.get("IngredientStatement", "")
+def unlisted_vendor_id(hall_name: str, station_number: str, item_name: str) -> str:
+    """
+    Catalog id of a dish CampusDish sent without a ProductId. Vendor ids are
+    shared by every hall, so it is scoped to the hall and station serving it, and
+    the whole name is hashed: dishes of one name elsewhere, or names sharing a
+    long prefix, stay separate products.
+    """
+    digest = hashlib.sha1(item_name.encode()).hexdigest()[:16]
+    return f"name:{hall_name}/{station_number}/{digest}"[:50]
+
+
+def add_product(vendor_id: str, item_name: str, product, rows: DayRows):
+    item_description = product.description or ""
+    available_filters = product.filters
 
-        # Dietary flags from AvailableFilters
-        menu_item.is_vegan = bool(available_filters.get("IsVegan", False))
-        menu_item.is_vegetarian = bool(available_filters.get("IsVegetarian", False))
+    # Product with dietary flags from AvailableFilters
+    rows.products[vendor_id] = product_obj = Product(
+        vendor_id=vendor_id,
+        item_name=item_name,
+        item_description=item_description,
+        # Ingredients from IngredientStatement
+        ingredients=product.ingredients,
+        is_vegan=bool(available_filters.get("IsVegan", False)),
+        is_vegetarian=bool(available_filters.get("IsVegetarian", False)),
         # is_gluten means "contains gluten" — opposite of IsGlutenFree
-        menu_item.is_gluten = not bool(available_filters.get("IsGlutenFree", True))
-
-        menu_item.save()
-
-        # NutritionInfo from NutritionalTree
-        nutritional_tree = prod_info.get("NutritionalTree", [])
-        nutrition_info = NutritionInfo.objects.create(menu_item=menu_item)
-
-        serv_size = prod_info.get("ServingSize")
-        serv_unit = prod_info.get("ServingUnit")
-
-        # Only set if one or both exist
-        if serv_size and serv_unit:
-            combined = f"{serv_size or ''} {serv_unit or ''}".strip()
-            nutrition_info.serving_size = combined
-        
-        def parse_nutrition(tree):
-            for entry in tree:
-                name = entry.get("Name")
-                value = entry.get("Value")
-                # Set as attribute if matches NutritionInfo fields
-                if name and hasattr(nutrition_info, name.lower().replace(" ", "_")):
-                    try:
-                        setattr(nutrition_info, name.lower().replace(" ", "_"), Decimal(value))
-                    except (InvalidOperation, ValueError, TypeError):
-                        pass
-                # Recursively parse sublists
-                sublist = entry.get("SubList")
-                if sublist: 
-                    parse_nutrition(sublist)
-        
-        parse_nutrition(nutritional_tree)
-        nutrition_info.save()
\ No newline at end of file
+        is_gluten=not bool(available_filters.get("IsGlutenFree", True)),
+    )
+
+    # Allergens from AvailableFilters (e.g., ContainsEggs)
+    allergens = rows.product_allergens[vendor_id] = set()
+    for filter_key, value in available_filters.items():
+        if value is True and filter_key.startswith("Contains"):
+            allergen_name = filter_key.replace("Contains", "")
+            if allergen_name:
+                allergens.add(allergen_name)
+
+    allergen_statement = product.allergen_statement
+    if allergen_statement and "information is not available" in allergen_statement.lower():
+        allergens.add("Information Not Available")
+
+    # NutritionInfo from NutritionalTree
+    nutritional_tree = product.nutrition
+    nutrition_info = NutritionInfo(product=product_obj)
+
+    serv_size = product.serving_size
+    serv_unit = product.serving_unit
+
+    # Only set if one or both exist
+    if serv_size and serv_unit:
+        combined = f"{serv_size or ''} {serv_unit or ''}".strip()
+        nutrition_info.serving_size = combined
+
+    # NutritionalTree pairs repeat across a day's products, so each is converted once
+    for pair in nutritional_tree:
+        parsed = rows.nutrients.get(pair)
+        if parsed is None:
+            parsed = rows.nutrients[pair] = parse_nutrient(*pair)
+        if parsed is not _NOT_A_FIELD:
+            setattr(nutrition_info, *parsed)
+    rows.nutrition[vendor_id] = nutrition_info
+
+
+# NutritionalTree names are matched to NutritionInfo fields: "Total Fat" -> total_fat
+NUTRIENT_FIELDS = frozenset(NUTRITION_FIELDS)
+_NOT_A_FIELD = ()
+
+
+def parse_nutrient(name, value) -> tuple:
+    """(field, Decimal) for one NutritionalTree entry, or _NOT_A_FIELD to skip it."""
+    if not name:
+        return _NOT_A_FIELD
+    field = name.lower().replace(" ", "_")
+    if field not in NUTRIENT_FIELDS:
+        return _NOT_A_FIELD
+    try:
+        return (field, Decimal(value))
+    except (InvalidOperation, ValueError, TypeError):
+        return _NOT_A_FIELD
+
+# CHANGE DETECTION:
+
+
+def get_scrape_validators(hall_name: str, on_date) -> dict:
+    """
+    Conditional request validators saved by the last scrape, keyed like
+    snapshot["pages"]. Every page of that scrape is listed, with empty validators
+    if it sent none, so the scraper knows which pages it can't ask for a 304.
+    None while the day is missing from the database (deleted, or its import
+    failed), so its pages are fetched in full and it is imported again.
+    """
+    if on_date is not None and not Day.objects.published().filter(dining_hall__name=hall_name, date=on_date).exists():
+        return {}
+    states = ScrapeState.objects.filter(dining_hall__name=hall_name, date=on_date)
+    return {s.period_id: {"etag": s.etag, "last_modified": s.last_modified} for s in states}
+
+
+def halls_without_menu(on_date, halls=("ohill", "newcomb", "runk")) -> list:
+    """Halls with no published day for `on_date`, e.g. because no scrape ran since midnight."""
+    stored = set(
+        Day.objects.published().filter(date=on_date, dining_hall__name__in=halls)
+        .values_list("dining_hall__name", flat=True)
+    )
+    return [h for h in halls if h not in stored]
+
+
+def unchanged_pages(hall_name: str, on_date, snapshot: dict) -> set:
+    """
+    Page keys of a hall snapshot whose content matches what was last imported.
+    Nothing counts as unchanged while the scraped day is missing from the database.
+    """
+    if snapshot["unchanged"]:
+        menu_date = on_date
+    else:
+        menu_date = datetime.strptime(snapshot["menu"]["date"], "%m/%d/%Y").date()
+    if menu_date is not None and \
+            not Day.objects.published().filter(dining_hall__name=hall_name, date=menu_date).exists():
+        return set()
+    if snapshot["unchanged"]:
+        return set(snapshot["pages"])
+    stored = dict(
+        ScrapeState.objects.filter(dining_hall__name=hall_name, date=on_date)
+        .values_list("period_id", "content_hash")
+    )
+    return {
+        key for key, page in snapshot["pages"].items()
+        if page["hash"] and stored.get(key) == page["hash"]
+    }
+
+
+def save_scrape_state(hall_name: str, on_date, snapshot: dict):
+    """Remember validators and content hashes of an imported (or unchanged) snapshot."""
+    hall = DiningHall.objects.get(name=hall_name)
+    with transaction.atomic():
+        ScrapeState.objects.filter(dining_hall=hall, date=on_date) \
+            .exclude(period_id__in=list(snapshot["pages"])).delete()
+        for key, page in snapshot["pages"].items():
+            defaults = {"etag": page["etag"], "last_modified": page["last_modified"]}
+            if page["hash"]:
+                defaults["content_hash"] = page["hash"]
+            ScrapeState.objects.update_or_create(
+                dining_hall=hall, date=on_date, period_id=key, defaults=defaults
+            )
@@ -0,0 +1,119 @@
+"""
+Where a scrape's time goes: per hall/day wall time of each stage, bytes
+downloaded, SQL queries and rows written, summed into a ScrapeRun.
+
+    fetch    waiting on CampusDish pages           (from the snapshot's "stats")
+    extract  finding and decoding the model: JSON  (from the snapshot's "stats")
+    parse    projecting payloads into records      (from the snapshot's "stats")
+    import   change detection and database writes  (HallMetrics.stage)
+
+scrape_menus keeps one HallMetrics per hall/day, prints the run as one line of
+JSON and saves it with record_scrape_run.
+"""
+import time
+from contextlib import contextmanager
+
+from django.db import connection
+
+from .models import ScrapeRun
+
+STAGES = ("fetch", "extract", "parse", "import")
+
+
+class QueryCounter:
+    """connection.execute_wrapper that counts the queries run through it."""
+
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        self.count += 1
+        return execute(sql, params, many, context)
+
+
+class HallMetrics:
+    def __init__(self, hall: str, on_date):
+        self.hall = hall
+        self.date = on_date
+        self.result = ""
+        self.seconds = dict.fromkeys(STAGES, 0.0)
+        self.requests = 0
+        self.bytes_downloaded = 0
+        self.queries = 0
+        self.rows = {"inserted": 0, "updated": 0, "deleted": 0}
+
+    def add_snapshot(self, snapshot: dict):
+        stats = snapshot.get("stats") or {}
+        for stage in ("fetch", "extract", "parse"):
+            self.seconds[stage] += stats.get(f"{stage}_seconds", 0.0)
+        self.requests += stats.get("requests", 0)
+        self.bytes_downloaded += stats.get("bytes_downloaded", 0)
+
+    def add_failure(self, error: Exception):
+        """What a scrape that raised `error` fetched before it failed (snapshot_steps' partial stats)."""
+        self.add_snapshot({"stats": getattr(error, "stats", None)})
+
+    @contextmanager
+    def stage(self, name: str):
+        """Time a stage run on this thread's connection, and count its queries."""
+        counter = QueryCounter()
+        started = time.perf_counter()
+        try:
+            with connection.execute_wrapper(counter):
+                yield
+        finally:
+            self.seconds[name] += time.perf_counter() - started
+            self.queries += counter.count
+
+    def add_changes(self, changes):
+        """Rows an importer ChangeSet wrote."""
+        for key, pks in (("inserted", changes.created), ("updated", changes.updated), ("deleted", changes.deleted)):
+            self.rows[key] += sum(len(v) for v in pks.values())
+
+    def finish(self, result: str) -> dict:
+        """Record how the hall/day ended; returns as_dict()."""
+        self.result = result
+        return self.as_dict()
+
+    def as_dict(self) -> dict:
+        return {
+            "hall": self.hall,
+            "date": str(self.date) if self.date else None,
+            "result": self.result,
+            "seconds": {stage: round(s, 4) for stage, s in self.seconds.items()},
+            "requests": self.requests,
+            "bytes_downloaded": self.bytes_downloaded,
+            "queries": self.queries,
+            "rows": dict(self.rows),
+        }
+
+
+def summarize(started_at, seconds: float, engine: str, halls: list[dict]) -> dict:
+    """The JSON summary of a run; `halls` are HallMetrics.as_dict() results."""
+    return {
+        "started_at": started_at.isoformat(),
+        "seconds": round(seconds, 3),
+        "engine": engine,
+        "targets": len(halls),
+        "errors": sum(1 for h in halls if h["result"].startswith("error")),
+        "bytes_downloaded": sum(h["bytes_downloaded"] for h in halls),
+        "queries": sum(h["queries"] for h in halls),
+        "rows": {key: sum(h["rows"][key] for h in halls) for key in ("inserted", "updated", "deleted")},
+        "halls": halls,
+    }
+
+
+def record_scrape_run(summary: dict) -> ScrapeRun:
+    return ScrapeRun.objects.create(
+        started_at=summary["started_at"],
+        seconds=summary["seconds"],
+        engine=summary["engine"],
+        targets=summary["targets"],
+        errors=summary["errors"],
+        bytes_downloaded=summary["bytes_downloaded"],
+        queries=summary["queries"],
+        rows_inserted=summary["rows"]["inserted"],
+        rows_updated=summary["rows"]["updated"],
+        rows_deleted=summary["rows"]["deleted"],
+        halls=summary["halls"],
+    )
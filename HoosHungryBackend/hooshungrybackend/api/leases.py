@@ -0,0 +1,91 @@
+"""
+Leader election through the database, so exactly one run_worker across every
+host runs the scheduled scrapes.
+
+The leader holds a SchedulerLease row and renews it every few seconds; the
+others keep trying to take it and succeed once it expires, so a leader that
+dies is replaced within LEASE_SECONDS. Taking and renewing is one conditional
+UPDATE on the database's clock, which every database serializes, so hosts with
+skewed clocks still agree.
+
+    election = LeaderElection()
+    if election.renew():
+        ...  # this process is the leader until the lease runs out
+"""
+import os
+import socket
+import uuid
+from datetime import timedelta
+
+from django.db import DatabaseError, IntegrityError, close_old_connections, transaction
+from django.db.models import DateTimeField, ExpressionWrapper, Q
+from django.db.models.functions import Now
+import logging
+
+from .models import SchedulerLease
+
+logger = logging.getLogger(__name__)
+
+SCHEDULER_LEASE = "menu-scheduler"
+LEASE_SECONDS = 60
+HEARTBEAT_SECONDS = 15
+
+
+def default_holder() -> str:
+    return f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+
+
+def acquire_lease(name: str, holder: str, seconds: float = LEASE_SECONDS) -> bool:
+    """Take the lease if it is free or expired, or renew it if `holder` has it; True when held."""
+    expires = ExpressionWrapper(Now() + timedelta(seconds=seconds), output_field=DateTimeField())
+    taken = SchedulerLease.objects.filter(name=name).filter(Q(holder=holder) | Q(expires_at__lte=Now())) \
+        .update(holder=holder, expires_at=expires, renewed_at=Now())
+    if taken:
+        return True
+    if SchedulerLease.objects.filter(name=name).exists():
+        return False
+    try:
+        with transaction.atomic():
+            SchedulerLease.objects.create(name=name, holder=holder, expires_at=expires, renewed_at=Now())
+    except IntegrityError:
+        # someone else created it first
+        return False
+    return True
+
+
+def release_lease(name: str, holder: str):
+    """Let the lease expire now, if `holder` has it, so a follower takes over without waiting."""
+    SchedulerLease.objects.filter(name=name, holder=holder).update(expires_at=Now())
+
+
+class LeaderElection:
+    """This process's claim on a lease; renew() on every heartbeat, and before leader-only work."""
+
+    def __init__(self, name: str = SCHEDULER_LEASE, holder: str | None = None,
+                 seconds: float = LEASE_SECONDS, on_change=None):
+        self.name = name
+        self.holder = holder or default_holder()
+        self.seconds = seconds
+        self.on_change = on_change  # called with True or False when leadership changes
+        self.is_leader = False
+
+    def renew(self) -> bool:
+        """Take or renew the lease; a database error counts as losing it."""
+        try:
+            leader = acquire_lease(self.name, self.holder, self.seconds)
+        except DatabaseError:
+            logger.exception("Could not renew the %s lease", self.name)
+            leader = False
+        finally:
+            close_old_connections()
+        if leader != self.is_leader:
+            self.is_leader = leader
+            logger.info("%s %s the %s lease", self.holder, "took" if leader else "lost", self.name)
+            if self.on_change:
+                self.on_change(leader)
+        return leader
+
+    def release(self):
+        if self.is_leader:
+            release_lease(self.name, self.holder)
+            self.is_leader = False
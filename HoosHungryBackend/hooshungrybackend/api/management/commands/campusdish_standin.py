@@ -0,0 +1,44 @@
+import time
+
+from django.core.management.base import BaseCommand
+from api.standin import CampusDishStandin
+
+
+class Command(BaseCommand):
+    help = 'Serve the local CampusDish stand-in (api/standin.py) until interrupted'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--host', type=str, default='127.0.0.1')
+        parser.add_argument('--port', type=int, default=8765)
+        parser.add_argument('--latency', type=float, default=0.0, help='Seconds added to every request')
+        parser.add_argument('--jitter', type=float, default=0.0, help='Up to this many more seconds, at random')
+        parser.add_argument('--error-rate', type=float, default=0.0, help='Share of requests answered with --error-status')
+        parser.add_argument('--error-status', type=int, default=503)
+        parser.add_argument('--drop-rate', type=float, default=0.0, help='Share of connections closed without an answer')
+        parser.add_argument('--truncate-rate', type=float, default=0.0, help='Share of pages cut off halfway')
+        parser.add_argument('--seed', type=int, help='Seed for the latency and failure draws')
+        parser.add_argument('--no-etags', action='store_true', help='Never answer 304 Not Modified')
+
+    def handle(self, *args, **options):
+        standin = CampusDishStandin(
+            host=options['host'],
+            port=options['port'],
+            latency=options['latency'],
+            jitter=options['jitter'],
+            error_rate=options['error_rate'],
+            error_status=options['error_status'],
+            drop_rate=options['drop_rate'],
+            truncate_rate=options['truncate_rate'],
+            seed=options['seed'],
+            etags=not options['no_etags'],
+        ).start()
+        self.stdout.write(self.style.SUCCESS(f"CampusDish stand-in serving on {standin.base_url}"))
+        self.stdout.write(f"Point scrapes at it with CAMPUSDISH_BASE_URL={standin.base_url}/")
+        try:
+            while True:
+                time.sleep(3600)
+        except KeyboardInterrupt:
+            pass
+        finally:
+            standin.stop()
+            self.stdout.write(f"Served {len(standin.requests)} requests, injected {dict(standin.faults)}")
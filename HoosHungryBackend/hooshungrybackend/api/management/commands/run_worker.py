@@ -0,0 +1,58 @@
+import signal
+
+from django.core.management.base import BaseCommand
+from api.leases import HEARTBEAT_SECONDS, LEASE_SECONDS, LeaderElection
+from config.scheduler import catch_up_job, create_scheduler, scrape_menus_job
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class Command(BaseCommand):
+    help = ('Run the scheduled menu scrapes in this process until stopped (web workers schedule nothing). '
+            'Workers on every host elect one leader through the database; only it scrapes.')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--scrape-now',
+            action='store_true',
+            help='Also scrape once right away, e.g. after a deploy (if this worker is the leader)',
+        )
+        parser.add_argument('--lease-seconds', type=float, default=LEASE_SECONDS,
+                            help='How long the leader lease lasts without a heartbeat')
+        parser.add_argument('--heartbeat-seconds', type=float, default=HEARTBEAT_SECONDS,
+                            help='How often the lease is renewed, or a follower tries to take it')
+
+    def handle(self, *args, **options):
+        self.election = election = LeaderElection(seconds=options['lease_seconds'], on_change=self.report_leadership)
+        self.scheduler = scheduler = create_scheduler(election=election, heartbeat_seconds=options['heartbeat_seconds'])
+        if not election.renew():
+            self.report_leadership(False)
+        if options['scrape_now']:
+            scheduler.add_job(scrape_menus_job, kwargs={'election': election}, id='scrape_menus_now')
+
+        def stop(signum, frame):
+            logger.info("Worker received signal %s, shutting down", signum)
+            scheduler.shutdown(wait=False)
+
+        previous = signal.signal(signal.SIGTERM, stop)
+        for job in scheduler.get_jobs():
+            self.stdout.write(f"Scheduled {job.id}: {job.trigger}")
+        self.stdout.write(self.style.SUCCESS(f"Menu worker {election.holder} running"))
+        try:
+            scheduler.start()
+        except (KeyboardInterrupt, SystemExit):
+            pass
+        finally:
+            signal.signal(signal.SIGTERM, previous)
+            election.release()
+        self.stdout.write("Menu worker stopped")
+
+    def report_leadership(self, leader: bool):
+        self.stdout.write("Leader: this worker runs the scheduled scrapes" if leader
+                          else "Follower: another worker holds the scheduler lease")
+        self.stdout.flush()
+        if leader:
+            # today's menus may be missing if no leader was up at the last refresh
+            self.scheduler.add_job(catch_up_job, kwargs={'election': self.election},
+                                   id='scrape_menus_catch_up', replace_existing=True)
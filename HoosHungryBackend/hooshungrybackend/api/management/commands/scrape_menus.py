@@ -1,6 +1,23 @@
-from django.core.management.base import BaseCommand
-from api.scrapers import get_menu_data, get_hours
-from api.importers import load_menu_data
+import json
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timedelta
+from io import StringIO
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, connections
+from django.utils import timezone
+from api.archive import PayloadArchive
+from api.instrumentation import HallMetrics, record_scrape_run, summarize
+from api.scrapers import get_hall_snapshot, BASE_PAGE, NY_TZ
+from api.async_scrapers import scrape_all
+from api.workers import init_worker
+from api.importers import (
+    load_menu_data, get_dining_hall, get_scrape_validators, unchanged_pages, save_scrape_state,
+)
 import logging
 
 logger = logging.getLogger(__name__)
@@ -15,24 +32,244 @@ class Command(BaseCommand):
             type=str,
             help='Scrape a single hall (ohill, newcomb, or runk)',
         )
+        parser.add_argument(
+            '--force',
+            action='store_true',
+            help='Re-download and re-import even if nothing changed since the last scrape',
+        )
+        parser.add_argument(
+            '--engine',
+            choices=['threads', 'async'],
+            default='threads',
+            help='threads: one hall after another; async: every hall concurrently, '
+                 'importing each as soon as it is fetched',
+        )
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=1,
+            help='Fetch, parse and import each hall/day in one of N worker processes, '
+                 'each with its own database connection',
+        )
+        parser.add_argument(
+            '--date',
+            type=str,
+            help='First day to scrape, YYYY-MM-DD (default: today)',
+        )
+        parser.add_argument(
+            '--days',
+            type=int,
+            default=1,
+            help='Number of days to scrape starting at --date, e.g. 7 for the coming week',
+        )
+        parser.add_argument(
+            '--replay',
+            type=str,
+            metavar='YYYY-MM-DD',
+            help='Re-import that day from the payload archive instead of scraping',
+        )
+        parser.add_argument(
+            '--no-archive',
+            action='store_true',
+            help='Do not keep the downloaded payloads in the archive',
+        )
 
     def handle(self, *args, **options):
         hall = options.get('hall')
+        self.force = options.get('force')
         halls = [hall] if hall else ['ohill', 'newcomb', 'runk']
+        if options.get('replay'):
+            return self.replay(halls, options['replay'])
+        if options.get('date'):
+            try:
+                start = datetime.strptime(options['date'], '%Y-%m-%d').date()
+            except ValueError:
+                raise CommandError("Invalid --date. Use YYYY-MM-DD")
+        else:
+            start = datetime.now(NY_TZ).date()
+        if options['days'] < 1:
+            raise CommandError("--days must be at least 1")
+        dates = [start + timedelta(days=i) for i in range(options['days'])]
+        targets = [(h, d) for h in halls for d in dates]
+
+        self.unchanged_halls = 0
+        self.unchanged_periods = 0
+        self.total_periods = 0
+        self.metrics = {}
         results = {}
+        hall_metrics = None
+        started_at = timezone.now()
+        started = time.perf_counter()
+
+        archive = None
+        if settings.MENU_ARCHIVE_DIR and not options.get('no_archive'):
+            archive = PayloadArchive(settings.MENU_ARCHIVE_DIR)
 
         logger.info("Starting menu scrape...")
 
+        validators = {
+            (h, d): {} if self.force else get_scrape_validators(h, d) for h, d in targets
+        }
+
+        if options['workers'] > 1:
+            results, hall_metrics = self.run_workers(targets, validators, archive, options['workers'])
+        elif options.get('engine') == 'async':
+            outcomes = scrape_all(targets, self.import_snapshot, validators, archive=archive)
+            for h, d in targets:
+                outcome = outcomes[(h, d)]["result"]
+                if isinstance(outcome, Exception):
+                    self.metrics_for(h, d).add_failure(outcome)
+                    results[f"{h} {d}"] = f"error: {str(outcome)}"
+                    self.stderr.write(self.style.ERROR(f"Error scraping {h} for {d}: {str(outcome)}"))
+                else:
+                    results[f"{h} {d}"] = outcome
+        else:
+            for h, d in targets:
+                try:
+                    logger.info(f"Scraping {h} for {d}...")
+                    snapshot = get_hall_snapshot(h, validators=validators[(h, d)], on_date=d, archive=archive)
+                    results[f"{h} {d}"] = self.import_snapshot(h, snapshot)
+                except Exception as e:
+                    self.metrics_for(h, d).add_failure(e)
+                    results[f"{h} {d}"] = f"error: {str(e)}"
+                    self.stderr.write(self.style.ERROR(f"Error scraping {h} for {d}: {str(e)}"))
+        if hall_metrics is None:
+            hall_metrics = [self.metrics_for(h, d).finish(results[f"{h} {d}"]) for h, d in targets]
+
+        self.stdout.write(
+            f"Unchanged: {self.unchanged_halls}/{len(targets)} hall/days, "
+            f"{self.unchanged_periods}/{self.total_periods} periods"
+        )
+        engine = 'workers' if options['workers'] > 1 else options.get('engine')
+        summary = summarize(started_at, time.perf_counter() - started, engine, hall_metrics)
+        self.stdout.write(json.dumps(summary))
+        record_scrape_run(summary)
+        logger.info(f"Scrape completed. Results: {results}")
+
+    def metrics_for(self, h: str, d) -> HallMetrics:
+        if (h, d) not in self.metrics:
+            self.metrics[(h, d)] = HallMetrics(h, d)
+        return self.metrics[(h, d)]
+
+    def run_workers(self, targets: list[tuple], validators: dict, archive, workers: int) -> tuple[dict, list]:
+        """
+        Scrape and import every hall/day in a pool of processes; print each one's
+        result and time. Returns the results and each hall/day's metrics.
+        """
+        if connection.vendor == "sqlite" and connection.is_in_memory_db():
+            raise CommandError("--workers needs a database the worker processes can share, not in-memory SQLite")
+        # created up front, so workers importing the same hall don't race to create it
+        for h in dict.fromkeys(h for h, _ in targets):
+            get_dining_hall(h)
+        connections.close_all()
+
+        archive_dir = archive.root if archive else None
+        start = time.perf_counter()
+        with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"),
+                                 initializer=init_worker) as pool:
+            futures = {
+                (h, d): pool.submit(scrape_target, h, d, self.force, validators[(h, d)], archive_dir)
+                for h, d in targets
+            }
+            outcomes = {target: future.result() for target, future in futures.items()}
+
+        results = {}
+        for (h, d), outcome in outcomes.items():
+            self.stdout.write(outcome["output"], ending="")
+            self.stderr.write(outcome["errors"], ending="")
+            self.unchanged_halls += outcome["unchanged_halls"]
+            self.unchanged_periods += outcome["unchanged_periods"]
+            self.total_periods += outcome["total_periods"]
+            results[f"{h} {d}"] = outcome["result"]
+        for (h, d), outcome in outcomes.items():
+            self.stdout.write(f"  {h:<8} {d}  {outcome['result'][:40]:<40} {outcome['seconds']:>6.2f}s  "
+                              f"pid {outcome['pid']}")
+        self.stdout.write(f"{len(targets)} hall/days in {time.perf_counter() - start:.2f}s with {workers} workers")
+        return results, [outcome["metrics"] for outcome in outcomes.values()]
+
+    def import_snapshot(self, h: str, snapshot: dict) -> str:
+        """Import one hall/day snapshot unless it matches the last import."""
+        metrics = self.metrics_for(h, snapshot["date"])
+        metrics.add_snapshot(snapshot)
+        with metrics.stage("import"):
+            return self._import_snapshot(h, snapshot, metrics)
+
+    def _import_snapshot(self, h: str, snapshot: dict, metrics: HallMetrics) -> str:
+        d = snapshot["date"]
+        unchanged = set() if self.force else unchanged_pages(h, d, snapshot)
+        period_keys = [key for key in snapshot["pages"] if key != BASE_PAGE]
+        self.total_periods += len(period_keys)
+        self.unchanged_periods += sum(1 for key in period_keys if key in unchanged)
+
+        if snapshot["pages"] and unchanged >= set(snapshot["pages"]):
+            self.unchanged_halls += 1
+            save_scrape_state(h, d, snapshot)
+            self.stdout.write(f"No changes for {h} on {d}, skipped import")
+            return "unchanged"
+
+        if snapshot["menu"] is None:
+            # every page answered 304, but the day was deleted after the validators were read
+            raise ValueError(f"{h} on {d} was not modified but is not imported; it is fetched in full next time")
+        served = datetime.strptime(snapshot["menu"]["date"], "%m/%d/%Y").date()
+        if d is not None and served != d:
+            raise ValueError(f"CampusDish returned the menu for {served} instead of {d}")
+
+        changes = load_menu_data(h, snapshot["menu"], snapshot["hours"])
+        metrics.add_changes(changes)
+        save_scrape_state(h, d, snapshot)
+        self.stdout.write(self.style.SUCCESS(f"Successfully scraped {h} for {d} ({changes})"))
+        return "success"
+
+    def replay(self, halls: list[str], day: str):
+        """Re-import one day for `halls` from archived payloads, without the network."""
+        try:
+            d = datetime.strptime(day, '%Y-%m-%d').date()
+        except ValueError:
+            raise CommandError("Invalid --replay date. Use YYYY-MM-DD")
+        if not settings.MENU_ARCHIVE_DIR:
+            raise CommandError("MENU_ARCHIVE_DIR is not set")
+        archive = PayloadArchive(settings.MENU_ARCHIVE_DIR)
+
         for h in halls:
             try:
-                logger.info(f"Scraping {h}...")
-                menu_data = get_menu_data(h)
-                hours_data = get_hours(h)
-                load_menu_data(h, menu_data, hours_data)
-                results[h] = "success"
-                self.stdout.write(self.style.SUCCESS(f"Successfully scraped {h}"))
+                snapshot = archive.load_snapshot(h, d)
+                changes = load_menu_data(h, snapshot["menu"], snapshot["hours"])
+                self.stdout.write(self.style.SUCCESS(f"Replayed {h} for {d} ({changes})"))
+            except KeyError:
+                self.stderr.write(self.style.ERROR(f"No archived payloads for {h} on {d}"))
             except Exception as e:
-                results[h] = f"error: {str(e)}"
-                self.stderr.write(self.style.ERROR(f"Error scraping {h}: {str(e)}"))
+                self.stderr.write(self.style.ERROR(f"Error replaying {h} for {d}: {str(e)}"))
 
-        logger.info(f"Scrape completed. Results: {results}")
+
+def scrape_target(h: str, d, force: bool, validators: dict, archive_dir) -> dict:
+    """
+    Fetch, parse and import one hall/day inside a worker process, on the worker's
+    own database connection; returns what the parent reports.
+    """
+    out, err = StringIO(), StringIO()
+    command = Command(stdout=out, stderr=err)
+    command.force = force
+    command.unchanged_halls = command.unchanged_periods = command.total_periods = 0
+    command.metrics = {}
+    start = time.perf_counter()
+    try:
+        archive = PayloadArchive(archive_dir) if archive_dir else None
+        snapshot = get_hall_snapshot(h, validators=validators, on_date=d, archive=archive)
+        result = command.import_snapshot(h, snapshot)
+    except Exception as e:
+        command.metrics_for(h, d).add_failure(e)
+        result = f"error: {str(e)}"
+        command.stderr.write(command.style.ERROR(f"Error scraping {h} for {d}: {str(e)}"))
+    finally:
+        connections.close_all()
+    return {
+        "result": result,
+        "metrics": command.metrics_for(h, d).finish(result),
+        "seconds": time.perf_counter() - start,
+        "pid": os.getpid(),
+        "output": out.getvalue(),
+        "errors": err.getvalue(),
+        "unchanged_halls": command.unchanged_halls,
+        "unchanged_periods": command.unchanged_periods,
+        "total_periods": command.total_periods,
+    }
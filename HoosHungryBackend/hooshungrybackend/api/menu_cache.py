@@ -0,0 +1,56 @@
+"""
+Rendered menu_info and available_periods responses, cached with no timeout.
+
+An entry is keyed by what its response depends on (hall, date, period) and
+stamped with its hall's menu generation, which load_menu_data replaces after
+every import that changed something, for the imported hall and for every hall
+serving a catalog product the import updated (products are shared). An entry
+stamped with an older generation is never served, so an import invalidates
+exactly the halls whose menus it changed. A hit is one cache round trip:
+the entry and its hall's generation are read together with get_many.
+
+Generations are nanosecond timestamps rather than an incremented counter, so a
+generation the cache evicted (or a cache that was cleared) can't come back with
+an old value and revive stale entries.
+
+Every web worker and run_worker must share the cache, settings.CACHES["menus"].
+"""
+import time
+
+from django.core.cache import caches
+from rest_framework.response import Response
+
+CACHE_ALIAS = "menus"
+
+
+def generation_key(hall_name: str) -> str:
+    return f"menu-generation:{hall_name}"
+
+
+def bump_menu_generation(hall_name: str):
+    """Retire every cached response of a hall; called once its import is committed."""
+    caches[CACHE_ALIAS].set(generation_key(hall_name), time.time_ns(), None)
+
+
+def cached_response(hall_name: str, parts: tuple, build) -> Response:
+    """
+    The cached response for (hall, *parts), or build()'s. Only 200 responses
+    are cached, under the generation read before build() touched the database,
+    so one built while an import committed is dropped at the next read.
+    """
+    cache = caches[CACHE_ALIAS]
+    key = ":".join(map(str, ("menu", hall_name, *parts)))
+    found = cache.get_many([generation_key(hall_name), key])
+    generation = found.get(generation_key(hall_name))
+    entry = found.get(key)
+    if entry is not None and generation is not None and entry[0] == generation:
+        return Response(entry[1])
+
+    if generation is None:
+        generation = time.time_ns()
+        if not cache.add(generation_key(hall_name), generation, None):
+            generation = cache.get(generation_key(hall_name))
+    response = build()
+    if response.status_code == 200 and generation is not None:
+        cache.set(key, (generation, response.data), None)
+    return response
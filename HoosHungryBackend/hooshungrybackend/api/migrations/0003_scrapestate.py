@@ -0,0 +1,30 @@
+# Generated by Django 5.2.18 on 2026-10-17 09:12
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0002_fix_nutrition_max_digits'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ScrapeState',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('period_id', models.CharField(blank=True, max_length=10)),
+                ('etag', models.CharField(blank=True, max_length=200)),
+                ('last_modified', models.CharField(blank=True, max_length=100)),
+                ('content_hash', models.CharField(blank=True, max_length=64)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('dining_hall', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='scrape_states', to='api.dininghall')),
+            ],
+            options={
+                'unique_together': {('dining_hall', 'date', 'period_id')},
+            },
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-17 01:24
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0003_scrapestate'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='menuitem',
+            name='vendor_id',
+            field=models.CharField(blank=True, default='', max_length=50),
+        ),
+    ]
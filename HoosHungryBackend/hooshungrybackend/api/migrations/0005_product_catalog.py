@@ -0,0 +1,177 @@
+# Generated by Django 5.2.18 on 2026-10-17 02:10
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+PRODUCT_FIELDS = (
+    "item_name", "item_description", "ingredients", "item_category",
+    "is_gluten", "is_vegan", "is_vegetarian",
+)
+
+
+NUTRITION_FIELDS = (
+    "calories", "protein", "total_carbohydrates", "cholesterol", "total_fat", "trans_fat",
+    "saturated_fat", "total_sugars", "dietary_fiber", "sodium", "serving_size",
+)
+
+
+def move_items_to_products(apps, schema_editor):
+    """
+    One Product per version of a dish. The newest menu item of each CampusDish
+    ProductId becomes its catalog product (vendor_id = ProductId), which later
+    imports keep up to date. An older item served with a different name, flags,
+    allergens or nutrition gets a product of its own under
+    "<ProductId>@<menu item id>", which no import matches, so past days keep
+    what they served. Items without a ProductId keep their own product.
+    """
+    MenuItem = apps.get_model("api", "MenuItem")
+    Product = apps.get_model("api", "Product")
+    NutritionInfo = apps.get_model("api", "NutritionInfo")
+
+    nutrition_by_item = {n.menu_item_id: n for n in NutritionInfo.objects.all()}
+    products = {}  # version of a dish -> its product
+    cataloged = set()
+    for item in MenuItem.objects.order_by("-id").prefetch_related("allergens"):
+        vendor_id = item.vendor_id or f"legacy-{item.pk}"
+        allergens = sorted(a.pk for a in item.allergens.all())
+        nutrition = nutrition_by_item.get(item.pk)
+        version = (
+            vendor_id,
+            tuple(getattr(item, name) for name in PRODUCT_FIELDS),
+            tuple(allergens),
+            tuple(getattr(nutrition, name) for name in NUTRITION_FIELDS) if nutrition else None,
+        )
+        product = products.get(version)
+        if product is None:
+            product = Product.objects.create(
+                vendor_id=vendor_id if vendor_id not in cataloged else f"{vendor_id}@{item.pk}",
+                **{name: getattr(item, name) for name in PRODUCT_FIELDS}
+            )
+            cataloged.add(vendor_id)
+            product.allergens.set(allergens)
+            if nutrition is not None:
+                nutrition.product = product
+                nutrition.save(update_fields=["product"])
+            products[version] = product
+        item.product = product
+        item.save(update_fields=["product"])
+    NutritionInfo.objects.filter(product__isnull=True).delete()
+
+
+def move_products_to_items(apps, schema_editor):
+    """Copy each product back onto its menu items, with a nutrition row per item."""
+    MenuItem = apps.get_model("api", "MenuItem")
+    NutritionInfo = apps.get_model("api", "NutritionInfo")
+
+    nutrition_by_product = {n.product_id: n for n in NutritionInfo.objects.all()}
+    for item in MenuItem.objects.select_related("product").prefetch_related("product__allergens"):
+        product = item.product
+        for name in PRODUCT_FIELDS:
+            setattr(item, name, getattr(product, name))
+        item.vendor_id = "" if product.vendor_id.startswith("legacy-") else product.vendor_id.split("@")[0]
+        item.save()
+        item.allergens.set(product.allergens.all())
+        nutrition = nutrition_by_product.get(product.pk)
+        if nutrition is not None:
+            NutritionInfo.objects.create(
+                menu_item=item, **{name: getattr(nutrition, name) for name in NUTRITION_FIELDS}
+            )
+    NutritionInfo.objects.filter(menu_item__isnull=True).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0004_menuitem_vendor_id'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Product',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('vendor_id', models.CharField(max_length=50, unique=True)),
+                ('is_gluten', models.BooleanField(default=False)),
+                ('is_vegan', models.BooleanField(default=False)),
+                ('is_vegetarian', models.BooleanField(default=False)),
+                ('item_name', models.CharField(max_length=200)),
+                ('item_description', models.TextField(blank=True, null=True)),
+                ('ingredients', models.TextField(blank=True, null=True)),
+                ('item_category', models.CharField(blank=True, max_length=100, null=True)),
+                ('allergens', models.ManyToManyField(blank=True, related_name='products', to='api.allergen')),
+            ],
+        ),
+        migrations.AddField(
+            model_name='menuitem',
+            name='product',
+            field=models.ForeignKey(null=True, on_delete=django.db.models.deletion.PROTECT, related_name='menu_items', to='api.product'),
+        ),
+        migrations.AddField(
+            model_name='nutritioninfo',
+            name='product',
+            field=models.OneToOneField(null=True, on_delete=django.db.models.deletion.CASCADE, related_name='nutrition_info', to='api.product'),
+        ),
+        # nullable while the data moves, so the reverse can re-add it to existing rows
+        migrations.AlterField(
+            model_name='nutritioninfo',
+            name='menu_item',
+            field=models.OneToOneField(null=True, on_delete=django.db.models.deletion.CASCADE, related_name='nutrition_info', to='api.menuitem'),
+        ),
+        migrations.RunPython(move_items_to_products, move_products_to_items),
+        # a default only so the reverse can re-add the column before refilling it
+        migrations.AlterField(
+            model_name='menuitem',
+            name='item_name',
+            field=models.CharField(default='', max_length=200),
+        ),
+        migrations.RemoveField(
+            model_name='nutritioninfo',
+            name='menu_item',
+        ),
+        migrations.AlterField(
+            model_name='nutritioninfo',
+            name='product',
+            field=models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='nutrition_info', to='api.product'),
+        ),
+        migrations.AlterField(
+            model_name='menuitem',
+            name='product',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, related_name='menu_items', to='api.product'),
+        ),
+        migrations.RemoveField(
+            model_name='menuitem',
+            name='allergens',
+        ),
+        migrations.RemoveField(
+            model_name='menuitem',
+            name='vendor_id',
+        ),
+        migrations.RemoveField(
+            model_name='menuitem',
+            name='is_gluten',
+        ),
+        migrations.RemoveField(
+            model_name='menuitem',
+            name='is_vegan',
+        ),
+        migrations.RemoveField(
+            model_name='menuitem',
+            name='is_vegetarian',
+        ),
+        migrations.RemoveField(
+            model_name='menuitem',
+            name='item_name',
+        ),
+        migrations.RemoveField(
+            model_name='menuitem',
+            name='item_description',
+        ),
+        migrations.RemoveField(
+            model_name='menuitem',
+            name='ingredients',
+        ),
+        migrations.RemoveField(
+            model_name='menuitem',
+            name='item_category',
+        ),
+    ]
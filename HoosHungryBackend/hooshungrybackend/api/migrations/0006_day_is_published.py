@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-17 03:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0005_product_catalog'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='day',
+            name='is_published',
+            field=models.BooleanField(default=True),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.18 on 2026-10-17 05:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0007_scraperun'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SchedulerLease',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=50, unique=True)),
+                ('holder', models.CharField(max_length=200)),
+                ('expires_at', models.DateTimeField()),
+                ('renewed_at', models.DateTimeField()),
+            ],
+        ),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 5.2.18 on 2026-10-17 06:55
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0008_schedulerlease'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ScrapeRequest',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('hall', models.CharField(max_length=20)),
+                ('date', models.DateField()),
+                ('requested_at', models.DateTimeField(auto_now_add=True)),
+                ('started_at', models.DateTimeField(blank=True, null=True)),
+                ('finished_at', models.DateTimeField(blank=True, null=True)),
+                ('result', models.CharField(blank=True, max_length=200)),
+            ],
+            options={
+                'ordering': ['requested_at'],
+                'constraints': [models.UniqueConstraint(condition=models.Q(('finished_at__isnull', True)), fields=('hall', 'date'), name='one_open_scrape_request')],
+            },
+        ),
+    ]
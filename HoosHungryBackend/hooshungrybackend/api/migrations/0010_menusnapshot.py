@@ -0,0 +1,26 @@
+# Generated by Django 5.2.18 on 2026-10-17 08:10
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0009_scraperequest'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MenuSnapshot',
+            fields=[
+                ('key', models.CharField(max_length=60, primary_key=True, serialize=False)),
+                ('hall', models.CharField(max_length=20)),
+                ('date', models.DateField()),
+                ('body', models.BinaryField()),
+                ('rendered_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['hall', 'date'], name='api_menusna_hall_14c07c_idx')],
+            },
+        ),
+    ]
@@ -1,3 +1,5 @@
+import datetime
+
 from django.db import models
 
 # Create your models here.
@@ -8,17 +10,34 @@ class DiningHall(models.Model):
     def __str__(self):
         return self.name
 
+class DayQuerySet(models.QuerySet):
+    def published(self):
+        """Days readers should see; pending and superseded imports are left out."""
+        return self.filter(is_published=True)
+
+
 class Day(models.Model):
     date = models.DateField()
     day_name = models.CharField(max_length=20, default="")
     open_time = models.TimeField()
     close_time = models.TimeField()
     dining_hall = models.ForeignKey(DiningHall, on_delete=models.CASCADE, related_name="days")
+    # False while an import builds the day, and again once a newer import replaces it
+    is_published = models.BooleanField(default=True)
+
+    objects = DayQuerySet.as_manager()
 
     def __str__(self):
         return f"{self.date} ({self.open_time.strftime('%H:%M')} - {self.close_time.strftime('%H:%M')})"
 
 
+class PeriodQuerySet(models.QuerySet):
+    def with_menu(self):
+        """Load each period's stations, menu items, products, nutrition and allergens (PeriodSerializer) in 4 queries."""
+        menu_items = MenuItem.objects.select_related("product__nutrition_info").prefetch_related("product__allergens")
+        return self.prefetch_related(models.Prefetch("stations__menu_items", queryset=menu_items))
+
+
 class Period(models.Model):
     name = models.CharField(max_length=200)
     vendor_id = models.CharField(max_length=10) # something like 1423
@@ -26,6 +45,8 @@ class Period(models.Model):
     end_time = models.TimeField()
     day = models.ForeignKey(Day, on_delete=models.CASCADE, related_name="periods")
 
+    objects = PeriodQuerySet.as_manager()
+
     def __str__(self):
         return f"{self.name} ({self.start_time.strftime('%H:%M')} - {self.end_time.strftime('%H:%M')})"
 
@@ -45,9 +66,10 @@ class Allergen(models.Model):
     def __str__(self):
         return self.name
     
-class MenuItem(models.Model):
-    station = models.ForeignKey(Station, on_delete=models.CASCADE, related_name="menu_items")
-    allergens = models.ManyToManyField(Allergen, related_name="menu_items", blank=True)
+class Product(models.Model):
+    """A dish as CampusDish describes it, stored once for every day and hall that serves it."""
+    vendor_id = models.CharField(max_length=50, unique=True) # CampusDish ProductId, like M6341_695
+    allergens = models.ManyToManyField(Allergen, related_name="products", blank=True)
     is_gluten = models.BooleanField(default=False)
     is_vegan = models.BooleanField(default=False)
     is_vegetarian = models.BooleanField(default=False)
@@ -59,6 +81,45 @@ class MenuItem(models.Model):
     def __str__(self):
         return self.item_name
 
+    def versions(self):
+        """
+        This product and its other versions: importers keep a dish CampusDish
+        changed as a new product, and the days that served the old one keep it
+        under "<ProductId>@<id>".
+        """
+        product_id = self.vendor_id.partition("@")[0]
+        return Product.objects.filter(models.Q(vendor_id=product_id) | models.Q(vendor_id__startswith=f"{product_id}@"))
+
+    def next_served(self, after: datetime.date):
+        """The first MenuItem serving this product, in any version, on or after `after`, or None."""
+        return (
+            MenuItem.objects.filter(product__in=self.versions())
+            .filter(station__period__day__date__gte=after, station__period__day__is_published=True)
+            .select_related("station__period__day__dining_hall")
+            .order_by("station__period__day__date", "station__period__start_time")
+            .first()
+        )
+
+
+class MenuItem(models.Model):
+    """One product on the menu of a station; the dish itself lives in Product."""
+    station = models.ForeignKey(Station, on_delete=models.CASCADE, related_name="menu_items")
+    product = models.ForeignKey(Product, on_delete=models.PROTECT, related_name="menu_items")
+
+    # The product's fields, read through the menu item
+    item_name = property(lambda self: self.product.item_name)
+    item_description = property(lambda self: self.product.item_description)
+    ingredients = property(lambda self: self.product.ingredients)
+    item_category = property(lambda self: self.product.item_category)
+    is_gluten = property(lambda self: self.product.is_gluten)
+    is_vegan = property(lambda self: self.product.is_vegan)
+    is_vegetarian = property(lambda self: self.product.is_vegetarian)
+    allergens = property(lambda self: self.product.allergens)
+    nutrition_info = property(lambda self: self.product.nutrition_info)
+
+    def __str__(self):
+        return self.item_name
+
 
 class NutritionInfo(models.Model):
     calories = models.DecimalField(max_digits=8, decimal_places=2, blank=True, null=True)
@@ -71,7 +132,7 @@ class NutritionInfo(models.Model):
     total_sugars = models.DecimalField(max_digits=8, decimal_places=2, blank=True, null=True)
     dietary_fiber = models.DecimalField(max_digits=8, decimal_places=2, blank=True, null=True)
     sodium = models.DecimalField(max_digits=8, decimal_places=2, blank=True, null=True)
-    menu_item = models.OneToOneField(MenuItem, on_delete=models.CASCADE, related_name="nutrition_info")
+    product = models.OneToOneField(Product, on_delete=models.CASCADE, related_name="nutrition_info")
     serving_size = models.CharField(max_length=100, blank=True, null=True)
 
 
@@ -88,3 +149,88 @@ class NutritionInfo(models.Model):
         if self.dietary_fiber is not None:     fields.append(f"Fiber: {self.dietary_fiber}g")
         if self.sodium is not None:            fields.append(f"Sodium: {self.sodium}mg")
         return ", ".join(fields) if fields else "No nutrition info"
+
+
+class ScrapeState(models.Model):
+    """Validators and content hash of one scraped page as of the last scrape."""
+    dining_hall = models.ForeignKey(DiningHall, on_delete=models.CASCADE, related_name="scrape_states")
+    date = models.DateField()
+    period_id = models.CharField(max_length=10, blank=True) # "" for the hall's base page
+    etag = models.CharField(max_length=200, blank=True)
+    last_modified = models.CharField(max_length=100, blank=True)
+    content_hash = models.CharField(max_length=64, blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        unique_together = ("dining_hall", "date", "period_id")
+
+    def __str__(self):
+        return f"{self.dining_hall} {self.date} {self.period_id or 'base'}"
+
+
+class ScrapeRun(models.Model):
+    """One scrape_menus run: totals, plus per-stage timings and row counts of every hall/day in `halls`."""
+    started_at = models.DateTimeField()
+    seconds = models.FloatField()
+    engine = models.CharField(max_length=20)
+    targets = models.PositiveIntegerField(default=0)  # hall/days scraped
+    errors = models.PositiveIntegerField(default=0)
+    bytes_downloaded = models.BigIntegerField(default=0)
+    queries = models.PositiveIntegerField(default=0)
+    rows_inserted = models.PositiveIntegerField(default=0)
+    rows_updated = models.PositiveIntegerField(default=0)
+    rows_deleted = models.PositiveIntegerField(default=0)
+    halls = models.JSONField(default=list)  # [HallMetrics.as_dict(), ...]
+
+    class Meta:
+        ordering = ["-started_at"]
+
+    def __str__(self):
+        return f"{self.started_at:%Y-%m-%d %H:%M} {self.engine} ({self.targets} hall/days, {self.seconds:.1f}s)"
+
+
+class SchedulerLease(models.Model):
+    """A named lease one process at a time holds, renewed by heartbeat until it expires (see api.leases)."""
+    name = models.CharField(max_length=50, unique=True)
+    holder = models.CharField(max_length=200)
+    expires_at = models.DateTimeField()
+    renewed_at = models.DateTimeField()
+
+    def __str__(self):
+        return f"{self.name} held by {self.holder} until {self.expires_at}"
+
+
+class ScrapeRequest(models.Model):
+    """A hall/day a reader asked for before it was imported; run_worker scrapes it (see api.on_demand)."""
+    hall = models.CharField(max_length=20)
+    date = models.DateField()
+    requested_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+    result = models.CharField(max_length=200, blank=True)
+
+    class Meta:
+        ordering = ["requested_at"]
+        constraints = [
+            # at most one open request per hall/day: the rest of the readers wait on it
+            models.UniqueConstraint(fields=["hall", "date"], condition=models.Q(finished_at__isnull=True),
+                                    name="one_open_scrape_request"),
+        ]
+
+    def __str__(self):
+        return f"{self.hall} {self.date} ({self.result or ('running' if self.started_at else 'queued')})"
+
+
+class MenuSnapshot(models.Model):
+    """One menu_info response body, rendered when its hall/day was imported (see api.snapshots)."""
+    key = models.CharField(max_length=60, primary_key=True)  # "runk/2025-09-17/dinner"
+    hall = models.CharField(max_length=20)
+    date = models.DateField()
+    body = models.BinaryField()
+    rendered_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [models.Index(fields=["hall", "date"])]
+
+    def __str__(self):
+        return self.key
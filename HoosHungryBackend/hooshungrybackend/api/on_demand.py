@@ -0,0 +1,87 @@
+"""
+Read-through scrapes: a reader asking for today's menu of a hall that hasn't
+been imported queues a ScrapeRequest, and run_worker's leader scrapes it within
+a few seconds instead of at the next scheduled refresh.
+
+Requests are single-flight across every web worker and host: a partial unique
+constraint allows one open request per hall/day, so the first reader queues it
+and everyone after gets the same "pending" answer until it finishes.
+
+    web:     request_scrape(hall, day)   the open request, or None
+    worker:  run_scrape_requests()       every POLL_SECONDS, on the leader
+"""
+from datetime import timedelta
+from io import StringIO
+
+from django.core.management import call_command
+from django.db import IntegrityError, transaction
+from django.db.models import Q
+from django.utils import timezone
+import logging
+
+from .models import ScrapeRequest
+
+logger = logging.getLogger(__name__)
+
+POLL_SECONDS = 2
+RETRY_AFTER_SECONDS = 5   # how long readers are told to wait before asking again
+COOLDOWN_SECONDS = 300    # a day still missing after a request finished isn't requested again sooner
+STALE_SECONDS = 600       # a request started this long ago, by a worker that died, is run again;
+                          # one no worker took up (or finished) in this long expires for readers
+
+
+def request_scrape(hall_name: str, on_date) -> ScrapeRequest | None:
+    """
+    The open request for a hall/day, queuing one if there is none. None while
+    the last request finished less than COOLDOWN_SECONDS ago, e.g. because
+    CampusDish has no menu for that day, or expired: an open request nobody
+    claimed or finished within STALE_SECONDS (no run_worker is running) is
+    closed, so readers aren't told to wait forever.
+    """
+    pending = ScrapeRequest.objects.filter(hall=hall_name, date=on_date, finished_at__isnull=True).first()
+    if pending:
+        stale = timezone.now() - timedelta(seconds=STALE_SECONDS)
+        if (pending.started_at or pending.requested_at) >= stale:
+            return pending
+        # conditional, so a request a worker claimed meanwhile keeps running
+        ScrapeRequest.objects.filter(pk=pending.pk, started_at=pending.started_at, finished_at__isnull=True) \
+            .update(finished_at=timezone.now(), result="expired")
+    recent = timezone.now() - timedelta(seconds=COOLDOWN_SECONDS)
+    if ScrapeRequest.objects.filter(hall=hall_name, date=on_date, finished_at__gte=recent).exists():
+        return None
+    try:
+        with transaction.atomic():
+            return ScrapeRequest.objects.create(hall=hall_name, date=on_date)
+    except IntegrityError:
+        # another reader queued it first
+        return ScrapeRequest.objects.filter(hall=hall_name, date=on_date, finished_at__isnull=True).first()
+
+
+def claim_scrape_request() -> ScrapeRequest | None:
+    """Mark the oldest queued (or abandoned) request started; None when there is nothing to do."""
+    stale = timezone.now() - timedelta(seconds=STALE_SECONDS)
+    waiting = ScrapeRequest.objects.filter(finished_at__isnull=True) \
+        .filter(Q(started_at__isnull=True) | Q(started_at__lt=stale))
+    for request in waiting[:10]:
+        now = timezone.now()
+        # conditional, so two workers overlapping during a leader handover don't both run it
+        if ScrapeRequest.objects.filter(pk=request.pk, started_at=request.started_at).update(started_at=now):
+            request.started_at = now
+            return request
+    return None
+
+
+def run_scrape_requests() -> int:
+    """Scrape and import every queued hall/day, one after another; returns how many ran."""
+    ran = 0
+    while (request := claim_scrape_request()) is not None:
+        out, err = StringIO(), StringIO()
+        try:
+            call_command('scrape_menus', '--hall', request.hall, '--date', str(request.date), stdout=out, stderr=err)
+            result = f"error: {err.getvalue().strip()}" if err.getvalue() else "success"
+        except Exception as e:
+            result = f"error: {str(e)}"
+        logger.info("On-demand scrape of %s for %s: %s", request.hall, request.date, result)
+        ScrapeRequest.objects.filter(pk=request.pk).update(finished_at=timezone.now(), result=result[:200])
+        ran += 1
+    return ran
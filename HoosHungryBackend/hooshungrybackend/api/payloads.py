@@ -0,0 +1,165 @@
+"""
+Compact projections of CampusDish period payloads.
+
+A decoded period page is several MB of Python dicts (display flags, image urls,
+prices, category trees...). The importer only needs stations and a handful of
+product fields, so pages are projected into these records right after decoding
+and the full dicts are dropped. Repeated small values (nutrient names and
+amounts, filter sets) are shared between the records of one scrape through an
+Interner, which is dropped with the scrape; shared filter sets are read-only.
+"""
+import hashlib
+import sys
+from types import MappingProxyType
+
+
+class StationRecord:
+    __slots__ = ("station_id", "period_id", "name")
+
+    def __init__(self, station_id: str, period_id: str, name: str):
+        self.station_id = station_id
+        self.period_id = period_id
+        self.name = name
+
+    def __repr__(self):
+        return f"StationRecord({self.station_id!r}, {self.period_id!r}, {self.name!r})"
+
+
+class ProductRecord:
+    __slots__ = (
+        "product_id", "station_id", "name", "description", "filters",
+        "allergen_statement", "ingredients", "nutrition", "serving_size", "serving_unit",
+    )
+
+    def __init__(self, product_id, station_id, name, description, filters,
+                 allergen_statement, ingredients, nutrition, serving_size, serving_unit):
+        self.product_id = product_id
+        self.station_id = station_id
+        self.name = name
+        self.description = description
+        self.filters = filters                      # AvailableFilters, read-only, e.g. {"ContainsEggs": True, ...}
+        self.allergen_statement = allergen_statement
+        self.ingredients = ingredients
+        self.nutrition = nutrition                  # NutritionalTree flattened: ((name, value), ...)
+        self.serving_size = serving_size
+        self.serving_unit = serving_unit
+
+    def __repr__(self):
+        return f"ProductRecord({self.product_id!r}, {self.name!r})"
+
+
+class MenuRecord:
+    __slots__ = ("stations", "products")
+
+    def __init__(self, stations: list, products: list):
+        self.stations = stations
+        self.products = products
+
+
+NO_FILTERS = MappingProxyType({})
+
+
+class Interner:
+    """Filter sets and nutrient pairs seen so far in one scrape, so its records share them."""
+
+    def __init__(self):
+        self.filters = {}
+        self.nutrients = {}
+
+
+def _intern(value):
+    return sys.intern(value) if isinstance(value, str) else value
+
+
+def _project_filters(filters, shared: Interner) -> MappingProxyType:
+    """Products share a handful of distinct filter combinations; keep one mapping per combination."""
+    if not filters:
+        return NO_FILTERS
+    key = tuple(filters.items())
+    projected = shared.filters.get(key)
+    if projected is None:
+        projected = shared.filters.setdefault(key, MappingProxyType({_intern(k): v for k, v in key}))
+    return projected
+
+
+def _flatten_nutrition(tree, out: list, shared: Interner):
+    for entry in tree:
+        pair = (entry.get("Name"), entry.get("Value"))
+        out.append(shared.nutrients.setdefault(pair, pair))
+        if entry.get("SubList"):
+            _flatten_nutrition(entry["SubList"], out, shared)
+
+
+def _project_nutrition(tree, shared: Interner) -> tuple:
+    """NutritionalTree nodes in depth-first order; (name, value) pairs are shared across products."""
+    out = []
+    if tree:
+        _flatten_nutrition(tree, out, shared)
+    return tuple(out)
+
+
+def project_product(menu_product: dict, shared: Interner) -> ProductRecord | None:
+    prod_info = menu_product.get("Product")
+    if not prod_info:
+        return None
+    return ProductRecord(
+        product_id=prod_info.get("ProductId") or menu_product.get("ProductId"),
+        station_id=menu_product["StationId"],
+        name=prod_info.get("MarketingName"),
+        description=prod_info.get("ShortDescription"),
+        filters=_project_filters(prod_info.get("AvailableFilters"), shared),
+        allergen_statement=_intern(prod_info.get("AllergenStatement") or ""),
+        ingredients=prod_info.get("IngredientStatement", ""),
+        nutrition=_project_nutrition(prod_info.get("NutritionalTree"), shared),
+        serving_size=_intern(prod_info.get("ServingSize")),
+        serving_unit=_intern(prod_info.get("ServingUnit")),
+    )
+
+
+def project_menu(model: dict, shared: Interner | None = None) -> MenuRecord:
+    """
+    Project a decoded period page (the model: object) down to a MenuRecord. Pass
+    one Interner for every page of a scrape to share values between its pages.
+    """
+    shared = shared if shared is not None else Interner()
+    menu = model.get("Menu") or {}
+    stations = [
+        StationRecord(s["StationId"], s["PeriodId"], _intern(s["Name"]))
+        for s in menu.get("MenuStations") or []
+    ]
+    products = []
+    for menu_product in menu.get("MenuProducts") or []:
+        record = project_product(menu_product, shared)
+        if record is not None:
+            products.append(record)
+    return MenuRecord(stations, products)
+
+
+def index_menu(menu: MenuRecord, period_id: str) -> list:
+    """
+    [(StationRecord, [ProductRecord, ...]), ...] for the stations of one period, in
+    payload order, from one pass over the stations and one over the products. A
+    period page lists every period's stations but only its own products.
+    """
+    stations = [station for station in menu.stations if station.period_id == period_id]
+    # a station id listed twice gets its products once, at its last entry
+    owner = {station.station_id: station for station in stations}
+    by_station = {}
+    for product in menu.products:
+        by_station.setdefault(product.station_id, []).append(product)
+    return [
+        (station, by_station.get(station.station_id, []) if owner[station.station_id] is station else [])
+        for station in stations
+    ]
+
+
+def menu_hash(menu: MenuRecord) -> str:
+    """Content hash of a projected menu; equal hashes import to identical rows."""
+    digest = hashlib.sha256()
+    for record in (*menu.stations, *menu.products):
+        fields = tuple(
+            dict(value) if isinstance(value, MappingProxyType) else value
+            for value in (getattr(record, name) for name in record.__slots__)
+        )
+        digest.update(repr(fields).encode())
+    return digest.hexdigest()
@@ -1,77 +1,381 @@
-import requests, re, json, os
-from datetime import datetime, timezone
+import requests, re, json, os, threading, time, hashlib
+from concurrent.futures import ThreadPoolExecutor, wait
+from datetime import date, datetime, timezone
+from urllib.parse import urlencode, urlsplit
 from zoneinfo import ZoneInfo
+from requests.adapters import HTTPAdapter
 
+from .payloads import Interner, project_menu, menu_hash
 
-URL_MAP = {
-    "ohill":   "https://virginia.campusdish.com/en/locationsandmenus/observatoryhilldiningroom/",
-    "newcomb": "https://virginia.campusdish.com/en/locationsandmenus/freshfoodcompany/",
-    "runk":    "https://virginia.campusdish.com/en/locationsandmenus/runk/",
+
+CAMPUSDISH_BASE_URL = "https://virginia.campusdish.com/en/locationsandmenus/"
+
+HALL_PATHS = {
+    "ohill":   "observatoryhilldiningroom",
+    "newcomb": "freshfoodcompany",
+    "runk":    "runk",
 }
 
+
+def hall_urls(base_url: str) -> dict:
+    """Location page of every hall under `base_url`, e.g. a local stand-in (see api.standin)."""
+    base_url = base_url if base_url.endswith("/") else base_url + "/"
+    return {hall: f"{base_url}{path}/" for hall, path in HALL_PATHS.items()}
+
+
+# CAMPUSDISH_BASE_URL in the environment points every scrape somewhere else
+URL_MAP = hall_urls(os.environ.get("CAMPUSDISH_BASE_URL") or CAMPUSDISH_BASE_URL)
+
 NY_TZ = ZoneInfo("America/New_York")
 
+REQUEST_TIMEOUT = 30           # seconds, per request
+SCRAPE_DEADLINE = 90           # seconds, for every page of one hall
+MAX_CONNECTIONS_PER_HOST = 4   # concurrent requests against one host
+CONNECTION_POOL_SIZE = 16      # keep-alive connections kept per host by the session
+
+BASE_PAGE = ""                 # page key of a hall's base page; period pages use their period id
+
+_session = None
+_session_lock = threading.Lock()
+
+
+def get_session() -> requests.Session:
+    """Process-wide keep-alive session shared by every CampusDish fetch."""
+    global _session
+    with _session_lock:
+        if _session is None:
+            session = requests.Session()
+            adapter = HTTPAdapter(
+                pool_connections=len(URL_MAP),
+                pool_maxsize=CONNECTION_POOL_SIZE,
+            )
+            session.mount("https://", adapter)
+            session.mount("http://", adapter)
+            _session = session
+    return _session
+
+
+class Page:
+    """One downloaded page. `text` is None when the server answered 304 Not Modified."""
+    __slots__ = ("url", "text", "etag", "last_modified", "size")
+
+    def __init__(self, url: str, text: str | None, etag: str = "", last_modified: str = "", size: int = 0):
+        self.url = url
+        self.text = text
+        self.etag = etag
+        self.last_modified = last_modified
+        self.size = size  # bytes on the wire
+
+    @property
+    def not_modified(self) -> bool:
+        return self.text is None
+
+
+def fetch_page(url: str, validators: dict | None = None, timeout: float = REQUEST_TIMEOUT) -> Page:
+    """
+    GET a page over the shared session. `validators` ({"etag", "last_modified"} from an
+    earlier fetch) turn it into a conditional request.
+    """
+    headers = {}
+    if validators:
+        if validators.get("etag"):
+            headers["If-None-Match"] = validators["etag"]
+        if validators.get("last_modified"):
+            headers["If-Modified-Since"] = validators["last_modified"]
+    r = get_session().get(url, headers=headers, timeout=timeout)
+    if r.status_code == 304:
+        return Page(url, None, validators.get("etag", ""), validators.get("last_modified", ""))
+    r.raise_for_status()
+    return Page(url, r.text, r.headers.get("ETag", ""), r.headers.get("Last-Modified", ""), len(r.content))
+
+
+def fetch_html(url: str, timeout: float = REQUEST_TIMEOUT) -> str:
+    return fetch_page(url, timeout=timeout).text
+
+
+def fetch_pages(urls: list[str], deadline: float = SCRAPE_DEADLINE,
+                max_per_host: int = MAX_CONNECTIONS_PER_HOST, validators: dict | None = None) -> dict:
+    """
+    Fetch several pages concurrently over the shared session.
+    At most `max_per_host` requests are in flight per host and the whole batch
+    has to finish within `deadline` seconds. `validators` optionally maps urls to
+    the conditional request validators to send (see fetch_page).
+    Returns {url: Page} where failed or unfinished urls map to the exception instead.
+    """
+    if not urls:
+        return {}
+    validators = validators or {}
+    ends_at = time.monotonic() + deadline
+    host_slots = {urlsplit(u).netloc: threading.Semaphore(max_per_host) for u in urls}
+
+    def fetch_one(url):
+        with host_slots[urlsplit(url).netloc]:
+            remaining = ends_at - time.monotonic()
+            if remaining <= 0:
+                raise TimeoutError(f"Scrape deadline exceeded before fetching {url}")
+            return fetch_page(url, validators.get(url), timeout=min(REQUEST_TIMEOUT, remaining))
+
+    pool = ThreadPoolExecutor(max_workers=min(len(urls), max_per_host * len(host_slots)))
+    futures = {pool.submit(fetch_one, u): u for u in urls}
+    done, _ = wait(futures, timeout=max(0.0, ends_at - time.monotonic()))
+    pool.shutdown(wait=False, cancel_futures=True)
+
+    results = {}
+    for future, url in futures.items():
+        if future not in done:
+            results[url] = TimeoutError(f"Scrape deadline of {deadline}s exceeded fetching {url}")
+        elif future.exception() is not None:
+            results[url] = future.exception()
+        else:
+            results[url] = future.result()
+    return results
+
+
 def get_model_from_html(url: str):
     """Fetch the page and extract the JSON object assigned to model:"""
-    r = requests.get(url, timeout=30)
-    r.raise_for_status()
-    html = r.text
+    return extract_model(fetch_html(url))
+
 
-    # non-greedy match for 'model: { ... }' block
-    m = re.search(r'model\s*:\s*({.*})', html, re.DOTALL)
+_MODEL_MARKER = re.compile(r'model\s*:\s*(?={)')
+_json_decoder = json.JSONDecoder()
+
+
+def extract_model(html: str) -> dict:
+    """
+    Extract the JSON object assigned to model: from a CampusDish page.
+    Finds the marker once and decodes from there in a single pass; decoding stops
+    at the object's closing brace, so the rest of the page is never scanned.
+    """
+    return _decode_model(html)[0]
+
+
+def _decode_model(html: str) -> tuple[dict, str]:
+    """The model: object and its source text, as stored by the payload archive."""
+    m = _MODEL_MARKER.search(html)
     if not m:
         raise RuntimeError("Could not find 'model:' in page")
-    obj_text = m.group(1)
-
-    # trim up to the matching closing brace by counting
-    depth = 0
-    for i, c in enumerate(obj_text):
-        if c == '{':
-            depth += 1
-        elif c == '}':
-            depth -= 1
-            if depth == 0:
-                obj_text = obj_text[:i+1]
-                break
-
-    return json.loads(obj_text)
-
-def get_menu_data(hall_name: str):
- 
-    url = URL_MAP.get(hall_name)
-    if not url:
+    try:
+        model, end = _json_decoder.raw_decode(html, m.end())
+    except json.JSONDecodeError as e:
+        raise RuntimeError(f"Could not decode 'model:' object: {e}") from e
+    return model, html[m.end():end]
+
+
+def get_menu_data(hall_name: str, deadline: float = SCRAPE_DEADLINE):
+    return run_snapshot_steps(snapshot_steps(hall_name, with_hours=False), deadline)["menu"]
+
+
+def get_hall_snapshot(hall_name: str, deadline: float = SCRAPE_DEADLINE,
+                      validators: dict | None = None, on_date: date | None = None,
+                      archive=None) -> dict:
+    """
+    Menu and hours for one hall, with the base page downloaded only once.
+    `on_date` asks CampusDish for another day's menu (default: whatever it shows today);
+    `archive` keeps the raw payloads (see snapshot_steps).
+
+    `validators` maps page keys (BASE_PAGE or a period id) to the {"etag",
+    "last_modified"} saved from the previous scrape; they are sent as conditional
+    request headers. Returns
+    {
+      "hall": ..., "date": on_date, "menu": <get_menu_data dict>, "hours": <get_hours dict>,
+      "pages": {page key: {"etag", "last_modified", "hash", "not_modified"}},
+      "unchanged": bool,
+      "stats": {"fetch_seconds", "extract_seconds", "parse_seconds", "requests", "bytes_downloaded"},
+    }
+    "unchanged" is True when every page answered 304; menu and hours are then None.
+    """
+    return run_snapshot_steps(
+        snapshot_steps(hall_name, validators, on_date=on_date, archive=archive), deadline
+    )
+
+
+def run_snapshot_steps(steps, deadline: float = SCRAPE_DEADLINE) -> dict:
+    """Drive snapshot_steps with fetch_pages, all rounds sharing one deadline."""
+    ends_at = time.monotonic() + deadline
+    try:
+        request = next(steps)
+        while True:
+            pages = fetch_pages(list(request), deadline=ends_at - time.monotonic(), validators=request)
+            request = steps.send(pages)
+    except StopIteration as done:
+        return done.value
+
+
+def _page_url(url: str, period_id: str | None = None, on_date: date | None = None) -> str:
+    params = {}
+    if period_id is not None:
+        params["periodId"] = period_id
+    if on_date is not None:
+        params["date"] = on_date.strftime("%m/%d/%Y")
+    return f"{url}?{urlencode(params)}" if params else url
+
+
+def _page_state(page, content_hash: str | None, not_modified: bool) -> dict:
+    """What change detection keeps about a fetched page."""
+    return {
+        "etag": page.etag if isinstance(page, Page) else "",
+        "last_modified": page.last_modified if isinstance(page, Page) else "",
+        "hash": content_hash,
+        "not_modified": not_modified,
+    }
+
+
+def _download(request: dict, stats: dict):
+    """One round of snapshot_steps' downloads, its wall time and bytes added to `stats`."""
+    started = time.perf_counter()
+    pages = yield request
+    stats["fetch_seconds"] += time.perf_counter() - started
+    stats["requests"] += len(request)
+    stats["bytes_downloaded"] += sum(page.size for page in pages.values() if isinstance(page, Page))
+    return pages
+
+
+def _required(page):
+    if isinstance(page, Exception):
+        raise page
+    return page
+
+
+def snapshot_steps(hall_name: str, validators: dict | None = None, with_hours: bool = True,
+                   on_date: date | None = None, archive=None):
+    """
+    The scrape of one hall as a generator, independent of how pages are downloaded.
+
+    Each round yields {url: validators or None} and expects back {url: Page or
+    exception}; the generator returns the get_hall_snapshot dict. run_snapshot_steps
+    drives it with threads, api.async_scrapers with asyncio.
+
+    With an `archive` (api.archive.PayloadArchive) every downloaded payload is
+    stored as it is decoded and complete scrapes are added to its index.
+
+    The snapshot's "stats" hold the seconds spent waiting on downloads, extracting
+    the page JSON and projecting menus, and the requests made and bytes received.
+    A scrape that fails raises with the stats gathered so far as the exception's
+    `stats`, so the time and bytes spent before it failed are still reported.
+    """
+    stats = {"fetch_seconds": 0.0, "extract_seconds": 0.0, "parse_seconds": 0.0,
+             "requests": 0, "bytes_downloaded": 0}
+    try:
+        return (yield from _snapshot_steps(hall_name, validators, with_hours, on_date, archive, stats))
+    except Exception as e:
+        e.stats = stats
+        raise
+
+
+def _snapshot_steps(hall_name: str, validators: dict | None, with_hours: bool, on_date: date | None,
+                    archive, stats: dict):
+    hall_url = URL_MAP.get(hall_name)
+    if not hall_url:
         raise ValueError(f"Unknown hall name: {hall_name}")
+    validators = validators or {}
+    url = _page_url(hall_url, on_date=on_date)
+
+    base = _required((yield from _download({url: validators.get(BASE_PAGE)}, stats))[url])
+    base_not_modified = base.not_modified
+    if base.not_modified:
+        period_ids = [key for key in validators if key != BASE_PAGE]
+        # a period page that sent no ETag or Last-Modified can't answer 304, so it may have changed
+        if all(validators[pid].get("etag") or validators[pid].get("last_modified") for pid in period_ids):
+            pages = yield from _download(
+                {_page_url(hall_url, pid, on_date): validators[pid] for pid in period_ids}, stats
+            )
+            if all(isinstance(p, Page) and p.not_modified for p in pages.values()):
+                page_states = {BASE_PAGE: _page_state(base, None, True)}
+                for pid in period_ids:
+                    page_states[pid] = _page_state(pages[_page_url(hall_url, pid, on_date)], None, True)
+                return {"hall": hall_name, "date": on_date, "menu": None, "hours": None,
+                        "pages": page_states, "unchanged": True, "stats": stats}
+        # something moved; the base page is needed in full for hours and periods
+        base = _required((yield from _download({url: None}, stats))[url])
+
+    started = time.perf_counter()
+    hours = parse_hours(base.text, on_date) if with_hours else None
     # base model straight from page
-    base_model = get_model_from_html(url)
+    base_model, base_text = _decode_model(base.text)
+    stats["extract_seconds"] += time.perf_counter() - started
+    archived = None
+    if archive is not None:
+        archived = {"base": archive.put(base_text), "hours": archive.put(_hours_blob_text(base.text))}
+    del base_text
     date_str = base_model.get("Date", "")
     location_id = str(base_model.get("LocationId", ""))
     periods = [(str(p["PeriodId"]), p.get("Name")) for p in base_model.get("Menu", {}).get("MenuPeriods", [])]
+    del base_model
+
+    # every period page in one round; pages answering 304 are fetched again in
+    # full, because the importer needs every period
+    period_urls = {pid: _page_url(hall_url, pid, on_date) for pid, _ in periods}
+    pages = yield from _download({period_urls[pid]: validators.get(pid) for pid in period_urls}, stats)
+    not_modified = {u for u, page in pages.items() if isinstance(page, Page) and page.not_modified}
+    if not_modified:
+        pages.update((yield from _download({u: None for u in sorted(not_modified)}, stats)))
 
+    # decode and project one page at a time so only one full payload is ever alive
     period_payloads = {}
+    page_states = {}
+    shared = Interner()
     for pid, pname in periods:
-        try:
-            payload = get_model_from_html(f"{url}?periodId={pid}")
-        except Exception:
-            payload = None
-        period_payloads[pid] = {"name": pname, "raw": payload}
+        page = pages.pop(period_urls[pid], None)
+        menu = None
+        if isinstance(page, Page):
+            try:
+                started = time.perf_counter()
+                model, text = _decode_model(page.text)
+                decoded = time.perf_counter()
+                stats["extract_seconds"] += decoded - started
+                menu = project_menu(model, shared)
+                stats["parse_seconds"] += time.perf_counter() - decoded
+            except Exception:
+                pass
+            else:
+                if archived is not None:
+                    archived[pid] = archive.put(text)
+                del model, text
+        period_payloads[pid] = {"name": pname, "menu": menu}
+        page_states[pid] = _page_state(
+            page, menu_hash(menu) if menu is not None else None, period_urls[pid] in not_modified
+        )
 
     combined = {
         "fetched_at": datetime.now(NY_TZ).replace(microsecond=0).isoformat(),
         "base_url": url,
         "date": date_str,
         "location_id": location_id,
-        "base_model_raw": base_model,
         "periods": period_payloads,
     }
-    return combined
+    if archived is not None and all(pid in archived for pid, _ in periods):
+        archive.record(hall_name, datetime.strptime(date_str, "%m/%d/%Y").date(), {
+            "fetched_at": combined["fetched_at"],
+            "base_url": url,
+            "location_id": location_id,
+            "base": archived["base"],
+            "hours": archived["hours"],
+            "periods": {pid: {"name": pname, "payload": archived[pid]} for pid, pname in periods},
+        })
+    base_hash = base_page_hash(combined, hours) if with_hours else None
+    page_states[BASE_PAGE] = _page_state(base, base_hash, base_not_modified)
+    return {"hall": hall_name, "date": on_date, "menu": combined, "hours": hours,
+            "pages": page_states, "unchanged": False, "stats": stats}
+
+
+def base_page_hash(menu: dict, hours: dict) -> str:
+    """Hash of what the importer takes from the base page: date, period list and hours."""
+    content = {
+        "date": menu["date"],
+        "location_id": menu["location_id"],
+        "periods": [[pid, block["name"]] for pid, block in menu["periods"].items()],
+        "hours": hours,
+    }
+    return hashlib.sha256(json.dumps(content, sort_keys=True).encode()).hexdigest()
+
 
 # TIME SCRAPER:
 
 
-def _extract_hours_blob(html: str) -> list[dict]:
+def _hours_blob_text(html: str) -> str:
     """
     Finds: currentHoursOfOperations = JSON.parse('[...]');
-    Returns a Python list of dicts.
+    Returns the JSON text inside the quotes.
     """
     m = re.search(
         r"currentHoursOfOperations\s*=\s*JSON\.parse\('(?P<blob>\[.*?\])'\)",
@@ -79,11 +383,15 @@ def _extract_hours_blob(html: str) -> list[dict]:
     )
     if not m:
         raise RuntimeError("Hours JSON not found on page")
-    blob = m.group("blob")
-    return json.loads(blob)
+    return m.group("blob")
+
+
+def _extract_hours_blob(html: str) -> list[dict]:
+    """The currentHoursOfOperations list as Python dicts."""
+    return json.loads(_hours_blob_text(html))
 
 
-def _js_dow_for(date_obj: datetime) -> int:
+def _js_dow_for(date_obj: date) -> int:
     """
     CampusDish WeekDay: 0=Sun..6=Sat.
     Python weekday(): 0=Mon..6=Sun.
@@ -118,12 +426,17 @@ def get_hours(hall_name: str) -> dict:
     if not url:
         raise ValueError(f"Unknown hall: {hall_name}. Options: {', '.join(URL_MAP)}")
 
-    r = requests.get(url, timeout=30)
-    r.raise_for_status()
-    blob = _extract_hours_blob(r.text)
+    return parse_hours(fetch_html(url))
+
+
+def parse_hours(html: str, on_date: date | None = None) -> dict:
+    """Hours (see get_hours) for `on_date`, default today, from an already downloaded hall page."""
+    return hours_from_blob(_extract_hours_blob(html), on_date)
+
 
-    today_local = datetime.now(NY_TZ)
-    js_dow = _js_dow_for(today_local)
+def hours_from_blob(blob: list[dict], on_date: date | None = None) -> dict:
+    """Hours for `on_date`, default today, from a parsed currentHoursOfOperations list."""
+    js_dow = _js_dow_for(on_date or datetime.now(NY_TZ))
 
     # Filter to today's, skip closed blocks
     todays = [h for h in blob if h.get("WeekDay") == js_dow and not h.get("IsClosed")]
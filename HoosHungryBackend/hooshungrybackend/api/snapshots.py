@@ -0,0 +1,69 @@
+"""
+Pre-rendered menu_info responses, written when a hall/day is imported.
+
+Once load_menu_data has committed a day, importers.write_snapshots renders it
+(render_snapshots) for every period menu_info can be asked for, exactly as
+menu_info would, and stores each body as bytes under a primary key made of the
+request (snapshot_key). menu_info then answers with one primary key lookup and
+no ORM walk or serializer. A request without a snapshot (a day imported before
+snapshots existed, or a period name the hall spells its own way) is answered
+the slow way.
+
+A changed product another day serves gets a new version (see
+importers.DayRows.sync_products), so other days' snapshots stay true. One
+updated in place that another import started serving meanwhile is caught by
+importers.refresh_snapshots_serving.
+"""
+from rest_framework.renderers import JSONRenderer
+
+from .models import Day, DiningHall, MenuSnapshot, Period
+from .serializers import PeriodSerializer
+
+PERIOD_NAME_MAP = {
+    "breakfast": "Breakfast",
+    "lunch": "Lunch",
+    "dinner": "Dinner",
+    "late_night": "Late Night",
+    "brunch": "Brunch",
+    "all_day": "All Day",
+}
+
+
+def snapshot_key(hall_name: str, on_date, period_key: str) -> str:
+    return f"{hall_name}/{on_date}/{period_key}"
+
+
+def menu_info_data(hall_name: str, day: Day, period: Period) -> dict:
+    """menu_info's response body for one period of a published day."""
+    return {
+        "dining_hall": hall_name,
+        "date": str(day.date),
+        "day_name": day.day_name,
+        "hall_hours": {
+            "open_time": str(day.open_time),
+            "close_time": str(day.close_time)
+        },
+        "period": PeriodSerializer(period).data
+    }
+
+
+def render_snapshots(hall: DiningHall, on_date) -> tuple[int | None, list[MenuSnapshot]]:
+    """
+    The primary key of a hall/day's published day (None if there is none) and
+    its snapshots, rendered but not saved; see importers.write_snapshots.
+    """
+    snapshots = []
+    day = Day.objects.published().filter(dining_hall=hall, date=on_date).first()
+    if day is None:
+        return None, snapshots
+    periods = list(Period.objects.with_menu().filter(day=day).order_by("pk"))
+    renderer = JSONRenderer()
+    for period_key, period_name in PERIOD_NAME_MAP.items():
+        # the period menu_info's name__icontains lookup finds first
+        period = next((p for p in periods if period_name.lower() in p.name.lower()), None)
+        if period is not None:
+            snapshots.append(MenuSnapshot(
+                key=snapshot_key(hall.name, on_date, period_key), hall=hall.name, date=on_date,
+                body=renderer.render(menu_info_data(hall.name, day, period)),
+            ))
+    return day.pk, snapshots
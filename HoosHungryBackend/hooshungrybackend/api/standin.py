@@ -0,0 +1,261 @@
+"""
+Local stand-in for the CampusDish location pages, built from the payloads saved in
+ohill_dumps/. Used to benchmark and test the scrapers without touching the network.
+
+    with CampusDishStandin(latency=0.2) as standin:
+        url = standin.url_for("ohill")   # http://127.0.0.1:<port>/ohill/
+
+Halls answer both at /<hall>/ and at their CampusDish path, so hall_urls(standin.base_url)
+or CAMPUSDISH_BASE_URL=<base url> sends the real scraper to it. Latency can be given
+jitter, and a seeded share of requests can fail: an error status, a dropped
+connection, or a page cut off halfway through.
+
+    python manage.py campusdish_standin --port 8765 --latency 0.1 --error-rate 0.05
+"""
+import hashlib
+import json
+import random
+import threading
+import time
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from urllib.parse import parse_qs, urlsplit
+
+from .scrapers import HALL_PATHS
+
+DUMPS_DIR = Path(__file__).resolve().parents[3] / "ohill_dumps"
+
+PAGE_TEMPLATE = """<!DOCTYPE html>
+<html>
+<head><title>CampusDish stand-in</title></head>
+<body>
+<div id="menu"></div>
+<script type="text/javascript">
+    var currentHoursOfOperations = JSON.parse('{hours}');
+    window.menuApp = new MenuApp({{
+        el: '#menu',
+        model: {model},
+        isLoggedIn: false
+    }});
+</script>
+</body>
+</html>
+"""
+
+
+def load_dump_payloads(dumps_dir: Path = DUMPS_DIR) -> tuple[dict, dict]:
+    """
+    Returns (base_model, {period_id: model}) from the saved ohill dumps.
+    Period payloads come from period_<id>.json, falling back to the combined raw dump.
+    """
+    combined_path = next(iter(sorted(dumps_dir.glob("ohill_raw_*.json"))))
+    with open(combined_path) as f:
+        combined = json.load(f)
+    base_model = combined["base_model_raw"]
+
+    periods = {}
+    for pid, block in combined.get("periods", {}).items():
+        period_path = dumps_dir / f"period_{pid}.json"
+        if period_path.exists():
+            with open(period_path) as f:
+                periods[pid] = json.load(f)
+        elif block.get("raw"):
+            periods[pid] = block["raw"]
+    return base_model, periods
+
+
+# Typical UVA dining hours per period name, applied to every day of the week
+PERIOD_HOURS = {
+    "Breakfast": ("07:00", "10:30"),
+    "Brunch": ("10:00", "14:00"),
+    "Lunch": ("11:00", "14:30"),
+    "Dinner": ("17:00", "21:00"),
+    "Late Night": ("21:00", "23:59"),
+}
+
+
+def hours_of_operation(base_model: dict) -> list[dict]:
+    """Builds a currentHoursOfOperations list covering every period on every weekday."""
+    blocks = []
+    for week_day in range(7):
+        for period in base_model.get("Menu", {}).get("MenuPeriods", []):
+            start, end = PERIOD_HOURS.get(period.get("Name"), ("00:00", "23:59"))
+            blocks.append({
+                "WeekDay": week_day,
+                "IsClosed": False,
+                "MealPeriodId": int(period["PeriodId"]),
+                "LocalStartTime": f"2025-09-17T{start}:00",
+                "LocalEndTime": f"2025-09-17T{end}:00",
+            })
+    return blocks
+
+
+def render_page(model: dict, hours: list[dict]) -> bytes:
+    return PAGE_TEMPLATE.format(model=json.dumps(model), hours=json.dumps(hours)).encode("utf-8")
+
+
+class _StandinHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive, like the real site
+
+    def do_GET(self):
+        standin = self.server.standin
+        parts = urlsplit(self.path)
+        hall = standin.hall_for(parts.path)
+        query = parse_qs(parts.query)
+
+        delay, fault = standin.draw(hall is not None)
+        if delay:
+            time.sleep(delay)
+        standin.record_request(self.path)
+
+        if hall is None:
+            self._send(404, b"Not found")
+            return
+        if fault == "drop":
+            self.close_connection = True
+            return
+        if fault == "error":
+            self._send(standin.error_status, b"Injected failure")
+            return
+        period_id = query.get("periodId", [None])[0]
+        body = standin.page(period_id, query.get("date", [None])[0])
+        if body is None:
+            self._send(404, b"Unknown period")
+            return
+        if fault == "truncate":
+            body = body[:len(body) // 2]
+
+        etag = '"%s"' % hashlib.sha1(body).hexdigest()
+        if standin.etags and self.headers.get("If-None-Match") == etag:
+            self._send(304, b"", etag)
+            return
+        self._send(200, body, etag if standin.etags else None)
+
+    def _send(self, code: int, body: bytes, etag: str | None = None):
+        self.send_response(code)
+        if etag:
+            self.send_header("ETag", etag)
+        self.send_header("Content-Type", "text/html; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        try:
+            self.wfile.write(body)
+        except (BrokenPipeError, ConnectionResetError):
+            pass  # the client gave up, e.g. a scrape deadline expired
+
+    def log_message(self, format, *args):
+        pass
+
+
+class CampusDishStandin:
+    """
+    Threaded HTTP server serving every hall from the same ohill payloads.
+
+    Each request waits `latency` plus up to `jitter` seconds. Of the requests for a
+    known hall, `error_rate` get `error_status`, `drop_rate` are closed without an
+    answer and `truncate_rate` get half a page; `seed` makes the draws repeatable.
+    """
+
+    def __init__(self, halls=("ohill", "newcomb", "runk"), latency: float = 0.0,
+                 etags: bool = True, host: str = "127.0.0.1", port: int = 0,
+                 jitter: float = 0.0, error_rate: float = 0.0, error_status: int = 503,
+                 drop_rate: float = 0.0, truncate_rate: float = 0.0, seed: int | None = None):
+        self.halls = set(halls)
+        self.latency = latency
+        self.etags = etags
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.error_status = error_status
+        self.drop_rate = drop_rate
+        self.truncate_rate = truncate_rate
+        self.faults = Counter()
+        self._random = random.Random(seed)
+        self._random_lock = threading.Lock()
+        self._paths = {f"/{hall}/": hall for hall in self.halls}
+        self._paths.update({f"/{HALL_PATHS[hall]}/": hall for hall in self.halls if hall in HALL_PATHS})
+        self.base_model, self.period_models = load_dump_payloads()
+        self.hours = hours_of_operation(self.base_model)
+        self._pages = {}
+        self._pages_lock = threading.Lock()
+        self.requests = []
+        self._requests_lock = threading.Lock()
+        self._server = ThreadingHTTPServer((host, port), _StandinHandler)
+        self._server.daemon_threads = True
+        self._server.standin = self
+        self._thread = None
+
+    def hall_for(self, path: str) -> str | None:
+        return self._paths.get(path if path.endswith("/") else path + "/")
+
+    def draw(self, known_hall: bool = True) -> tuple[float, str | None]:
+        """This request's delay and injected fault ("error", "drop", "truncate" or None)."""
+        with self._random_lock:
+            delay = self.latency + (self._random.uniform(0, self.jitter) if self.jitter else 0.0)
+            roll = self._random.random()
+        fault = None
+        if known_hall:
+            for name, rate in (("error", self.error_rate), ("drop", self.drop_rate),
+                               ("truncate", self.truncate_rate)):
+                if roll < rate:
+                    fault = name
+                    break
+                roll -= rate
+        if fault:
+            with self._random_lock:
+                self.faults[fault] += 1
+        return delay, fault
+
+    def page(self, period_id: str | None, menu_date: str | None) -> bytes | None:
+        """
+        The rendered base page (period_id None) or a period page. With ?date=MM/DD/YYYY
+        the same payload is served with its Date set to that day.
+        """
+        key = (period_id, menu_date)
+        with self._pages_lock:
+            if key not in self._pages:
+                model = self.base_model if period_id is None else self.period_models.get(period_id)
+                if model is None:
+                    return None
+                if menu_date:
+                    model = {**model, "Date": menu_date}
+                self._pages[key] = render_page(model, self.hours)
+            return self._pages[key]
+
+    def set_period_model(self, period_id: str, model: dict):
+        """Replace what a period page serves, e.g. to simulate a menu update."""
+        with self._pages_lock:
+            self.period_models[period_id] = model
+            self._pages = {k: v for k, v in self._pages.items() if k[0] != period_id}
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def url_for(self, hall: str) -> str:
+        return f"{self.base_url}/{hall}/"
+
+    def url_map(self) -> dict:
+        return {hall: self.url_for(hall) for hall in self.halls}
+
+    def record_request(self, path: str):
+        with self._requests_lock:
+            self.requests.append(path)
+
+    def start(self):
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        if self._thread is not None:
+            self._server.shutdown()
+            self._thread = None
+        self._server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
@@ -0,0 +1,28 @@
+import datetime
+
+from api.models import DiningHall, Day, Period, Station, Product, MenuItem, NutritionInfo
+
+# a private in-memory menu cache, emptied before each test
+MENU_CACHE = {
+    "default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"},
+    "menus": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache", "LOCATION": "test-menus"},
+}
+
+
+def make_day(hall: DiningHall, on_date: datetime.date, item_name: str) -> Day:
+    day = Day.objects.create(
+        date=on_date,
+        day_name=on_date.strftime("%A"),
+        open_time=datetime.time(7, 0),
+        close_time=datetime.time(21, 0),
+        dining_hall=hall,
+    )
+    period = Period.objects.create(
+        name="Dinner", vendor_id="1424",
+        start_time=datetime.time(17, 0), end_time=datetime.time(21, 0), day=day,
+    )
+    station = Station.objects.create(name="Grill", number="22683", period=period)
+    product, _ = Product.objects.get_or_create(vendor_id=f"name:{item_name}", item_name=item_name)
+    NutritionInfo.objects.get_or_create(product=product, defaults={"calories": 300})
+    MenuItem.objects.create(station=station, product=product)
+    return day
@@ -0,0 +1,93 @@
+import tempfile
+from datetime import datetime
+from io import StringIO
+from pathlib import Path
+from unittest import mock
+
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+
+from api import scrapers
+from api.archive import PayloadArchive
+from api.models import Day, MenuItem
+from api.scrapers import get_hall_snapshot
+from api.standin import CampusDishStandin
+
+
+class PayloadArchiveTests(TestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.archive = PayloadArchive(tmp.name)
+
+    def test_round_trip_and_dedup(self):
+        text = '{"Menu": {"MenuProducts": []}}' * 100
+        key = self.archive.put(text)
+        self.assertEqual(self.archive.put(text), key)
+        self.assertEqual(self.archive.get(key), text)
+        objects = list((self.archive.root / "objects").rglob("*.json.*"))
+        self.assertEqual(len(objects), 1)
+        self.assertLess(objects[0].stat().st_size, len(text))
+
+    def test_missing_entry(self):
+        self.assertIsNone(self.archive.entry("ohill", datetime(2025, 9, 17).date()))
+        with self.assertRaises(KeyError):
+            self.archive.get("0" * 64)
+
+
+class ArchivedScrapeTests(TestCase):
+    def setUp(self):
+        self.standin = CampusDishStandin().start()
+        self.addCleanup(self.standin.stop)
+        patcher = mock.patch.dict(scrapers.URL_MAP, self.standin.url_map())
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.archive_dir = Path(tmp.name)
+        self.served = datetime.strptime(self.standin.base_model["Date"], "%m/%d/%Y").date()
+
+    def test_identical_payloads_are_stored_once(self):
+        archive = PayloadArchive(self.archive_dir)
+        for hall in ("ohill", "newcomb", "runk"):
+            get_hall_snapshot(hall, archive=archive)
+
+        self.assertEqual(archive.halls_for(self.served), ["newcomb", "ohill", "runk"])
+        # every hall serves the same base page, hours and four period pages
+        self.assertEqual(len(list((self.archive_dir / "objects").rglob("*.json.*"))), 6)
+        entry = archive.entry("ohill", self.served)
+        self.assertEqual(set(entry["periods"]), set(self.standin.period_models))
+
+    def test_replayed_snapshot_matches_scraped_one(self):
+        archive = PayloadArchive(self.archive_dir)
+        scraped = get_hall_snapshot("ohill", archive=archive)
+        replayed = archive.load_snapshot("ohill", self.served)
+        self.assertEqual(replayed["menu"]["date"], scraped["menu"]["date"])
+        self.assertEqual(replayed["menu"]["periods"].keys(), scraped["menu"]["periods"].keys())
+        self.assertEqual(
+            scrapers.base_page_hash(replayed["menu"], replayed["hours"]),
+            scrapers.base_page_hash(scraped["menu"], scraped["hours"]),
+        )
+
+    def test_replay_command_imports_without_network(self):
+        with override_settings(MENU_ARCHIVE_DIR=str(self.archive_dir)):
+            call_command("scrape_menus", "--hall", "ohill", "--date", self.served.isoformat(),
+                         stdout=StringIO(), stderr=StringIO())
+            item_count = MenuItem.objects.count()
+            Day.objects.all().delete()
+            self.standin.requests.clear()
+
+            out = StringIO()
+            call_command("scrape_menus", "--hall", "ohill", "--replay", self.served.isoformat(),
+                         stdout=out, stderr=StringIO())
+
+        self.assertIn(f"Replayed ohill for {self.served}", out.getvalue())
+        self.assertEqual(self.standin.requests, [])
+        self.assertEqual(MenuItem.objects.count(), item_count)
+
+    def test_replay_of_missing_day_reports_it(self):
+        err = StringIO()
+        with override_settings(MENU_ARCHIVE_DIR=str(self.archive_dir)):
+            call_command("scrape_menus", "--hall", "runk", "--replay", "2024-01-01",
+                         stdout=StringIO(), stderr=err)
+        self.assertIn("No archived payloads for runk on 2024-01-01", err.getvalue())
@@ -0,0 +1,53 @@
+import datetime
+import unittest
+from decimal import Decimal
+
+from django.db import connection
+from django.test import SimpleTestCase, TestCase
+
+from api.bulk import COPY_MIN_ROWS, bulk_insert, copy_text
+from api.models import Product
+
+
+class CopyTextTests(SimpleTestCase):
+    def test_values_in_copy_text_format(self):
+        row = [None, True, False, 7, Decimal("1.50"), datetime.date(2025, 9, 17), datetime.time(7, 30), "Mac & Cheese"]
+        self.assertEqual(copy_text([row]), "\\N\tt\tf\t7\t1.50\t2025-09-17\t07:30:00\tMac & Cheese\n")
+
+    def test_separators_in_text_are_escaped(self):
+        self.assertEqual(copy_text([["a\tb\nc\\d\re"]]), "a\\tb\\nc\\\\d\\re\n")
+
+
+class BulkInsertTests(TestCase):
+    def test_falls_back_to_bulk_create(self):
+        products = bulk_insert(Product, [Product(vendor_id=f"M{i}", item_name="Egg") for i in range(3)])
+        self.assertEqual(Product.objects.count(), 3)
+        self.assertTrue(all(p.pk for p in products))
+
+
+@unittest.skipUnless(connection.vendor == "postgresql", "COPY is PostgreSQL only")
+class CopyInsertTests(TestCase):
+    def products(self, first: int, count: int) -> list:
+        return [Product(vendor_id=f"M{i}", item_name=f"Dish {i}\tof\nthe day") for i in range(first, first + count)]
+
+    def test_copy_straight_into_the_table(self):
+        products = bulk_insert(Product, self.products(0, COPY_MIN_ROWS))
+        self.assertEqual(Product.objects.count(), COPY_MIN_ROWS)
+        stored = Product.objects.get(pk=products[5].pk)
+        self.assertEqual((stored.vendor_id, stored.item_name), ("M5", "Dish 5\tof\nthe day"))
+        self.assertFalse(products[5]._state.adding)
+        # the sequence moved past the reserved keys
+        self.assertGreater(Product.objects.create(vendor_id="next", item_name="Egg").pk, products[-1].pk)
+
+    def test_staged_merge_skips_conflicting_rows(self):
+        Product.objects.create(vendor_id="M3", item_name="Kept")
+        with connection.cursor() as cursor:
+            # a regular table with the staging table's name must be left alone
+            cursor.execute("CREATE TABLE stage_api_product (id integer)")
+            cursor.execute("INSERT INTO stage_api_product VALUES (1)")
+            products = bulk_insert(Product, self.products(0, COPY_MIN_ROWS), ignore_conflicts=True)
+            cursor.execute("SELECT COUNT(*) FROM stage_api_product")
+            self.assertEqual(cursor.fetchone()[0], 1)
+        self.assertEqual(Product.objects.count(), COPY_MIN_ROWS)
+        self.assertEqual(Product.objects.get(vendor_id="M3").item_name, "Kept")
+        self.assertTrue(all(p.pk is None for p in products))
@@ -1,17 +1,28 @@
+import copy
 import os
 import re
 import json
+import unittest
 from datetime import datetime
+from unittest import mock
 import requests
-from django.test import TestCase, skipUnlessDBFeature
+from django.core.cache import caches
+from django.db import connection
+from django.test import TestCase, override_settings, skipUnlessDBFeature
+from django.test.utils import CaptureQueriesContext
 
 # ⬇️ CHANGE THIS import to wherever your loader lives.
 # e.g., from ..ingest import load_menu_data
-from api.importers import load_menu_data
+from api import importers
+from api.importers import load_menu_data, publish_day, purge_superseded_days
 
+from api.menu_cache import generation_key
 from api.models import (
-    DiningHall, Day, Period, Station, MenuItem, Allergen, NutritionInfo
+    DiningHall, Day, Period, Station, Product, MenuItem, Allergen, NutritionInfo, MenuSnapshot
 )
+from api.payloads import project_menu
+from api.standin import DUMPS_DIR
+from api.tests.helpers import MENU_CACHE
 
 CAMPUSDISH = {
     "ohill": "https://virginia.campusdish.com/en/locationsandmenus/observatoryhilldiningroom/",
@@ -124,6 +135,8 @@ def _fetch_and_build(hall_key: str):
     return _build_loader_payload(model)
 
 
+@unittest.skipUnless(os.environ.get("CAMPUSDISH_LIVE_TESTS"),
+                     "set CAMPUSDISH_LIVE_TESTS=1 to import from the real CampusDish site")
 class LiveCampusDishIngestTests(TestCase):
     maxDiff = None
 
@@ -176,4 +189,264 @@ class LiveCampusDishIngestTests(TestCase):
     def test_ingest_runk_live(self):
         data, hours = _fetch_and_build("runk")
         load_menu_data("runk", data, hours)
-        self.assertTrue(DiningHall.objects.filter(name="runk").exists())
\ No newline at end of file
+        self.assertTrue(DiningHall.objects.filter(name="runk").exists())
+
+def _load_ohill_dump() -> tuple[dict, dict]:
+    """The saved ohill scrape (raw payloads) plus hours covering each of its periods."""
+    with open(DUMPS_DIR / "ohill_raw_09-17-2025.json") as f:
+        data = json.load(f)
+    hours = {
+        "open_time": "07:00",
+        "close_time": "23:59",
+        "periods": {pid: {"start_time": "07:00", "end_time": "10:30"} for pid in data["periods"]},
+    }
+    return data, hours
+
+
+class OhillDumpIngestTests(TestCase):
+    def _item_rows(self):
+        return [
+            (i.station.period.vendor_id, i.station.number, i.item_name, i.ingredients,
+             i.is_vegan, i.is_vegetarian, i.is_gluten,
+             sorted(a.name for a in i.allergens.all()),
+             i.nutrition_info.calories, i.nutrition_info.sodium, i.nutrition_info.serving_size)
+            for i in MenuItem.objects.order_by("id").select_related("station__period", "product__nutrition_info")
+        ]
+
+    def test_ingest_saved_dump(self):
+        data, hours = _load_ohill_dump()
+        load_menu_data("ohill", data, hours)
+
+        day = Day.objects.get(dining_hall__name="ohill", date=datetime(2025, 9, 17).date())
+        self.assertEqual(day.periods.count(), 4)
+        self.assertEqual(MenuItem.objects.filter(station__period__day=day).count(), 397)
+
+        egg = MenuItem.objects.filter(product__item_name="Hard-Cooked Egg").first()
+        self.assertEqual(egg.nutrition_info.calories, 70)
+        self.assertEqual(egg.nutrition_info.serving_size, "1 each")
+        self.assertIn("Eggs", egg.allergens.values_list("name", flat=True))
+        self.assertFalse(egg.is_gluten)
+
+    def test_projected_and_raw_payloads_import_identically(self):
+        data, hours = _load_ohill_dump()
+        load_menu_data("ohill", data, hours)
+        from_raw = self._item_rows()
+
+        projected = {
+            **data,
+            "periods": {pid: {"name": block["name"], "menu": project_menu(block["raw"])}
+                        for pid, block in data["periods"].items()},
+        }
+        load_menu_data("ohill", projected, hours)
+        self.assertEqual(self._item_rows(), from_raw)
+
+    def test_import_writes_each_table_in_bulk(self):
+        data, hours = _load_ohill_dump()
+        load_menu_data("ohill", data, hours)
+        first = self._item_rows()
+
+        with CaptureQueriesContext(connection) as queries:
+            load_menu_data("ohill", data, hours)
+        # a fixed number of queries for 397 items, not several per item
+        self.assertLess(len(queries), 60)
+        self.assertEqual(self._item_rows(), first)
+        self.assertEqual(Allergen.objects.count(), len(set(Allergen.objects.values_list("name", flat=True))))
+
+
+class IncrementalImportTests(TestCase):
+    def setUp(self):
+        data, self.hours = _load_ohill_dump()
+        self.data = {
+            **data,
+            "periods": {pid: {"name": block["name"], "menu": project_menu(block["raw"])}
+                        for pid, block in data["periods"].items()},
+        }
+        load_menu_data("ohill", self.data, self.hours)
+        self.ids = dict(MenuItem.objects.values_list("product__vendor_id", "id"))
+
+    def test_same_payload_writes_nothing(self):
+        with CaptureQueriesContext(connection) as queries:
+            changes = load_menu_data("ohill", self.data, self.hours)
+        self.assertFalse(changes)
+        self.assertEqual(str(changes), "no changes")
+        self.assertEqual(dict(MenuItem.objects.values_list("product__vendor_id", "id")), self.ids)
+        writes = [q["sql"] for q in queries if q["sql"].startswith(("INSERT", "UPDATE", "DELETE"))]
+        self.assertFalse([sql for sql in writes if "api_dininghall" not in sql])
+
+    def test_import_writes_menu_snapshots(self):
+        keys = set(MenuSnapshot.objects.filter(hall="ohill").values_list("key", flat=True))
+        on_date = datetime.strptime(self.data["date"], "%m/%d/%Y").date()
+        self.assertEqual(keys, {f"ohill/{on_date}/{key}" for key in ("breakfast", "lunch", "dinner", "late_night")})
+
+        self.data["periods"]["1421"]["menu"].products[0].name = "Soft-Boiled Egg"
+        load_menu_data("ohill", self.data, self.hours)
+        breakfast = MenuSnapshot.objects.get(key=f"ohill/{on_date}/breakfast")
+        self.assertIn(b'"item_name":"Soft-Boiled Egg"', bytes(breakfast.body))
+
+    def test_changed_product_served_elsewhere_gets_a_new_version(self):
+        past = datetime.strptime(self.data["date"], "%m/%d/%Y").date()
+        load_menu_data("runk", self.data, self.hours)
+        egg = self.data["periods"]["1421"]["menu"].products[0]
+        old = Product.objects.get(vendor_id=egg.product_id)
+
+        egg.name = "Soft-Boiled Egg"
+        changes = load_menu_data("ohill", self.data, self.hours)
+        # runk's day keeps what it served, ohill's item keeps its id and shows the new version
+        old.refresh_from_db()
+        self.assertEqual((old.vendor_id, old.item_name), (f"{egg.product_id}@{old.pk}", "Hard-Cooked Egg"))
+        new = Product.objects.get(vendor_id=egg.product_id)
+        self.assertEqual(changes.created["Product"], [new.pk])
+        self.assertEqual(MenuItem.objects.get(pk=self.ids[egg.product_id]).product, new)
+        self.assertTrue(MenuItem.objects.filter(product=old, station__period__day__dining_hall__name="runk").exists())
+        breakfast = MenuSnapshot.objects.get(key=f"runk/{past}/breakfast")
+        self.assertIn(b'"item_name":"Hard-Cooked Egg"', bytes(breakfast.body))
+
+        # the next runk import moves it to the new version too, and keeps its ids
+        runk_ids = set(MenuItem.objects.filter(station__period__day__dining_hall__name="runk")
+                       .values_list("id", flat=True))
+        load_menu_data("runk", self.data, self.hours)
+        self.assertFalse(MenuItem.objects.filter(product=old).exists())
+        self.assertEqual(set(MenuItem.objects.filter(station__period__day__dining_hall__name="runk")
+                             .values_list("id", flat=True)), runk_ids)
+
+    @override_settings(CACHES=MENU_CACHE)
+    def test_import_retires_cached_menus(self):
+        caches["menus"].set(generation_key("ohill"), 1)
+        load_menu_data("ohill", self.data, self.hours)
+        self.assertEqual(caches["menus"].get(generation_key("ohill")), 1)
+
+        self.data["periods"]["1421"]["menu"].products[0].name = "Soft-Boiled Egg"
+        load_menu_data("ohill", self.data, self.hours)
+        self.assertNotEqual(caches["menus"].get(generation_key("ohill")), 1)
+
+    def test_changed_product_is_updated_in_place(self):
+        product = self.data["periods"]["1421"]["menu"].products[0]
+        product.name = "Soft-Boiled Egg"
+        product.nutrition = (("Calories", "80"),)
+        changes = load_menu_data("ohill", self.data, self.hours)
+
+        item_id = self.ids[product.product_id]
+        self.assertEqual(changes.updated["Product"], [Product.objects.get(vendor_id=product.product_id).pk])
+        self.assertEqual(str(changes), "Product: 1 updated")
+        item = MenuItem.objects.get(pk=item_id)
+        self.assertEqual(item.item_name, "Soft-Boiled Egg")
+        self.assertEqual(item.nutrition_info.calories, 80)
+        self.assertIsNone(item.nutrition_info.protein)
+        self.assertEqual(changes.updated["NutritionInfo"], [item.nutrition_info.pk])
+
+    def test_added_and_removed_products(self):
+        menu = self.data["periods"]["1421"]["menu"]
+        removed = menu.products.pop(0)
+        added = copy.copy(menu.products[0])
+        added.product_id = "M99999_695"
+        added.filters = {"ContainsSesame": True}
+        added.allergen_statement = ""
+        menu.products.append(added)
+
+        changes = load_menu_data("ohill", self.data, self.hours)
+        self.assertEqual(changes.deleted["MenuItem"], [self.ids[removed.product_id]])
+        self.assertEqual(len(changes.created["MenuItem"]), 1)
+        self.assertEqual(str(changes), "Product: 1 created; MenuItem: 1 created, 1 deleted")
+        # the removed item's product stays in the catalog
+        self.assertTrue(Product.objects.filter(vendor_id=removed.product_id).exists())
+        self.assertFalse(MenuItem.objects.filter(pk=self.ids[removed.product_id]).exists())
+        new_item = MenuItem.objects.get(product__vendor_id="M99999_695")
+        self.assertEqual(list(new_item.allergens.values_list("name", flat=True)), ["Sesame"])
+        self.assertEqual(MenuItem.objects.count(), 397)
+        # the catalog rows that came with it are counted too
+        self.assertEqual(changes.created["NutritionInfo"], [new_item.product.nutrition_info.pk])
+        self.assertEqual(len(changes.created["Product_allergens"]), 1)
+
+    def test_products_without_an_id_stay_apart(self):
+        first, second = self.data["periods"]["1421"]["menu"].products[:2]
+        long_name = "Chef's Special Omelette with Seasonal Vegetables and"
+        first.product_id, first.name = "", f"{long_name} Ham"
+        second.product_id, second.name = "", f"{long_name} Tofu"
+        load_menu_data("ohill", self.data, self.hours)
+        load_menu_data("runk", self.data, self.hours)
+        # one product per name and hall, not one shared by every dish of a similar name
+        served = Product.objects.filter(item_name__startswith=long_name)
+        self.assertEqual(served.count(), 4)
+        self.assertEqual(served.filter(menu_items__station__period__day__dining_hall__name="runk").count(), 2)
+
+    def test_removed_period_takes_its_rows_along(self):
+        del self.data["periods"]["1425"]
+        del self.hours["periods"]["1425"]
+        day = Day.objects.get()
+        changes = load_menu_data("ohill", self.data, self.hours)
+        self.assertEqual(len(changes.deleted["Period"]), 1)
+        self.assertEqual(changes.created["Period"], [])
+        self.assertEqual(Day.objects.get().pk, day.pk)
+        self.assertEqual(Period.objects.count(), 3)
+        self.assertFalse(Station.objects.filter(period__vendor_id="1425").exists())
+        self.assertEqual(MenuItem.objects.count(), 397 - 71)
+
+    def test_large_change_keeps_the_ids_of_surviving_items(self):
+        kept = {}
+        for block in self.data["periods"].values():
+            menu = block["menu"]
+            removed = {p.product_id for p in menu.products[:15]}
+            menu.products = [p for p in menu.products if p.product_id not in removed]
+        for item in MenuItem.objects.select_related("product", "station__period"):
+            kept[(item.station.period.vendor_id, item.station.number, item.product.vendor_id)] = item.pk
+        with mock.patch("api.importers.lock_day", wraps=importers.lock_day) as lock:
+            changes = load_menu_data("ohill", self.data, self.hours)
+        deleted = len(changes.deleted["MenuItem"])
+        self.assertGreater(deleted, importers.IN_PLACE_LIMIT)
+        self.assertEqual(str(changes), f"MenuItem: {deleted} deleted")
+        # one short lock for the diff, one per batch of deletes, one to swap the snapshots
+        self.assertEqual(lock.call_count, 2 + -(-deleted // importers.IN_PLACE_LIMIT))
+        for item in MenuItem.objects.select_related("product", "station__period"):
+            key = (item.station.period.vendor_id, item.station.number, item.product.vendor_id)
+            self.assertEqual(item.pk, kept[key])
+        self.assertEqual(MenuItem.objects.count(), 397 - deleted)
+
+    def test_pending_day_is_not_published(self):
+        day = Day.objects.get()
+        pending = Day.objects.create(date=day.date, open_time=day.open_time, close_time=day.close_time,
+                                     dining_hall=day.dining_hall, is_published=False)
+        self.assertEqual(list(Day.objects.published()), [day])
+        # a pending day newer than the published one may still be publishing
+        self.assertEqual(purge_superseded_days(), 0)
+        publish_day(pending)
+        self.assertEqual(list(Day.objects.published()), [pending])
+        self.assertEqual(purge_superseded_days(), 1)
+        self.assertFalse(MenuItem.objects.exists())
+
+    def test_older_pending_day_cannot_replace_a_newer_one(self):
+        day = Day.objects.get()
+        older, newer = (
+            Day.objects.create(date=day.date, open_time=day.open_time, close_time=day.close_time,
+                               dining_hall=day.dining_hall, is_published=False)
+            for _ in range(2)
+        )
+        self.assertTrue(publish_day(newer))
+        self.assertFalse(publish_day(older))
+        self.assertEqual(list(Day.objects.published()), [newer])
+        self.assertEqual(purge_superseded_days(), 2)
+        self.assertEqual(list(Day.objects.all()), [newer])
+
+    def test_import_overtaken_by_a_later_one_discards_its_day(self):
+        def overtaken(day):
+            Day.objects.create(date=day.date, open_time=day.open_time, close_time=day.close_time,
+                               dining_hall=day.dining_hall, is_published=False)
+            return publish_day(day)
+
+        with mock.patch("api.importers.publish_day", side_effect=overtaken):
+            changes = load_menu_data("ohill", {**self.data, "date": "09/18/2025"}, self.hours)
+        self.assertFalse(changes.created["MenuItem"])
+        self.assertFalse(Day.objects.filter(date="2025-09-18", is_published=True).exists())
+        self.assertEqual(Day.objects.filter(date="2025-09-18").count(), 1)
+
+    def test_new_day_is_built_before_it_is_published(self):
+        published = []
+
+        def publish(day):
+            published.append((MenuItem.objects.filter(station__period__day=day).count(),
+                              Day.objects.published().filter(pk=day.pk).exists()))
+            return publish_day(day)
+
+        with mock.patch("api.importers.publish_day", side_effect=publish):
+            load_menu_data("ohill", {**self.data, "date": "09/18/2025"}, self.hours)
+        self.assertEqual(published, [(397, False)])
+        self.assertEqual(Day.objects.published().count(), 2)
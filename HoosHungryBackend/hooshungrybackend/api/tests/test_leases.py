@@ -0,0 +1,95 @@
+import os
+import queue
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.test import SimpleTestCase, TestCase
+from django.utils import timezone
+
+from api.leases import LeaderElection, acquire_lease, release_lease
+from api.models import SchedulerLease
+
+
+class LeaseTests(TestCase):
+    def test_one_holder_at_a_time(self):
+        self.assertTrue(acquire_lease("scheduler", "a"))
+        self.assertFalse(acquire_lease("scheduler", "b"))
+        self.assertTrue(acquire_lease("scheduler", "a"))
+        self.assertEqual(SchedulerLease.objects.get().holder, "a")
+
+    def test_expired_lease_is_taken_over(self):
+        acquire_lease("scheduler", "a")
+        SchedulerLease.objects.update(expires_at=timezone.now() - timedelta(seconds=1))
+        self.assertTrue(acquire_lease("scheduler", "b"))
+        self.assertFalse(acquire_lease("scheduler", "a"))
+
+    def test_released_lease_is_free(self):
+        acquire_lease("scheduler", "a")
+        release_lease("scheduler", "b")
+        self.assertFalse(acquire_lease("scheduler", "b"))
+        release_lease("scheduler", "a")
+        self.assertTrue(acquire_lease("scheduler", "b"))
+
+    def test_election_reports_changes(self):
+        changes = []
+        leader = LeaderElection("scheduler", "a", on_change=changes.append)
+        follower = LeaderElection("scheduler", "b", on_change=changes.append)
+        self.assertTrue(leader.renew())
+        self.assertFalse(follower.renew())
+        leader.release()
+        self.assertTrue(follower.renew())
+        self.assertFalse(leader.renew())
+        self.assertEqual(changes, [True, True])
+
+
+class TwoWorkerFailoverTests(SimpleTestCase):
+    """Two run_worker processes sharing one SQLite file: one leads, the other takes over when it dies."""
+    LEASE = "2"
+    HEARTBEAT = "0.5"
+
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        # the new leader's catch-up scrape is pointed at a closed port, so it fails fast offline
+        self.env = {**os.environ, "DATABASE_URL": f"sqlite:///{tmp.name}/db.sqlite3", "MENU_ARCHIVE_DIR": "", "MENU_CACHE_DIR": f"{tmp.name}/menu_cache",
+                    "CAMPUSDISH_BASE_URL": "http://127.0.0.1:9/"}
+        subprocess.run([sys.executable, "manage.py", "migrate", "-v0"], cwd=settings.BASE_DIR, env=self.env,
+                       check=True)
+
+    def start_worker(self):
+        worker = subprocess.Popen(
+            [sys.executable, "-u", "manage.py", "run_worker",
+             "--lease-seconds", self.LEASE, "--heartbeat-seconds", self.HEARTBEAT],
+            cwd=settings.BASE_DIR, env=self.env, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True,
+        )
+        self.addCleanup(worker.wait)
+        self.addCleanup(worker.kill)
+        worker.lines = queue.Queue()
+        threading.Thread(target=lambda: [worker.lines.put(line) for line in worker.stdout], daemon=True).start()
+        return worker
+
+    def wait_for(self, worker, text: str, timeout: float) -> bool:
+        ends_at = time.monotonic() + timeout
+        while time.monotonic() < ends_at:
+            try:
+                if worker.lines.get(timeout=ends_at - time.monotonic()).startswith(text):
+                    return True
+            except queue.Empty:
+                break
+        return False
+
+    def test_one_leader_and_failover(self):
+        first = self.start_worker()
+        self.assertTrue(self.wait_for(first, "Leader", 15))
+        second = self.start_worker()
+        self.assertTrue(self.wait_for(second, "Follower", 15))
+        # a few heartbeats later the follower still follows
+        self.assertFalse(self.wait_for(second, "Leader", 3))
+
+        first.kill()  # no chance to release the lease
+        self.assertTrue(self.wait_for(second, "Leader", float(self.LEASE) + 3))
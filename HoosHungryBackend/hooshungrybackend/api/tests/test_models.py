@@ -2,7 +2,7 @@ import datetime
 from django.test import TestCase
 from api.models import (
     DiningHall, Day, Period, Station,
-    MenuItem, Allergen, NutritionInfo
+    Product, MenuItem, Allergen, NutritionInfo
 )
 
 class DiningModelsTest(TestCase):
@@ -43,20 +43,21 @@ class DiningModelsTest(TestCase):
         self.wheat = Allergen.objects.create(name="Wheat")
         
 
-        # MenuItem FIRST
-        self.item = MenuItem.objects.create(
-            station=self.station,
+        # Product FIRST, served at the station through a MenuItem
+        self.product = Product.objects.create(
+            vendor_id="M6341_695",
             item_name="Peanut Butter Sandwich",
             is_gluten=True,
             is_vegetarian=True,
             ingredients = "Chicken, Peanuts"
         )
-        self.item.allergens.add(self.peanut, self.wheat)
+        self.product.allergens.add(self.peanut, self.wheat)
+        self.item = MenuItem.objects.create(station=self.station, product=self.product)
         
 
-        # Then attach NutritionInfo to that item
+        # Then attach NutritionInfo to that product
         self.nutrition = NutritionInfo.objects.create(
-            menu_item=self.item,
+            product=self.product,
             calories=350,
             protein=20,
             total_carbohydrates=30,
@@ -116,3 +117,12 @@ class DiningModelsTest(TestCase):
         # depends on which fields are filled
         expected = "Calories: 350, Protein: 20g, Carbs: 30g, Sugars: 5g, Sodium: 500mg"
         self.assertEqual(str(self.item.nutrition_info), expected)
+
+    def test_product_next_served(self):
+        self.assertEqual(self.product.next_served(self.day.date), self.item)
+        self.assertIsNone(self.product.next_served(self.day.date + datetime.timedelta(days=1)))
+
+    def test_next_served_spans_versions(self):
+        old = Product.objects.create(vendor_id=f"{self.product.vendor_id}@1", item_name="PB Sandwich")
+        self.assertEqual(set(old.versions()), {old, self.product})
+        self.assertEqual(old.next_served(self.day.date), self.item)
@@ -0,0 +1,93 @@
+import datetime
+from datetime import timedelta
+from unittest import mock
+
+from django.core.cache import caches
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from api.models import DiningHall, ScrapeRequest
+from api.on_demand import COOLDOWN_SECONDS, STALE_SECONDS, request_scrape, run_scrape_requests
+from api.tests.helpers import MENU_CACHE, make_day
+
+
+@override_settings(CACHES=MENU_CACHE)
+class ReadThroughTests(TestCase):
+    def setUp(self):
+        caches["menus"].clear()
+        self.client = APIClient()
+        self.today = datetime.date.today()
+
+    def test_missing_menu_queues_one_scrape(self):
+        responses = [
+            self.client.get("/api/menu_info/", {"hall": "runk", "period": "dinner"}),
+            self.client.get("/api/available_periods/", {"hall": "runk"}),
+            self.client.get("/api/menu_info/", {"hall": "runk", "period": "lunch"}),
+        ]
+        self.assertEqual([r.status_code for r in responses], [202, 202, 202])
+        self.assertEqual(responses[0]["Retry-After"], "5")
+        self.assertEqual(list(ScrapeRequest.objects.values_list("hall", "date")), [("runk", self.today)])
+
+    def test_each_hall_gets_its_own_scrape(self):
+        for hall in ("runk", "ohill", "runk"):
+            self.client.get("/api/available_periods/", {"hall": hall})
+        self.assertEqual(sorted(ScrapeRequest.objects.values_list("hall", flat=True)), ["ohill", "runk"])
+
+    def test_other_days_are_not_scraped(self):
+        hall = DiningHall.objects.create(name="runk")
+        make_day(hall, self.today, "Burger")
+        earlier = self.today - timedelta(days=3)
+        response = self.client.get("/api/available_periods/", {"hall": "runk", "date": str(earlier)})
+        self.assertEqual(response.status_code, 404)
+        self.assertFalse(ScrapeRequest.objects.exists())
+
+    def test_no_new_request_during_cooldown(self):
+        ScrapeRequest.objects.create(hall="runk", date=self.today, finished_at=timezone.now(), result="success")
+        self.assertIsNone(request_scrape("runk", self.today))
+        response = self.client.get("/api/available_periods/", {"hall": "runk"})
+        self.assertEqual(response.status_code, 404)
+
+        ScrapeRequest.objects.update(finished_at=timezone.now() - timedelta(seconds=COOLDOWN_SECONDS + 1))
+        self.assertIsNotNone(request_scrape("runk", self.today))
+
+    def test_unclaimed_request_expires(self):
+        self.assertEqual(self.client.get("/api/available_periods/", {"hall": "runk"}).status_code, 202)
+        # no run_worker took it up
+        ScrapeRequest.objects.update(requested_at=timezone.now() - timedelta(seconds=STALE_SECONDS + 1))
+        self.assertEqual(self.client.get("/api/available_periods/", {"hall": "runk"}).status_code, 404)
+        self.assertEqual(ScrapeRequest.objects.get().result, "expired")
+        self.assertEqual(run_scrape_requests(), 0)
+
+
+@mock.patch("api.on_demand.call_command")
+class RunScrapeRequestsTests(TestCase):
+    def setUp(self):
+        self.today = datetime.date.today()
+
+    def test_runs_each_request_once(self, call):
+        request_scrape("runk", self.today)
+        request_scrape("ohill", self.today)
+        self.assertEqual(run_scrape_requests(), 2)
+        self.assertEqual(run_scrape_requests(), 0)
+        self.assertEqual([c.args for c in call.call_args_list], [
+            ("scrape_menus", "--hall", "runk", "--date", str(self.today)),
+            ("scrape_menus", "--hall", "ohill", "--date", str(self.today)),
+        ])
+        self.assertEqual(set(ScrapeRequest.objects.values_list("result", flat=True)), {"success"})
+
+    def test_errors_are_recorded(self, call):
+        call.side_effect = lambda *args, stderr, **kwargs: stderr.write("Error scraping runk: timed out")
+        request_scrape("runk", self.today)
+        run_scrape_requests()
+        self.assertEqual(ScrapeRequest.objects.get().result, "error: Error scraping runk: timed out")
+
+    def test_running_request_is_left_alone_until_stale(self, call):
+        pending = request_scrape("runk", self.today)
+        ScrapeRequest.objects.update(started_at=timezone.now())
+        self.assertEqual(run_scrape_requests(), 0)
+
+        ScrapeRequest.objects.update(started_at=timezone.now() - timedelta(seconds=STALE_SECONDS + 1))
+        self.assertEqual(run_scrape_requests(), 1)
+        pending.refresh_from_db()
+        self.assertIsNotNone(pending.finished_at)
@@ -0,0 +1,59 @@
+import json
+
+from django.test import SimpleTestCase
+
+from api.payloads import Interner, index_menu, menu_hash, project_menu
+from api.standin import DUMPS_DIR
+
+
+class ProjectMenuTests(SimpleTestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        with open(DUMPS_DIR / "period_1421.json") as f:
+            cls.model = json.load(f)
+
+    def test_keeps_only_importer_fields(self):
+        menu = project_menu(self.model)
+        self.assertEqual(len(menu.stations), len(self.model["Menu"]["MenuStations"]))
+        self.assertEqual(len(menu.products), len(self.model["Menu"]["MenuProducts"]))
+
+        egg = menu.products[0]
+        self.assertEqual(egg.product_id, "M6341_695")
+        self.assertEqual(egg.station_id, "22867")
+        self.assertEqual(egg.name, "Hard-Cooked Egg")
+        self.assertEqual(egg.ingredients, "Water, Egg")
+        self.assertEqual((egg.serving_size, egg.serving_unit), ("1", "each"))
+        self.assertTrue(egg.filters["ContainsEggs"])
+        self.assertFalse(hasattr(egg, "__dict__"))
+
+    def test_nutrition_tree_is_flattened_depth_first(self):
+        egg = project_menu(self.model).products[0]
+        names = [name for name, _ in egg.nutrition]
+        self.assertEqual(names[:4], ["Calories", "Total Fat", "Saturated Fat", "Trans Fat"])
+        self.assertIn(("Total Sugars", "0"), egg.nutrition)
+        self.assertIn(("Includes Added Sugars", ""), egg.nutrition)
+
+    def test_identical_filter_sets_are_shared(self):
+        products = project_menu(self.model).products
+        distinct = {id(p.filters) for p in products}
+        self.assertLess(len(distinct), len(products))
+        with self.assertRaises(TypeError):
+            products[0].filters["ContainsEggs"] = False
+
+    def test_values_are_shared_only_within_a_scrape(self):
+        shared = Interner()
+        first, second = project_menu(self.model, shared), project_menu(self.model, shared)
+        self.assertIs(first.products[0].filters, second.products[0].filters)
+        self.assertIsNot(project_menu(self.model).products[0].filters, first.products[0].filters)
+        self.assertEqual(menu_hash(first), menu_hash(project_menu(self.model)))
+
+    def test_index_menu_groups_products_under_their_station(self):
+        menu = project_menu(self.model)
+        indexed = index_menu(menu, "1421")
+        self.assertEqual([s for s, _ in indexed], [s for s in menu.stations if s.period_id == "1421"])
+        self.assertEqual(sorted(p.product_id for _, products in indexed for p in products),
+                         sorted(p.product_id for p in menu.products))
+        for station, products in indexed:
+            self.assertTrue(all(p.station_id == station.station_id for p in products))
+        self.assertEqual(index_menu(menu, "no-such-period"), [])
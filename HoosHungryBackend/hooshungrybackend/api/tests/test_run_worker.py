@@ -0,0 +1,58 @@
+from datetime import datetime
+from io import StringIO
+from unittest import mock
+
+from apscheduler.schedulers.blocking import BlockingScheduler
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+
+from api.leases import acquire_lease
+from api.models import DiningHall, SchedulerLease
+from api.scrapers import NY_TZ
+from config.scheduler import catch_up_job, refresh_triggers
+
+
+class RunWorkerCommandTests(TestCase):
+    def run_worker(self, *args) -> list:
+        started = []
+        with mock.patch.object(BlockingScheduler, "start", lambda scheduler: started.append(scheduler)):
+            call_command("run_worker", *args, stdout=StringIO())
+        return started[0].get_jobs()
+
+    @override_settings(MENU_REFRESH_TIMES=["00:00", "10:30"], MENU_REFRESH_JITTER=120)
+    def test_schedules_each_refresh(self):
+        jobs = {job.id: job for job in self.run_worker()}
+        self.assertEqual(set(jobs), {"scrape_menus_0000", "scrape_menus_1030", "scrape_menus_catch_up",
+                                     "scrape_requests", "scheduler_lease"})
+        self.assertEqual(str(jobs["scrape_menus_1030"].trigger), "cron[hour='10', minute='30']")
+        self.assertEqual(jobs["scrape_menus_1030"].trigger.jitter, 120)
+
+    def test_scrape_now(self):
+        self.assertIn("scrape_menus_now", {job.id for job in self.run_worker("--scrape-now")})
+
+    def test_lease_is_released_on_exit(self):
+        self.run_worker()
+        self.assertTrue(acquire_lease(SchedulerLease.objects.get().name, "another-host:1"))
+
+
+class RefreshScheduleTests(TestCase):
+    def test_invalid_refresh_time(self):
+        with self.assertRaises(ValueError):
+            refresh_triggers(["25:00"], 0)
+
+    def test_no_jitter(self):
+        self.assertIsNone(refresh_triggers(["06:00"], 0)["scrape_menus_0600"].jitter)
+
+    @mock.patch("config.scheduler.call_command")
+    def test_catch_up_scrapes_halls_missing_today(self, call):
+        ohill = DiningHall.objects.create(name="ohill")
+        ohill.days.create(date=datetime.now(NY_TZ).date(), open_time="07:00", close_time="21:00")
+        catch_up_job()
+        self.assertEqual([c.args for c in call.call_args_list],
+                         [("scrape_menus", "--hall", "newcomb"), ("scrape_menus", "--hall", "runk")])
+
+    @mock.patch("config.scheduler.call_command")
+    def test_catch_up_skips_on_a_follower(self, call):
+        election = mock.Mock(**{"renew.return_value": False})
+        catch_up_job(election)
+        call.assert_not_called()
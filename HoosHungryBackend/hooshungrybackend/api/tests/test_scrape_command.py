@@ -0,0 +1,232 @@
+import json
+import os
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import threading
+from datetime import date, timedelta
+from io import StringIO
+from unittest import mock
+
+from django.conf import settings
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.test import SimpleTestCase, TestCase, TransactionTestCase, override_settings
+
+from api import scrapers
+from api.management.commands.scrape_menus import scrape_target
+from api.models import Day, MenuItem, ScrapeRun, ScrapeState
+from api.standin import CampusDishStandin, DUMPS_DIR
+
+
+@override_settings(MENU_ARCHIVE_DIR="")
+class ScrapeMenusCommandTests(TestCase):
+    def setUp(self):
+        self.standin = CampusDishStandin().start()
+        self.addCleanup(self.standin.stop)
+        patcher = mock.patch.dict(scrapers.URL_MAP, self.standin.url_map())
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def scrape(self, *args) -> str:
+        out = StringIO()
+        call_command("scrape_menus", *args, stdout=out, stderr=StringIO())
+        return out.getvalue()
+
+    def test_first_scrape_imports_every_hall(self):
+        output = self.scrape()
+        self.assertIn("Unchanged: 0/3 hall/days, 0/12 periods", output)
+        self.assertEqual(Day.objects.count(), 3)
+        self.assertEqual(ScrapeState.objects.filter(period_id="").count(), 3)
+
+    def test_rescrape_with_etags_sends_conditional_requests(self):
+        self.scrape()
+        day_ids = set(Day.objects.values_list("id", flat=True))
+        self.standin.requests.clear()
+
+        output = self.scrape()
+        self.assertIn("Unchanged: 3/3 hall/days, 12/12 periods", output)
+        # every page answered 304, nothing was re-imported
+        self.assertEqual(set(Day.objects.values_list("id", flat=True)), day_ids)
+        self.assertEqual(len(self.standin.requests), 15)
+
+    def test_deleted_day_is_fetched_and_imported_again(self):
+        self.scrape("--hall", "runk")
+        Day.objects.all().delete()
+
+        output = self.scrape("--hall", "runk")
+        self.assertIn("Successfully scraped runk", output)
+        self.assertTrue(Day.objects.published().filter(dining_hall__name="runk").exists())
+        self.assertIn("Unchanged: 0/1 hall/days", output)
+
+    def test_rescrape_without_etags_compares_content_hashes(self):
+        self.standin.etags = False
+        self.scrape()
+        item_count = MenuItem.objects.count()
+        day_ids = set(Day.objects.values_list("id", flat=True))
+
+        output = self.scrape()
+        self.assertIn("Unchanged: 3/3 hall/days, 12/12 periods", output)
+        self.assertEqual(set(Day.objects.values_list("id", flat=True)), day_ids)
+        self.assertEqual(MenuItem.objects.count(), item_count)
+
+    def test_changed_period_reimports(self):
+        self.scrape("--hall", "ohill")
+        item_ids = set(MenuItem.objects.values_list("id", flat=True))
+        with open(DUMPS_DIR / "period_1421.json") as f:
+            model = json.load(f)
+        model["Menu"]["MenuProducts"][0]["Product"]["MarketingName"] = "Soft-Boiled Egg"
+        self.standin.set_period_model("1421", model)
+
+        output = self.scrape("--hall", "ohill")
+        self.assertIn("Unchanged: 0/1 hall/days, 3/4 periods", output)
+        self.assertIn("(Product: 1 updated)", output)
+        self.assertTrue(MenuItem.objects.filter(product__item_name="Soft-Boiled Egg").exists())
+        self.assertEqual(set(MenuItem.objects.values_list("id", flat=True)), item_ids)
+
+    def test_run_is_summarized_and_recorded(self):
+        output = self.scrape("--hall", "runk")
+        summary = json.loads(output.strip().splitlines()[-1])
+        [hall] = summary["halls"]
+        self.assertEqual((hall["hall"], hall["result"]), ("runk", "success"))
+        self.assertEqual(hall["requests"], 5)
+        self.assertGreater(hall["bytes_downloaded"], 100_000)
+        self.assertGreater(hall["queries"], 0)
+        self.assertEqual(hall["rows"]["inserted"], summary["rows"]["inserted"])
+        self.assertTrue(all(hall["seconds"][stage] > 0 for stage in ("fetch", "extract", "parse", "import")))
+
+        run = ScrapeRun.objects.get()
+        self.assertEqual((run.engine, run.targets, run.errors), ("threads", 1, 0))
+        self.assertEqual(run.rows_inserted, hall["rows"]["inserted"])
+        self.assertEqual(run.halls, summary["halls"])
+
+        self.scrape("--hall", "runk")
+        second = ScrapeRun.objects.first()
+        self.assertEqual(second.halls[0]["result"], "unchanged")
+        self.assertEqual(second.bytes_downloaded, 0)
+
+    def test_force_reimports_unchanged_halls(self):
+        self.scrape("--hall", "runk")
+        output = self.scrape("--hall", "runk", "--force")
+        self.assertIn("Unchanged: 0/1 hall/days, 0/4 periods", output)
+
+
+@override_settings(MENU_ARCHIVE_DIR="")
+class AsyncEngineCommandTests(TransactionTestCase):
+    def setUp(self):
+        self.standin = CampusDishStandin(latency=0.05).start()
+        self.addCleanup(self.standin.stop)
+        patcher = mock.patch.dict(scrapers.URL_MAP, self.standin.url_map())
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_async_engine_imports_every_hall(self):
+        out = StringIO()
+        call_command("scrape_menus", "--engine", "async", stdout=out, stderr=StringIO())
+        self.assertIn("Unchanged: 0/3 hall/days, 0/12 periods", out.getvalue())
+        self.assertEqual(
+            set(Day.objects.values_list("dining_hall__name", flat=True)),
+            {"ohill", "newcomb", "runk"},
+        )
+
+        out = StringIO()
+        call_command("scrape_menus", "--engine", "async", stdout=out, stderr=StringIO())
+        self.assertIn("Unchanged: 3/3 hall/days, 12/12 periods", out.getvalue())
+
+    def test_pages_are_decoded_off_the_event_loop(self):
+        threads = set()
+        decode = scrapers._decode_model
+
+        def recording(html):
+            threads.add(threading.current_thread().name)
+            return decode(html)
+
+        with mock.patch.object(scrapers, "_decode_model", recording):
+            call_command("scrape_menus", "--hall", "runk", "--engine", "async", stdout=StringIO(), stderr=StringIO())
+        self.assertTrue(threads)
+        self.assertTrue(all(name.startswith("scrape-parse") for name in threads), threads)
+        self.assertTrue(Day.objects.filter(dining_hall__name="runk").exists())
+
+
+@override_settings(MENU_ARCHIVE_DIR="")
+class MultiDayScrapeTests(TransactionTestCase):
+    def setUp(self):
+        self.standin = CampusDishStandin().start()
+        self.addCleanup(self.standin.stop)
+        patcher = mock.patch.dict(scrapers.URL_MAP, self.standin.url_map())
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_week_of_menus_in_one_async_run(self):
+        out = StringIO()
+        call_command("scrape_menus", "--hall", "runk", "--date", "2025-09-17", "--days", "7",
+                     "--engine", "async", stdout=out, stderr=StringIO())
+        self.assertIn("Unchanged: 0/7 hall/days, 0/28 periods", out.getvalue())
+        dates = sorted(Day.objects.filter(dining_hall__name="runk").values_list("date", flat=True))
+        self.assertEqual(dates, [date(2025, 9, 17) + timedelta(days=i) for i in range(7)])
+        self.assertTrue(all("date=" in p for p in self.standin.requests))
+
+    def test_each_date_keeps_its_own_change_state(self):
+        call_command("scrape_menus", "--hall", "ohill", "--date", "2025-09-20", "--days", "2",
+                     stdout=StringIO(), stderr=StringIO())
+        out = StringIO()
+        call_command("scrape_menus", "--hall", "ohill", "--date", "2025-09-21", "--days", "2",
+                     stdout=out, stderr=StringIO())
+        self.assertIn("Unchanged: 1/2 hall/days, 4/8 periods", out.getvalue())
+
+
+@override_settings(MENU_ARCHIVE_DIR="")
+class WorkerModeTests(TransactionTestCase):
+    def setUp(self):
+        self.standin = CampusDishStandin().start()
+        self.addCleanup(self.standin.stop)
+        patcher = mock.patch.dict(scrapers.URL_MAP, self.standin.url_map())
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_workers_need_a_shared_database(self):
+        with self.assertRaises(CommandError):
+            call_command("scrape_menus", "--workers", "2", stdout=StringIO(), stderr=StringIO())
+
+    def test_scrape_target_reports_its_hall(self):
+        outcome = scrape_target("runk", date(2025, 9, 17), False, {}, None)
+        self.assertEqual(outcome["result"], "success")
+        self.assertEqual((outcome["unchanged_halls"], outcome["total_periods"]), (0, 4))
+        self.assertIn("Successfully scraped runk for 2025-09-17", outcome["output"])
+        self.assertTrue(Day.objects.published().filter(dining_hall__name="runk").exists())
+
+        self.standin.error_rate = 1.0
+        outcome = scrape_target("runk", date(2025, 9, 18), False, {}, None)
+        self.assertTrue(outcome["result"].startswith("error: "))
+        self.assertIn("Error scraping runk for 2025-09-18", outcome["errors"])
+        # the failed request is still reported
+        self.assertEqual(outcome["metrics"]["requests"], 1)
+        self.assertGreater(outcome["metrics"]["seconds"]["fetch"], 0)
+
+
+class WorkerProcessesTests(SimpleTestCase):
+    """scrape_menus --workers in its own process, importing into one SQLite file from several workers."""
+
+    def setUp(self):
+        self.standin = CampusDishStandin(latency=0.05).start()
+        self.addCleanup(self.standin.stop)
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.db = f"{tmp.name}/db.sqlite3"
+        self.env = {**os.environ, "DATABASE_URL": f"sqlite:///{self.db}", "MENU_ARCHIVE_DIR": "", "MENU_CACHE_DIR": f"{tmp.name}/menu_cache",
+                    "CAMPUSDISH_BASE_URL": f"{self.standin.base_url}/"}
+        subprocess.run([sys.executable, "manage.py", "migrate", "-v0"], cwd=settings.BASE_DIR, env=self.env,
+                       check=True)
+
+    def test_workers_import_every_hall_day(self):
+        scrape = subprocess.run(
+            [sys.executable, "manage.py", "scrape_menus", "--workers", "3", "--days", "2", "--no-archive"],
+            cwd=settings.BASE_DIR, env=self.env, capture_output=True, text=True, timeout=120,
+        )
+        self.assertEqual(scrape.returncode, 0, scrape.stderr)
+        self.assertEqual(scrape.stderr, "")
+        self.assertIn("6 hall/days in", scrape.stdout)
+        with sqlite3.connect(self.db) as db:
+            published = db.execute("SELECT COUNT(*) FROM api_day WHERE is_published").fetchone()[0]
+        self.assertEqual(published, 6)
@@ -0,0 +1,83 @@
+from unittest import mock
+
+from django.test import SimpleTestCase
+
+from api import scrapers
+from api.standin import CampusDishStandin
+
+
+class ExtractModelTests(SimpleTestCase):
+    def test_braces_inside_strings_do_not_end_the_object(self):
+        html = """<script>app({ model: {"Name": "Soup }{ of the day", "Menu": {"MenuStations": []}},
+                  other: {"x": 1} });</script>"""
+        model = scrapers.extract_model(html)
+        self.assertEqual(model["Name"], "Soup }{ of the day")
+        self.assertEqual(model["Menu"], {"MenuStations": []})
+
+    def test_missing_marker_raises(self):
+        with self.assertRaises(RuntimeError):
+            scrapers.extract_model("<html><body>No menu today</body></html>")
+
+    def test_truncated_object_raises(self):
+        with self.assertRaises(RuntimeError):
+            scrapers.extract_model('<script>model: {"Date": "09/17/2025", "Menu": {</script>')
+
+
+class PeriodFetchTests(SimpleTestCase):
+    def test_get_menu_data_fetches_every_period(self):
+        with CampusDishStandin() as standin, \
+                mock.patch.dict(scrapers.URL_MAP, standin.url_map()):
+            data = scrapers.get_menu_data("ohill")
+
+        self.assertEqual(data["date"], "09/17/2025")
+        self.assertEqual(set(data["periods"]), {"1421", "1423", "1424", "1425"})
+        self.assertNotIn("base_model_raw", data)
+        for block in data["periods"].values():
+            self.assertIsNotNone(block["menu"])
+            self.assertGreater(len(block["menu"].products), 0)
+
+    def test_period_pages_are_fetched_concurrently(self):
+        with CampusDishStandin(latency=0.3) as standin, \
+                mock.patch.dict(scrapers.URL_MAP, standin.url_map()):
+            data = scrapers.get_menu_data("ohill", deadline=1.0)
+
+        # base page + four period pages serially would need ~1.5s
+        self.assertTrue(all(block["menu"] for block in data["periods"].values()))
+
+    def test_deadline_leaves_unfinished_periods_empty(self):
+        with CampusDishStandin(latency=0.4) as standin:
+            pages = scrapers.fetch_pages(
+                [f"{standin.url_for('ohill')}?periodId=1421"], deadline=0.1
+            )
+        self.assertIsInstance(next(iter(pages.values())), TimeoutError)
+
+
+class HallSnapshotTests(SimpleTestCase):
+    def test_snapshot_downloads_base_page_once(self):
+        with CampusDishStandin() as standin, \
+                mock.patch.dict(scrapers.URL_MAP, standin.url_map()):
+            snapshot = scrapers.get_hall_snapshot("ohill")
+
+        base_requests = [p for p in standin.requests if "periodId" not in p]
+        self.assertEqual(base_requests, ["/ohill/"])
+        self.assertEqual(len(standin.requests), 5)
+
+        hours = snapshot["hours"]
+        self.assertEqual(hours["open_time"], "07:00")
+        self.assertEqual(hours["close_time"], "23:59")
+        self.assertEqual(hours["periods"]["1424"], {"start_time": "17:00", "end_time": "21:00"})
+        self.assertEqual(set(snapshot["menu"]["periods"]), set(hours["periods"]))
+
+    def test_period_without_validators_is_fetched_again(self):
+        with CampusDishStandin() as standin, \
+                mock.patch.dict(scrapers.URL_MAP, standin.url_map()):
+            first = scrapers.get_hall_snapshot("ohill")
+            validators = {key: {"etag": page["etag"], "last_modified": page["last_modified"]}
+                          for key, page in first["pages"].items()}
+            self.assertTrue(scrapers.get_hall_snapshot("ohill", validators=validators)["unchanged"])
+
+            validators["1424"] = {"etag": "", "last_modified": ""}
+            snapshot = scrapers.get_hall_snapshot("ohill", validators=validators)
+
+        self.assertFalse(snapshot["unchanged"])
+        self.assertEqual(set(snapshot["menu"]["periods"]), {"1421", "1423", "1424", "1425"})
@@ -0,0 +1,50 @@
+from unittest import mock
+
+import requests
+from django.test import SimpleTestCase
+
+from api import scrapers
+from api.standin import CampusDishStandin
+
+
+class StandinRoutingTests(SimpleTestCase):
+    def test_scraper_runs_against_campusdish_paths(self):
+        with CampusDishStandin() as standin, \
+                mock.patch.dict(scrapers.URL_MAP, scrapers.hall_urls(standin.base_url)):
+            snapshot = scrapers.get_hall_snapshot("ohill")
+            self.assertEqual(set(snapshot["menu"]["periods"]), set(standin.period_models))
+            self.assertTrue(all(p.startswith("/observatoryhilldiningroom/") for p in standin.requests))
+
+    def test_unknown_hall_is_not_found(self):
+        with CampusDishStandin(halls=("runk",)) as standin:
+            with self.assertRaises(requests.HTTPError):
+                scrapers.fetch_html(standin.url_for("ohill"))
+
+
+class StandinFailureInjectionTests(SimpleTestCase):
+    def test_error_status(self):
+        with CampusDishStandin(error_rate=1.0, error_status=502) as standin:
+            with self.assertRaises(requests.HTTPError) as cm:
+                scrapers.fetch_html(standin.url_for("ohill"))
+            self.assertEqual(cm.exception.response.status_code, 502)
+            self.assertEqual(standin.faults["error"], 1)
+
+    def test_dropped_connection(self):
+        with CampusDishStandin(drop_rate=1.0) as standin:
+            with self.assertRaises(requests.ConnectionError):
+                scrapers.fetch_html(standin.url_for("ohill"))
+
+    def test_truncated_page_fails_to_decode(self):
+        with CampusDishStandin(truncate_rate=1.0) as standin:
+            html = scrapers.fetch_html(standin.url_for("ohill"))
+            with self.assertRaises(RuntimeError):
+                scrapers.extract_model(html)
+
+    def test_seeded_draws_repeat(self):
+        draws = []
+        for _ in range(2):
+            standin = CampusDishStandin(jitter=0.5, error_rate=0.2, drop_rate=0.2, seed=7)
+            draws.append([standin.draw() for _ in range(50)])
+            standin.stop()
+        self.assertEqual(draws[0], draws[1])
+        self.assertTrue({"error", "drop", None} <= {fault for _, fault in draws[0]})
@@ -0,0 +1,247 @@
+import datetime
+import json
+from unittest import mock
+
+from django.core.cache import caches
+from django.test import TestCase, override_settings
+from rest_framework.test import APIClient
+
+from api.importers import ChangeSet, load_menu_data, write_snapshots
+from api.menu_cache import bump_menu_generation
+from api.models import DiningHall, Day, Period, Station, Product, MenuItem, NutritionInfo, Allergen, MenuSnapshot
+from api.snapshots import render_snapshots
+from api.tests.helpers import MENU_CACHE, make_day
+
+
+@override_settings(CACHES=MENU_CACHE)
+class MenuDateParameterTests(TestCase):
+    def setUp(self):
+        caches["menus"].clear()
+        self.client = APIClient()
+        self.hall = DiningHall.objects.create(name="runk", scrape_url="http://test.com")
+        self.today = datetime.date.today()
+        self.tomorrow = self.today + datetime.timedelta(days=1)
+        make_day(self.hall, self.today, "Burger")
+        make_day(self.hall, self.tomorrow, "Tacos")
+
+    def test_menu_info_defaults_to_today(self):
+        response = self.client.get("/api/menu_info/", {"hall": "runk", "period": "dinner"})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data["date"], str(self.today))
+        items = response.data["period"]["stations"][0]["menu_items"]
+        self.assertEqual([i["item_name"] for i in items], ["Burger"])
+
+    def test_menu_info_for_another_date(self):
+        response = self.client.get(
+            "/api/menu_info/", {"hall": "runk", "period": "dinner", "date": str(self.tomorrow)}
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data["date"], str(self.tomorrow))
+        items = response.data["period"]["stations"][0]["menu_items"]
+        self.assertEqual([i["item_name"] for i in items], ["Tacos"])
+
+    def test_available_periods_for_another_date(self):
+        response = self.client.get("/api/available_periods/", {"hall": "runk", "date": str(self.tomorrow)})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data["periods"], [{"key": "dinner", "name": "Dinner"}])
+
+    def test_superseded_day_is_not_served(self):
+        Day.objects.filter(date=self.today).update(is_published=False)
+        make_day(self.hall, self.today, "Pizza")
+        response = self.client.get("/api/menu_info/", {"hall": "runk", "period": "dinner"})
+        items = response.data["period"]["stations"][0]["menu_items"]
+        self.assertEqual([i["item_name"] for i in items], ["Pizza"])
+
+    def test_missing_date_is_404(self):
+        later = self.today + datetime.timedelta(days=5)
+        response = self.client.get("/api/available_periods/", {"hall": "runk", "date": str(later)})
+        self.assertEqual(response.status_code, 404)
+
+    def test_invalid_date_is_400(self):
+        response = self.client.get("/api/menu_info/", {"hall": "runk", "period": "dinner", "date": "9/17"})
+        self.assertEqual(response.status_code, 400)
+
+
+@override_settings(CACHES=MENU_CACHE)
+class MenuInfoQueryCountTests(TestCase):
+    def setUp(self):
+        caches["menus"].clear()
+        self.client = APIClient()
+        hall = DiningHall.objects.create(name="runk", scrape_url="http://test.com")
+        make_day(hall, datetime.date.today(), "Burger")
+        self.period = Period.objects.get()
+        self.allergens = [Allergen.objects.create(name=name) for name in ("Milk", "Wheat")]
+
+    def add_stations(self, count: int, items_per_station: int):
+        for s in range(count):
+            station = Station.objects.create(name=f"Station {s}", number=str(s), period=self.period)
+            for i in range(items_per_station):
+                product = Product.objects.create(vendor_id=f"{station.pk}_{i}", item_name=f"Item {station.pk} {i}")
+                product.allergens.set(self.allergens)
+                NutritionInfo.objects.create(product=product, calories=i)
+                MenuItem.objects.create(station=station, product=product)
+
+    def get_menu(self):
+        response = self.client.get("/api/menu_info/", {"hall": "runk", "period": "dinner"})
+        self.assertEqual(response.status_code, 200)
+        return response
+
+    def test_query_count_does_not_grow_with_the_menu(self):
+        # one of them looks for a pre-rendered snapshot first
+        self.add_stations(1, 2)
+        with self.assertNumQueries(7):
+            self.get_menu()
+        self.add_stations(5, 10)
+        bump_menu_generation("runk")
+        with self.assertNumQueries(7):
+            response = self.get_menu()
+        stations = response.data["period"]["stations"]
+        self.assertEqual(sum(len(s["menu_items"]) for s in stations), 1 + 2 + 50)
+        self.assertEqual([a["name"] for a in stations[-1]["menu_items"][0]["allergens"]], ["Milk", "Wheat"])
+
+
+@override_settings(CACHES=MENU_CACHE)
+class MenuCacheTests(TestCase):
+    def setUp(self):
+        caches["menus"].clear()
+        self.client = APIClient()
+        self.today = datetime.date.today()
+        self.runk = DiningHall.objects.create(name="runk", scrape_url="http://test.com")
+        self.ohill = DiningHall.objects.create(name="ohill", scrape_url="http://test.com")
+        make_day(self.runk, self.today, "Burger")
+        make_day(self.ohill, self.today, "Pasta")
+
+    def items(self, hall: str) -> list:
+        response = self.client.get("/api/menu_info/", {"hall": hall, "period": "dinner"})
+        self.assertEqual(response.status_code, 200)
+        return [i["item_name"] for i in response.json()["period"]["stations"][0]["menu_items"]]
+
+    def test_repeat_request_does_not_touch_the_database(self):
+        self.items("runk")
+        self.client.get("/api/available_periods/", {"hall": "runk"})
+        # menu_info still looks for a pre-rendered snapshot first
+        with self.assertNumQueries(1):
+            self.assertEqual(self.items("runk"), ["Burger"])
+        with self.assertNumQueries(0):
+            response = self.client.get("/api/available_periods/", {"hall": "runk"})
+        self.assertEqual(response.data["periods"], [{"key": "dinner", "name": "Dinner"}])
+
+    def test_import_invalidates_every_hall_serving_a_changed_product(self):
+        burger = Product.objects.get(item_name="Burger")
+        MenuItem.objects.create(station=Station.objects.get(period__day__dining_hall=self.ohill), product=burger)
+        newcomb = DiningHall.objects.create(name="newcomb", scrape_url="http://test.com")
+        make_day(newcomb, self.today, "Curry")
+        self.items("runk"), self.items("ohill"), self.items("newcomb")
+
+        # a runk import updates the shared product
+        Product.objects.filter(pk=burger.pk).update(item_name="Veggie Burger")
+        Product.objects.filter(item_name="Curry").update(item_name="Red Curry")
+        changes = ChangeSet()
+        changes.updated["Product"].append(burger.pk)
+        with mock.patch("api.importers.update_dining_hall", return_value=changes):
+            load_menu_data("runk", {"date": self.today.strftime("%m/%d/%Y")}, {})
+        self.assertEqual(self.items("runk"), ["Veggie Burger"])
+        self.assertEqual(sorted(self.items("ohill")), ["Pasta", "Veggie Burger"])
+        # a hall not serving it keeps its cached menu
+        self.assertEqual(self.items("newcomb"), ["Curry"])
+
+    def test_misses_are_not_cached(self):
+        response = self.client.get("/api/menu_info/", {"hall": "runk", "period": "breakfast"})
+        self.assertEqual(response.status_code, 404)
+        Period.objects.filter(day__dining_hall=self.runk).update(name="Breakfast")
+        response = self.client.get("/api/menu_info/", {"hall": "runk", "period": "breakfast"})
+        self.assertEqual(response.status_code, 200)
+
+
+@override_settings(CACHES=MENU_CACHE)
+class MenuSnapshotTests(TestCase):
+    def setUp(self):
+        caches["menus"].clear()
+        self.client = APIClient()
+        self.today = datetime.date.today()
+        self.hall = DiningHall.objects.create(name="runk", scrape_url="http://test.com")
+        make_day(self.hall, self.today, "Burger")
+
+    def get(self, **params):
+        return self.client.get("/api/menu_info/", {"hall": "runk", **params}, HTTP_ACCEPT="application/json")
+
+    def test_snapshot_is_served_with_one_query(self):
+        rendered = self.get(period="dinner").content
+        self.assertEqual(write_snapshots(self.hall, self.today), 1)
+        self.assertEqual(MenuSnapshot.objects.get().key, f"runk/{self.today}/dinner")
+        with self.assertNumQueries(1):
+            response = self.get(period="dinner")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response["Content-Type"], "application/json")
+        self.assertEqual(response.content, rendered)
+
+    def test_periods_without_a_snapshot_are_built(self):
+        write_snapshots(self.hall, self.today)
+        response = self.get(period="lunch")
+        self.assertEqual(response.status_code, 404)
+        self.assertEqual(response.data["available_periods"], ["Dinner"])
+
+    def test_snapshots_follow_the_published_day(self):
+        write_snapshots(self.hall, self.today)
+        Day.objects.update(is_published=False)
+        self.assertEqual(write_snapshots(self.hall, self.today), 0)
+        self.assertFalse(MenuSnapshot.objects.exists())
+
+    def test_day_replaced_while_rendering_is_not_written(self):
+        def replaced(hall, on_date):
+            rendered = render_snapshots(hall, on_date)
+            # another import publishes its day meanwhile
+            Day.objects.update(is_published=False)
+            make_day(hall, on_date, "Pizza")
+            return rendered
+
+        with mock.patch("api.importers.render_snapshots", side_effect=replaced):
+            self.assertEqual(write_snapshots(self.hall, self.today), 0)
+        self.assertFalse(MenuSnapshot.objects.exists())
+
+
+class MenusEndpointTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.today = datetime.date.today()
+        for name, item in (("ohill", "Pasta"), ("newcomb", "Curry"), ("runk", "Burger")):
+            hall = DiningHall.objects.create(name=name, scrape_url="http://test.com")
+            day = make_day(hall, self.today, item)
+            Period.objects.create(name="Lunch", vendor_id="1422", start_time=datetime.time(11, 0),
+                                  end_time=datetime.time(14, 0), day=day)
+
+    def get(self, **params) -> dict:
+        response = self.client.get("/api/menus/", params)
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        return json.loads(b"".join(response.streaming_content))
+
+    def test_every_hall_and_period(self):
+        data = self.get()
+        self.assertEqual(data["date"], str(self.today))
+        self.assertEqual([h["dining_hall"] for h in data["halls"]], ["ohill", "newcomb", "runk"])
+        runk = data["halls"][2]
+        self.assertEqual([p["name"] for p in runk["periods"]], ["Lunch", "Dinner"])
+        self.assertEqual(runk["periods"][1]["stations"][0]["menu_items"][0]["item_name"], "Burger")
+        self.assertEqual(runk["hall_hours"], {"open_time": "07:00:00", "close_time": "21:00:00"})
+
+    def test_hall_and_period_filters(self):
+        data = self.get(hall="runk,ohill", period="dinner")
+        self.assertEqual([h["dining_hall"] for h in data["halls"]], ["runk", "ohill"])
+        self.assertEqual([[p["name"] for p in h["periods"]] for h in data["halls"]], [["Dinner"], ["Dinner"]])
+
+    def test_missing_hall_is_listed(self):
+        Day.objects.filter(dining_hall__name="newcomb").update(is_published=False)
+        halls = self.get()["halls"]
+        self.assertEqual(halls[1], {"dining_hall": "newcomb", "status": "missing", "periods": []})
+
+    def test_invalid_filters_are_400(self):
+        self.assertEqual(self.client.get("/api/menus/", {"hall": "runk,clem"}).status_code, 400)
+        self.assertEqual(self.client.get("/api/menus/", {"period": "supper"}).status_code, 400)
+        self.assertEqual(self.client.get("/api/menus/", {"date": "9/17"}).status_code, 400)
+
+    def test_query_count_does_not_grow_with_the_halls(self):
+        with self.assertNumQueries(5):
+            self.get(hall="runk")
+        with self.assertNumQueries(5):
+            self.get()
@@ -1,19 +1,16 @@
+from django.db.models import Q
+from django.http import HttpResponse, StreamingHttpResponse
 from django.shortcuts import render
 from rest_framework.response import Response
 from rest_framework.decorators import api_view
 from rest_framework import status
-from .models import DiningHall, Day, Period
+from rest_framework.renderers import JSONRenderer
+from .models import DiningHall, Day, MenuSnapshot, Period
+from .menu_cache import cached_response
+from .on_demand import RETRY_AFTER_SECONDS, request_scrape
 from .serializers import PeriodSerializer
-from datetime import date
-
-PERIOD_NAME_MAP = {
-    "breakfast": "Breakfast",
-    "lunch": "Lunch",
-    "dinner": "Dinner",
-    "late_night": "Late Night",
-    "brunch": "Brunch",
-    "all_day": "All Day",
-}
+from .snapshots import PERIOD_NAME_MAP, menu_info_data, snapshot_key
+from datetime import date, datetime
 
 HALL_NAME_MAP = {
     "ohill": "ohill",
@@ -21,6 +18,54 @@ HALL_NAME_MAP = {
     "runk": "runk",
 }
 
+def _requested_date(request):
+    """The optional ?date=YYYY-MM-DD parameter (default today), or a 400 response."""
+    date_param = request.query_params.get("date", "")
+    if not date_param:
+        return date.today(), None
+    try:
+        return datetime.strptime(date_param, "%Y-%m-%d").date(), None
+    except ValueError:
+        return None, Response(
+            {"error": "Invalid date format. Use YYYY-MM-DD"},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+
+def _requested_keys(request, name, allowed):
+    """An optional comma separated ?name= parameter (default every key of `allowed`), or a 400 response."""
+    param = request.query_params.get(name, "").lower()
+    if not param:
+        return list(allowed), None
+    keys = [key.strip() for key in param.split(",") if key.strip()]
+    invalid = [key for key in keys if key not in allowed]
+    if invalid or not keys:
+        return None, Response(
+            {"error": f"Invalid {name}. Must be one or more of: {', '.join(allowed.keys())}"},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    return list(dict.fromkeys(keys)), None
+
+def _missing_menu(hall_name, menu_date):
+    """
+    The response for a hall/day that isn't imported. Today's menu is scraped on
+    demand (api.on_demand): 202 while that runs, with every other reader waiting
+    on the same scrape; otherwise 404.
+    """
+    if menu_date == date.today() and request_scrape(hall_name, menu_date):
+        return Response(
+            {
+                "status": "pending",
+                "message": f"Menu data for {hall_name} on {menu_date} is being loaded. Try again in a few seconds.",
+                "retry_after": RETRY_AFTER_SECONDS,
+            },
+            status=status.HTTP_202_ACCEPTED,
+            headers={"Retry-After": str(RETRY_AFTER_SECONDS)},
+        )
+    return Response(
+        {"error": f"Menu data for {hall_name} could not be loaded for {menu_date}. Please try again later."},
+        status=status.HTTP_404_NOT_FOUND
+    )
+
 @api_view(["GET"])
 def hello_world(request):
     return Response({"message": "Hello from your API!"})
@@ -34,7 +79,7 @@ def menu_info(request):
     # Validate parameters
     if not period_param or not hall_param:
         return Response(
-            {"error": "Both 'period' and 'hall' parameters are required. Example: /menu_info/?period=breakfast&hall=ohill"},
+            {"error": "Both 'period' and 'hall' parameters are required. Example: /menu_info/?period=breakfast&hall=ohill&date=2025-09-17"},
             status=status.HTTP_400_BAD_REQUEST
         )
     
@@ -54,23 +99,33 @@ def menu_info(request):
     period_name = PERIOD_NAME_MAP[period_param]
     hall_name = HALL_NAME_MAP[hall_param]
     
-    # Get today's date
-    today = date.today()
-    
+    # Requested date, today by default
+    menu_date, error = _requested_date(request)
+    if error:
+        return error
+
+    # Rendered when the hall was imported (api/snapshots.py): one primary key lookup
+    body = MenuSnapshot.objects.filter(pk=snapshot_key(hall_name, menu_date, period_param)) \
+        .values_list("body", flat=True).first()
+    if body is not None:
+        return HttpResponse(bytes(body), content_type="application/json")
+
+    # Otherwise served from the menu cache until the next import of this hall
+    return cached_response(hall_name, ("menu_info", menu_date, period_name),
+                           lambda: _menu_info(hall_name, period_name, menu_date))
+
+def _menu_info(hall_name, period_name, menu_date):
     try:
         # Find the dining hall
         dining_hall = DiningHall.objects.get(name=hall_name)
         
-        day = Day.objects.filter(dining_hall=dining_hall, date=today).first()
+        day = Day.objects.published().filter(dining_hall=dining_hall, date=menu_date).first()
 
         if not day:
-            return Response(
-                {"error": f"Menu data for {hall_name} could not be loaded for today. Please try again later."},
-                status=status.HTTP_404_NOT_FOUND
-            )
+            return _missing_menu(hall_name, menu_date)
         
         # Find the period for this day (case-insensitive match)
-        period = Period.objects.filter(
+        period = Period.objects.with_menu().filter(
             day=day,
             name__icontains=period_name
         ).first()
@@ -80,31 +135,18 @@ def menu_info(request):
             available_periods = Period.objects.filter(day=day).values_list('name', flat=True)
             return Response(
                 {
-                    "error": f"No {period_name} menu found for {hall_name} on {today}",
+                    "error": f"No {period_name} menu found for {hall_name} on {menu_date}",
                     "available_periods": list(available_periods)
                 },
                 status=status.HTTP_404_NOT_FOUND
             )
         
         # Serialize and return the data
-        serializer = PeriodSerializer(period)
-        
-        return Response({
-            "dining_hall": hall_name,
-            "date": str(today),
-            "day_name": day.day_name,
-            "hall_hours": {
-                "open_time": str(day.open_time),
-                "close_time": str(day.close_time)
-            },
-            "period": serializer.data
-        })
+        return Response(menu_info_data(hall_name, day, period))
         
     except DiningHall.DoesNotExist:
-        return Response(
-            {"error": f"Dining hall '{hall_name}' not found in database"},
-            status=status.HTTP_404_NOT_FOUND
-        )
+        # nothing imported for this hall yet
+        return _missing_menu(hall_name, menu_date)
     except Exception as e:
         return Response(
             {"error": f"An error occurred: {str(e)}"},
@@ -123,17 +165,20 @@ def available_periods(request):
         )
 
     hall_name = HALL_NAME_MAP[hall_param]
-    today = date.today()
+    menu_date, error = _requested_date(request)
+    if error:
+        return error
+
+    return cached_response(hall_name, ("available_periods", menu_date),
+                           lambda: _available_periods(hall_name, menu_date))
 
+def _available_periods(hall_name, menu_date):
     try:
         dining_hall = DiningHall.objects.get(name=hall_name)
 
-        day = Day.objects.filter(dining_hall=dining_hall, date=today).first()
+        day = Day.objects.published().filter(dining_hall=dining_hall, date=menu_date).first()
         if not day:
-            return Response(
-                {"error": f"Menu data for {hall_name} could not be loaded for today. Please try again later."},
-                status=status.HTTP_404_NOT_FOUND
-            )
+            return _missing_menu(hall_name, menu_date)
 
         # Get all periods for this day
         periods = day.periods.all().order_by("start_time")
@@ -149,17 +194,73 @@ def available_periods(request):
 
         return Response({
             "dining_hall": hall_name,
-            "date": str(today),
+            "date": str(menu_date),
             "periods": periods_out
         })
 
     except DiningHall.DoesNotExist:
-        return Response(
-            {"error": f"Dining hall '{hall_name}' not found in database"},
-            status=status.HTTP_404_NOT_FOUND
-        )
+        # nothing imported for this hall yet
+        return _missing_menu(hall_name, menu_date)
     except Exception as e:
         return Response(
             {"error": f"An error occurred: {str(e)}"},
             status=status.HTTP_500_INTERNAL_SERVER_ERROR
-        )
\ No newline at end of file
+        )
+
+@api_view(["GET"])
+def menus(request):
+    """
+    Every hall's periods, stations and items for a date in one response, e.g.
+    /api/menus/?date=2025-09-17&hall=ohill,runk&period=lunch,dinner (hall and
+    period are optional). The menus are loaded in a fixed number of queries
+    however many halls there are, then streamed one hall at a time.
+    """
+    menu_date, error = _requested_date(request)
+    if error:
+        return error
+    hall_keys, error = _requested_keys(request, "hall", HALL_NAME_MAP)
+    if error:
+        return error
+    period_keys, error = _requested_keys(request, "period", PERIOD_NAME_MAP)
+    if error:
+        return error
+    hall_names = [HALL_NAME_MAP[key] for key in hall_keys]
+
+    days = {
+        day.dining_hall.name: day
+        for day in Day.objects.published().filter(date=menu_date, dining_hall__name__in=hall_names)
+        .select_related("dining_hall")
+    }
+    periods = Period.objects.with_menu().filter(day__in=list(days.values())).order_by("start_time", "pk")
+    if period_keys != list(PERIOD_NAME_MAP):
+        # the same name match as menu_info
+        wanted = Q()
+        for key in period_keys:
+            wanted |= Q(name__icontains=PERIOD_NAME_MAP[key])
+        periods = periods.filter(wanted)
+    periods_by_day = {}
+    for period in periods:
+        periods_by_day.setdefault(period.day_id, []).append(period)
+
+    def stream():
+        renderer = JSONRenderer()
+        yield b'{"date":' + renderer.render(str(menu_date)) + b',"halls":['
+        for i, hall_name in enumerate(hall_names):
+            day = days.get(hall_name)
+            if day is None:
+                hall = {"dining_hall": hall_name, "status": "missing", "periods": []}
+            else:
+                hall = {
+                    "dining_hall": hall_name,
+                    "status": "ok",
+                    "day_name": day.day_name,
+                    "hall_hours": {
+                        "open_time": str(day.open_time),
+                        "close_time": str(day.close_time)
+                    },
+                    "periods": PeriodSerializer(periods_by_day.get(day.pk, []), many=True).data,
+                }
+            yield (b"," if i else b"") + renderer.render(hall)
+        yield b"]}"
+
+    return StreamingHttpResponse(stream(), content_type="application/json")
@@ -0,0 +1,20 @@
+"""
+Process setup for scrape_menus --workers.
+
+The pool starts its processes with "spawn" and unpickles init_worker before
+Django is set up, so this module imports no models.
+"""
+import django
+from django.db import connection
+
+# The workers write to one database at once: their SQLite connections take the
+# write lock when a transaction starts, and wait for it instead of failing with
+# "database is locked". Only the worker processes use it, not the web server.
+SQLITE_WORKER_OPTIONS = {"transaction_mode": "IMMEDIATE", "timeout": 20}
+
+
+def init_worker():
+    """Set up Django in a worker process, with connections made for concurrent writers."""
+    django.setup()
+    if connection.vendor == "sqlite":
+        connection.settings_dict.setdefault("OPTIONS", {}).update(SQLITE_WORKER_OPTIONS)
@@ -1,42 +1,113 @@
-import fcntl
-import os
-import tempfile
+"""
+Scheduled menu scrapes. They run in the dedicated worker process started by
+`python manage.py run_worker` (the Procfile's and docker-compose's "worker"),
+never inside the web workers, so scraping and importing don't compete with
+request handling.
 
-from apscheduler.schedulers.background import BackgroundScheduler
+Any number of workers may run, on any number of hosts: they elect a leader
+through the database (api.leases) and only the leader scrapes.
+
+Menus are refreshed at each of settings.MENU_REFRESH_TIMES, give or take
+MENU_REFRESH_JITTER seconds, and whenever a worker becomes the leader it
+catches up: every hall without a published day for today is scraped at once,
+so a worker that was down at midnight doesn't leave today's menus missing.
+The leader also polls for hall/days readers found missing (api.on_demand).
+"""
+from datetime import datetime
+
+from apscheduler.schedulers.blocking import BlockingScheduler
 from apscheduler.triggers.cron import CronTrigger
+from django.conf import settings
 from django.core.management import call_command
 import logging
 
+from api.importers import halls_without_menu
+from api.leases import HEARTBEAT_SECONDS
+from api.on_demand import POLL_SECONDS, run_scrape_requests
+from api.scrapers import NY_TZ
+
 logger = logging.getLogger(__name__)
 
-scheduler = BackgroundScheduler(timezone='America/New_York')
-_lock_file = None
+TIMEZONE = 'America/New_York'
+MISFIRE_GRACE_SECONDS = 30 * 60  # a refresh held up by a long scrape still runs, once
 
 
-def scrape_menus_job():
+def scrape_menus_job(election=None):
+    # the lease is renewed first, so a leader that lost it meanwhile stands down
+    if election is not None and not election.renew():
+        logger.info("Scheduler triggered on a follower: skipping scrape_menus")
+        return
     logger.info("Scheduler triggered: running scrape_menus")
     call_command('scrape_menus')
 
 
-def start():
-    global _lock_file
-    if scheduler.running:
+def catch_up_job(election=None):
+    if election is not None and not election.renew():
+        logger.info("Catch-up triggered on a follower: skipping")
         return
-    # Use a file lock so only one gunicorn worker starts the scheduler
-    lock_path = os.path.join(tempfile.gettempdir(), 'scheduler.lock')
-    _lock_file = open(lock_path, 'w')
-    try:
-        fcntl.flock(_lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
-    except OSError:
-        _lock_file.close()
-        _lock_file = None
-        logger.info("Scheduler already running in another worker, skipping")
+    missing = halls_without_menu(datetime.now(NY_TZ).date())
+    if not missing:
+        logger.info("Catch-up: every hall has today's menu")
+    for hall in missing:
+        logger.info("Catch-up: no menu for %s today, running scrape_menus", hall)
+        call_command('scrape_menus', '--hall', hall)
+
+
+def scrape_requests_job(election=None):
+    # runs every few seconds, so it trusts the heartbeat rather than renewing the lease itself
+    if election is not None and not election.is_leader:
         return
+    run_scrape_requests()
+
+
+def refresh_triggers(times=None, jitter=None) -> dict:
+    """CronTriggers for each "HH:MM" refresh time, keyed by job id."""
+    times = settings.MENU_REFRESH_TIMES if times is None else times
+    jitter = settings.MENU_REFRESH_JITTER if jitter is None else jitter
+    triggers = {}
+    for value in times:
+        try:
+            at = datetime.strptime(value, '%H:%M')
+        except ValueError:
+            raise ValueError(f"Invalid MENU_REFRESH_TIMES entry {value!r}. Use HH:MM") from None
+        triggers[f"scrape_menus_{at:%H%M}"] = CronTrigger(hour=at.hour, minute=at.minute, jitter=jitter or None,
+                                                          timezone=TIMEZONE)
+    return triggers
+
+
+def create_scheduler(scheduler_class=BlockingScheduler, election=None, heartbeat_seconds=HEARTBEAT_SECONDS):
+    """
+    A scheduler with every menu job added; the caller starts it. With an
+    `election` (api.leases.LeaderElection) its lease is renewed every
+    `heartbeat_seconds` and the jobs only run while it is held.
+    """
+    scheduler = scheduler_class(timezone=TIMEZONE)
+    for job_id, trigger in refresh_triggers().items():
+        scheduler.add_job(
+            scrape_menus_job,
+            trigger=trigger,
+            kwargs={'election': election},
+            id=job_id,
+            replace_existing=True,
+            coalesce=True,
+            misfire_grace_time=MISFIRE_GRACE_SECONDS,
+        )
     scheduler.add_job(
-        scrape_menus_job,
-        trigger=CronTrigger(hour=0, minute=0),
-        id='scrape_menus_daily',
-        replace_existing=True,
+        scrape_requests_job,
+        trigger='interval',
+        seconds=POLL_SECONDS,
+        kwargs={'election': election},
+        id='scrape_requests',
+        max_instances=1,
+        coalesce=True,
     )
-    scheduler.start()
-    logger.info("Scheduler started: scrape_menus scheduled daily at 12:00 AM ET")
+    if election is not None:
+        scheduler.add_job(
+            election.renew,
+            trigger='interval',
+            seconds=heartbeat_seconds,
+            id='scheduler_lease',
+            max_instances=1,
+            coalesce=True,
+        )
+    return scheduler
@@ -12,6 +12,7 @@ https://docs.djangoproject.com/en/5.2/ref/settings/
 
 from pathlib import Path
 import os
+import sys
 import dj_database_url
 from dotenv import load_dotenv
 
@@ -172,4 +173,37 @@ STATIC_URL = 'static/'
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
-ANTHROPIC_API_KEY = os.environ.get('ANTHROPIC_API_KEY', '')
\ No newline at end of file
+ANTHROPIC_API_KEY = os.environ.get('ANTHROPIC_API_KEY', '')
+
+# Raw CampusDish payloads kept by scrape_menus for --replay (see api/archive.py).
+# Set MENU_ARCHIVE_DIR to an empty string to stop archiving.
+MENU_ARCHIVE_DIR = os.environ.get('MENU_ARCHIVE_DIR', str(BASE_DIR / 'menu_archive'))
+
+# When run_worker refreshes every hall's menu, as HH:MM in America/New_York, and
+# up to how many seconds each refresh is delayed at random so workers on several
+# deployments don't all hit CampusDish on the minute. Unchanged menus cost a few
+# conditional requests (see api/importers.py, change detection).
+MENU_REFRESH_TIMES = [t.strip() for t in os.environ.get('MENU_REFRESH_TIMES', '00:00,06:00,10:30,16:00').split(',') if t.strip()]
+MENU_REFRESH_JITTER = int(os.environ.get('MENU_REFRESH_JITTER', '300'))
+
+# Rendered menu_info and available_periods responses (api/menu_cache.py). Every
+# web worker and run_worker has to share this cache, since imports invalidate it:
+# a file cache does on one host; across hosts set REDIS_URL (needs the redis package).
+# Test runs keep it in memory, so they neither share entries with a server nor
+# write menu_cache/ into the source tree.
+REDIS_URL = os.environ.get('REDIS_URL', '')
+TESTING = sys.argv[1:2] == ['test']
+CACHES = {
+    'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'},
+    'menus': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'menus',
+    } if TESTING else {
+        'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+        'LOCATION': REDIS_URL,
+    } if REDIS_URL else {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': os.environ.get('MENU_CACHE_DIR', str(BASE_DIR / 'menu_cache')),
+        'OPTIONS': {'MAX_ENTRIES': 5000},
+    },
+}
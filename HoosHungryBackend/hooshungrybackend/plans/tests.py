@@ -153,7 +153,7 @@ class PlanHistoryEndpointTest(TestCase):
 
 class AddMealItemNutritionTest(TestCase):
     def setUp(self):
-        from api.models import MenuItem, NutritionInfo, DiningHall, Day, Period, Station
+        from api.models import MenuItem, NutritionInfo, DiningHall, Day, Period, Station, Product
         self.user = User.objects.create_user(username='adduser', password='pass')
         self.client = APIClient()
         token, _ = Token.objects.get_or_create(user=self.user)
@@ -173,12 +173,13 @@ class AddMealItemNutritionTest(TestCase):
             start_time=datetime.time(11, 0), end_time=datetime.time(14, 0), day=day
         )
         station = Station.objects.create(name='Grill', number='1', period=period)
-        self.menu_item = MenuItem.objects.create(
-            station=station, item_name='Test Burger',
+        product = Product.objects.create(
+            vendor_id='M1_695', item_name='Test Burger',
             is_vegan=False, is_vegetarian=False
         )
+        self.menu_item = MenuItem.objects.create(station=station, product=product)
         NutritionInfo.objects.create(
-            menu_item=self.menu_item,
+            product=product,
             calories=Decimal('500'),
             protein=Decimal('30'),
             total_carbohydrates=Decimal('40'),
@@ -146,7 +146,7 @@ def add_meal_item(request):
     # Get the menu item from api app
     try:
         api_menu_item = APIMenuItem.objects.select_related(
-            'nutrition_info', 'station__period__day__dining_hall'
+            'product__nutrition_info', 'station__period__day__dining_hall'
         ).get(id=menu_item_id)
     except APIMenuItem.DoesNotExist:
         return Response(
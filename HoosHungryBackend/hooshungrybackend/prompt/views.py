@@ -61,9 +61,9 @@ def _get_menu_context(today):
     et = zoneinfo.ZoneInfo('America/New_York')
     now_et = datetime.now(et).time()
     rows = []
-    days = Day.objects.filter(date=today).select_related('dining_hall')
+    days = Day.objects.published().filter(date=today).select_related('dining_hall')
     for day in days:
-        for period in day.periods.prefetch_related('stations__menu_items__nutrition_info').all():
+        for period in day.periods.prefetch_related('stations__menu_items__product__nutrition_info').all():
             if period.end_time <= now_et:
                 continue
             for station in period.stations.all():